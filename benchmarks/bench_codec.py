@@ -0,0 +1,58 @@
+"""Report writer throughput and stored bytes per codec and level.
+
+$ python benchmarks/bench_codec.py --records 2000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from os_spage import open_file
+from os_spage.codec import CODECS
+
+
+def html(i):
+    row = '<tr><td class="c%d">item %d</td><td><a href="/p/%d">link</a></td></tr>\n'
+    return (
+        "<html><body><table>\n%s</table></body></html>"
+        % "".join(row % (j % 7, i * 31 + j, j) for j in range(60))
+    ).encode()
+
+
+def bench(records, codec, level):
+    path = tempfile.mkdtemp()
+    try:
+        base_filename = os.path.join(path, "spage_")
+        start = time.time()
+        f = open_file(base_filename, "w", codec=codec, level=level, validator="fast")
+        for i, data in enumerate(records):
+            f.write("http://www.example.com/%d" % i, data=data)
+        f.close()
+        cost = time.time() - start
+        size = sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+        return cost, size
+    finally:
+        shutil.rmtree(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=2000)
+    args = parser.parse_args()
+
+    records = [html(i) for i in range(args.records)]
+    raw = sum(map(len, records))
+    print("%d records, %d bytes of data" % (args.records, raw))
+    for codec in sorted(CODECS):
+        for level in (None, 1, 6, 9):
+            cost, size = bench(records, codec, level)
+            print(
+                "%-5s level %-4s %10.0f records/sec %12d bytes %6.1f%%"
+                % (codec, level, args.records / cost, size, size * 100.0 / raw)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Report the time of aggregations over re-read records and over columns.
+
+The aggregation sums Store-Size per Error-Reason and counts the records
+per fetch hour. It runs over the records read without data, over an
+exported column file, and with numpy over the same columns if installed.
+
+$ python benchmarks/bench_columnar.py --records 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from os_rotatefile import open_file as open_rotatefile
+from os_spage import read
+from os_spage.columnar import ColumnFile, export_spage
+from os_spage.index import fetch_timestamp
+from os_spage.spage_writer import create_writer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+START = datetime(2018, 3, 1)
+REASONS = ["timeout", "dns", "reset", "403", "404"]
+
+
+def write_corpus(base, records, page_size):
+    writer = create_writer(validator="fast")
+    f = open_rotatefile(base, "w", roll_size="64M")
+    data = b"x" * page_size
+    for i in range(records):
+        inner_header = {
+            "batchID": "bench",
+            "Fetch-Time": START + timedelta(seconds=i),
+            "IP-Address": "10.0.%d.%d" % (i % 7, i % 251),
+        }
+        if i % 10 == 0:
+            inner_header["Error-Reason"] = REASONS[i % len(REASONS)]
+        writer.write(
+            f,
+            "http://www%d.example.com/%d" % (i % 100, i),
+            inner_header=inner_header,
+            data=None if i % 10 == 0 else data,
+        )
+    f.close()
+
+
+def aggregate_records(base):
+    sizes, hours = Counter(), Counter()
+    f = open_rotatefile(base, "r")
+    for record in read(f, engine="buffered", skip_data=True):
+        header = record["inner_header"]
+        sizes[header.get("Error-Reason")] += int(header.get("Store-Size", 0))
+        hours[fetch_timestamp(header.get("Fetch-Time")) // 3600] += 1
+    f.close()
+    return sizes, hours
+
+
+def aggregate_columns(filename):
+    sizes, hours = Counter(), Counter()
+    with ColumnFile(filename) as f:
+        reasons = f.dictionary("error_reason") + [None]
+        for code, size in zip(f.column("error_reason"), f.column("store_size")):
+            sizes[reasons[code]] += max(size, 0)
+        hours.update(t // 3600 for t in f.column("fetch_time"))
+    return sizes, hours
+
+
+def aggregate_numpy(filename):
+    with ColumnFile(filename) as f:
+        reasons = f.dictionary("error_reason") + [None]
+        codes = numpy.frombuffer(f.column("error_reason"), dtype="<i4")
+        store_sizes = numpy.frombuffer(f.column("store_size"), dtype="<i8")
+        fetch_times = numpy.frombuffer(f.column("fetch_time"), dtype="<i8")
+        totals = numpy.bincount(
+            codes + 1, weights=numpy.maximum(store_sizes, 0), minlength=len(reasons)
+        )
+        sizes = Counter(
+            dict((reasons[c - 1], int(t)) for c, t in enumerate(totals) if t)
+        )
+        keys, counts = numpy.unique(fetch_times // 3600, return_counts=True)
+        hours = Counter(dict(zip(keys.tolist(), counts.tolist())))
+    return sizes, hours
+
+
+def bench(func, arg, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = func(arg)
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    try:
+        base = os.path.join(path, "spage_")
+        filename = os.path.join(path, "columns")
+        write_corpus(base, args.records, args.page_size)
+
+        start = time.time()
+        export_spage(base, filename)
+        print(
+            "%-16s %8.3fs %10d bytes"
+            % ("export", time.time() - start, os.path.getsize(filename))
+        )
+
+        expected, cost = bench(aggregate_records, base, args.repeat)
+        print("%-16s %8.3fs" % ("records", cost))
+        runs = [("columns", aggregate_columns)]
+        if numpy is not None:
+            runs.append(("columns/numpy", aggregate_numpy))
+        for name, func in runs:
+            result, cost = bench(func, filename, args.repeat)
+            assert result == expected, name
+            print("%-16s %8.3fs" % (name, cost))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
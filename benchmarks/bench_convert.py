@@ -0,0 +1,75 @@
+"""Compare spage to offpage conversion: s2o reader, streaming, passthrough.
+
+Peak is the largest amount of memory traced by tracemalloc while
+converting. Passthrough skips the recompression only, each payload is still
+decompressed once to check it.
+
+$ python benchmarks/bench_convert.py --records 20 --page-size 8M
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+from os_rotatefile.rotatefile import valid_size
+
+from os_spage import convert, read
+from os_spage.spage_writer import create_writer
+
+
+class NullFile(object):
+    def write(self, data):
+        return len(data)
+
+
+def s2o(src, dst):
+    for record in read(src, page_type="s2o"):
+        dst.write(record)
+
+
+def bench(func, raw, **kwargs):
+    tracemalloc.start()
+    start = time.time()
+    func(BytesIO(raw), NullFile(), **kwargs)
+    cost = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cost, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20)
+    parser.add_argument("--page-size", default="8M")
+    args = parser.parse_args()
+
+    size = valid_size(args.page_size)
+    page = (os.urandom(64) + b"<td>%d</td>" * 32) * (size // 416 + 1)
+    writer = create_writer()
+    s = BytesIO()
+    for i in range(args.records):
+        writer.write(
+            s,
+            "http://www.example.com/%d" % i,
+            http_header={"Content-Type": "text/html"},
+            data=page[:size],
+        )
+    raw = s.getvalue()
+    print("%d records, %d bytes of spage" % (args.records, len(raw)))
+
+    for name, func, kwargs in (
+        ("s2o", s2o, {}),
+        ("stream", convert, {}),
+        ("passthrough", convert, {"passthrough": True}),
+    ):
+        cost, peak = bench(func, raw, **kwargs)
+        print(
+            "%-12s %8.1f records/sec %8.1f MB peak"
+            % (name, args.records / cost, peak / 2.0**20)
+        )
+
+
+if __name__ == "__main__":
+    main()
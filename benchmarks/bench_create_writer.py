@@ -0,0 +1,40 @@
+"""Report the cost of creating a writer, as done per batch.
+
+$ python benchmarks/bench_create_writer.py --count 2000
+"""
+
+import argparse
+import time
+
+from os_spage.spage_writer import create_writer
+
+
+def bench(count, repeat, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(count):
+            create_writer(**kwargs)
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, kwargs in (
+        ("default", {}),
+        ("fast", {"validator": "fast", "encoder": "fast"}),
+        ("bz2", {"codec": "bz2"}),
+        ("lzma", {"codec": "lzma"}),
+    ):
+        cost = bench(args.count, args.repeat, **kwargs)
+        print("%-10s %8.2fus/writer" % (name, cost * 1e6 / args.count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Report the time and size of writes with and without dedup.
+
+A share of the records, --duplicates, repeats the payload of an earlier
+one, as re-crawls of unchanged pages do.
+
+$ python benchmarks/bench_dedup.py --records 20000 --duplicates 0.5
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from corpus import page
+from os_spage import open_file
+
+
+def payloads(records, page_size, duplicates):
+    rand = random.Random(0)
+    pages = []
+    for _ in range(records):
+        if pages and rand.random() < duplicates:
+            yield rand.choice(pages)
+        else:
+            data = page(page_size)
+            pages.append(data)
+            yield data
+
+
+def bench(records, repeat, **kwargs):
+    best = None
+    for _ in range(repeat):
+        path = tempfile.mkdtemp()
+        try:
+            base = os.path.join(path, "spage_")
+            start = time.time()
+            f = open_file(base, "w", validator="fast", encoder="fast", **kwargs)
+            for i, data in enumerate(records):
+                f.write("http://www.example.com/%d" % i, data=data)
+            f.close()
+            cost = time.time() - start
+            size = sum(
+                os.path.getsize(os.path.join(path, n))
+                for n in os.listdir(path)
+                if n[len("spage_") :].isdigit()
+            )
+        finally:
+            shutil.rmtree(path)
+        best = cost if best is None else min(best, cost)
+    return size, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=16384)
+    parser.add_argument("--duplicates", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = list(payloads(args.records, args.page_size, args.duplicates))
+    for name, kwargs in (
+        ("default", {}),
+        ("dedup", {"dedup": True}),
+    ):
+        size, cost = bench(records, args.repeat, **kwargs)
+        print(
+            "%-8s %8.3fs %10.0f records/sec %12d bytes"
+            % (name, cost, args.records / cost, size)
+        )
+
+
+if __name__ == "__main__":
+    main()
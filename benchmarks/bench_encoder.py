@@ -0,0 +1,67 @@
+"""Report the per-record cost of the record encoders.
+
+Records are processed once, only ``dumps`` is timed.
+
+$ python benchmarks/bench_encoder.py --records 20000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from corpus import http_header
+from os_spage.default_schema import META_SCHEMA, SpageKeys as S_KEYS
+from os_spage.spage_writer import create_writer, get_encoder
+
+
+def make_records(count, http_headers, page_size):
+    writer = create_writer(compress=False, validator="trusted")
+    data = b"x" * page_size
+    headers = http_header(http_headers)
+    return [
+        writer.encode(
+            "http://www.example.com/%d" % i,
+            inner_header={
+                "batchID": "bench",
+                "User-Agent": "Mozilla/5.0",
+                "Fetch-Time": datetime.now(),
+                "IP-Address": "10.0.0.1",
+            },
+            http_header=headers,
+            data=data,
+        )[0]
+        for i in range(count)
+    ]
+
+
+def bench(encoder, records, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for record in records:
+            encoder.dumps(record)
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keys = META_SCHEMA["properties"][S_KEYS.INNER_HEADER]["properties"].keys()
+    for http_headers in (2, 32):
+        records = make_records(args.records, http_headers, args.page_size)
+        for name in (None, "fast"):
+            cost = bench(get_encoder(name, keys), records, args.repeat)
+            print(
+                "%-8s %2d http headers %8.2fus/record"
+                % (name or "default", http_headers, cost * 1e6 / len(records))
+            )
+
+
+if __name__ == "__main__":
+    main()
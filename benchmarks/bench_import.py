@@ -0,0 +1,56 @@
+"""Report the time of importing os_spage in a fresh interpreter.
+
+Each statement runs in its own interpreter, the time of an empty one is
+subtracted. The modules listed are heavy dependencies loaded by it.
+
+$ python benchmarks/bench_import.py --repeat 20
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+HEAVY = ("jsonschema", "multiprocessing", "mmap", "asyncio")
+
+STATEMENTS = [
+    ("import", "import os_spage"),
+    ("read", "import os_spage; list(os_spage.read(__import__('io').BytesIO()))"),
+    (
+        "write",
+        "import os_spage; os_spage.write(__import__('io').BytesIO(), 'http://a/')",
+    ),
+]
+
+REPORT = "import sys; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+
+
+def bench(statement, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", statement])
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    base = bench("pass", args.repeat)
+    for name, statement in STATEMENTS:
+        cost = bench(statement, args.repeat) - base
+        loaded = subprocess.check_output(
+            [sys.executable, "-c", statement + "; " + REPORT]
+        )
+        print(
+            "%-8s %8.1fms  %s"
+            % (name, cost * 1000, loaded.decode("ascii").strip() or "-")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare ways of writing offpage records of several large data parts.
+
+join: the parts are joined and written at once, writev: one scatter write
+per record, rotate: OffpageWriter over a size-rotate-file.
+
+$ python benchmarks/bench_offpage_write.py --records 200 --part-size 1M
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from os_rotatefile.rotatefile import valid_size
+
+from os_spage import open_file
+from os_spage.offpage_writer import encode_head, write
+
+
+def write_joined(fp, url, header=None, data=None):
+    fp.write(b"".join([encode_head(url, header, data)] + list(data.values()) + [b"\n"]))
+
+
+def bench(name, records, path):
+    base_filename = os.path.join(path, name)
+    start = time.time()
+    if name == "rotate":
+        f = open_file(base_filename, "w", page_type="offpage")
+        for url, data in records:
+            f.write(url, data=data)
+        f.close()
+    else:
+        func = write_joined if name == "join" else write
+        with open(base_filename, "wb") as f:
+            for url, data in records:
+                func(f, url, data=data)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--parts", type=int, default=4)
+    parser.add_argument("--part-size", default="1M")
+    args = parser.parse_args()
+
+    size = valid_size(args.part_size)
+    data = dict(("part%d" % i, os.urandom(size)) for i in range(args.parts))
+    records = [("http://www.example.com/%d" % i, data) for i in range(args.records)]
+    total = args.records * args.parts * size
+
+    path = tempfile.mkdtemp()
+    try:
+        for name in ("join", "writev", "rotate"):
+            cost = bench(name, records, path)
+            print(
+                "%-6s %10.0f records/sec %8.1f MB/sec"
+                % (name, args.records / cost, total / cost / 2**20)
+            )
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Report how parallel_read scales with the number of worker processes.
+
+Each record is decompressed, as a CPU-bound func would do.
+
+$ python benchmarks/bench_parallel.py --records 50000 --workers 1,2,4,8
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from corpus import spage_corpus
+from os_rotatefile import open_file as open_rotatefile
+from os_spage import open_file, parallel_read
+
+
+def decompressed_size(record):
+    data = record["data"]
+    return len(zlib.decompress(data)) if data else 0
+
+
+def report(name, count, cost):
+    print(
+        "%-20s %8d records %8.3fs %10.0f records/sec"
+        % (name, count, cost, count / cost)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=16384)
+    parser.add_argument("--roll-size", default="64M")
+    parser.add_argument("--chunk-size", default="8M")
+    parser.add_argument("--workers", default=",".join(str(2**i) for i in range(4)))
+    args = parser.parse_args()
+
+    print("cpu count: %d" % multiprocessing.cpu_count())
+    path = tempfile.mkdtemp()
+    try:
+        base_filename = os.path.join(path, "spage_")
+        f = open_rotatefile(base_filename, "w", roll_size=args.roll_size)
+        f.write(spage_corpus(args.records, args.page_size))
+        f.close()
+
+        start = time.time()
+        f = open_file(base_filename, "r", engine="buffered")
+        count = sum(1 for r in f.read() if decompressed_size(r) >= 0)
+        f.close()
+        report("sequential", count, time.time() - start)
+
+        for workers in map(int, args.workers.split(",")):
+            start = time.time()
+            count = sum(
+                1
+                for _ in parallel_read(
+                    base_filename,
+                    func=decompressed_size,
+                    workers=workers,
+                    chunk_size=args.chunk_size,
+                )
+            )
+            report("parallel/%d" % workers, count, time.time() - start)
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
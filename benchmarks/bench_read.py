@@ -0,0 +1,85 @@
+"""Report records/sec of the page readers over an in-memory corpus.
+
+$ python benchmarks/bench_read.py --records 20000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+from corpus import offpage_corpus, spage_corpus
+from os_rotatefile import open_file as open_rotatefile
+from os_spage import open_file, read
+
+
+def bench(raw, page_type, repeat, **kwargs):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.time()
+        count = sum(1 for _ in read(BytesIO(raw), page_type=page_type, **kwargs))
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return count, best
+
+
+def bench_rotatefile(raw, roll_size, repeat, **kwargs):
+    path = tempfile.mkdtemp()
+    try:
+        base_filename = os.path.join(path, "spage_")
+        f = open_rotatefile(base_filename, "w", roll_size=roll_size)
+        f.write(raw)
+        f.close()
+        best = None
+        count = 0
+        for _ in range(repeat):
+            start = time.time()
+            f = open_file(base_filename, "r", **kwargs)
+            count = sum(1 for _ in f.read())
+            f.close()
+            cost = time.time() - start
+            best = cost if best is None else min(best, cost)
+        return count, best
+    finally:
+        shutil.rmtree(path)
+
+
+def report(name, count, cost):
+    print(
+        "%-26s %8d records %8.3fs %10.0f records/sec"
+        % (name, count, cost, count / cost)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--http-headers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--roll-size", default="16M")
+    args = parser.parse_args()
+
+    spage = spage_corpus(args.records, args.page_size, args.http_headers)
+    corpus = {"spage": spage, "s2o": spage, "offpage": offpage_corpus(spage)}
+    for page_type in ("spage", "offpage", "s2o"):
+        report(page_type, *bench(corpus[page_type], page_type, args.repeat))
+    report("spage/buffered", *bench(spage, "spage", args.repeat, engine="buffered"))
+    for engine in ("line", "buffered"):
+        report(
+            "rotatefile/%s" % engine,
+            *bench_rotatefile(spage, args.roll_size, args.repeat, engine=engine)
+        )
+        report(
+            "rotatefile/%s/skip" % engine,
+            *bench_rotatefile(
+                spage, args.roll_size, args.repeat, engine=engine, skip_data=True
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare dict records with SpageRecord: read throughput and memory held.
+
+Memory is what the records of the corpus take when kept in a list, data
+excluded, as measured by tracemalloc.
+
+$ python benchmarks/bench_record.py --records 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+from corpus import spage_corpus
+from os_spage import read
+from os_spage.record import SpageRecord
+
+
+def bench(raw, repeat, **kwargs):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.time()
+        count = sum(1 for r in read(BytesIO(raw), **kwargs) if r["url"])
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return count, best
+
+
+def held(raw, **kwargs):
+    tracemalloc.start()
+    records = list(read(BytesIO(raw), skip_data=True, **kwargs))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size // len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--http-headers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = spage_corpus(args.records, args.page_size, args.http_headers)
+    for engine in ("line", "buffered"):
+        for name, record_class in (("dict", None), ("SpageRecord", SpageRecord)):
+            count, cost = bench(
+                raw, args.repeat, engine=engine, record_class=record_class
+            )
+            size = held(raw, engine=engine, record_class=record_class)
+            print(
+                "%-22s %8d records %10.0f records/sec %8d bytes/record"
+                % ("%s/%s" % (engine, name), count, count / cost, size)
+            )
+
+
+if __name__ == "__main__":
+    main()
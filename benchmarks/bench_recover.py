@@ -0,0 +1,65 @@
+"""Report records/sec and records read over a corrupted in-memory corpus.
+
+Every --every records a Store-Size is made too large and garbage is
+inserted after the next record.
+
+$ python benchmarks/bench_recover.py --records 20000 --every 100
+"""
+
+import argparse
+import os
+import re
+import time
+from io import BytesIO
+
+from corpus import spage_corpus
+from os_spage import read
+
+RECORD = re.compile(rb"(?=http://www\.example\.com/\d+\n)")
+
+
+def corrupt(raw, every, garbage):
+    parts = [p for p in RECORD.split(raw) if p]
+    for i in range(0, len(parts) - 1, every):
+        parts[i] = re.sub(
+            rb"Store-Size: (\d+)",
+            lambda m: b"Store-Size: %d" % (int(m.group(1)) + 100),
+            parts[i],
+        )
+        parts[i + 1] += garbage
+    return b"".join(parts)
+
+
+def bench(raw, **kwargs):
+    skipped = []
+    if kwargs.get("recover"):
+        kwargs["on_skip"] = lambda start, end: skipped.append(end - start)
+    start = time.time()
+    count = sum(1 for _ in read(BytesIO(raw), **kwargs))
+    return count, time.time() - start, sum(skipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--garbage", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    raw = spage_corpus(args.records)
+    bad = corrupt(raw, args.every, os.urandom(args.garbage) + b"\n")
+    for name, data in (("clean", raw), ("corrupt", bad)):
+        for engine, kwargs in (
+            ("line", {}),
+            ("buffered", {"engine": "buffered"}),
+            ("recover", {"engine": "buffered", "recover": True}),
+        ):
+            count, cost, skipped = bench(data, **kwargs)
+            print(
+                "%-8s %-9s %8d records %10.0f records/sec %10d bytes skipped"
+                % (name, engine, count, count / cost, skipped)
+            )
+
+
+if __name__ == "__main__":
+    main()
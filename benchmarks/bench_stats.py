@@ -0,0 +1,62 @@
+"""Report the overhead of collecting stats when reading and writing.
+
+Rates are in records per second of CPU time, best of --repeat runs.
+
+$ python benchmarks/bench_stats.py --records 20000
+"""
+
+import argparse
+import json
+import time
+from io import BytesIO
+
+from corpus import spage_corpus
+from os_spage import read
+from os_spage.spage_writer import create_writer
+from os_spage.stats import Stats
+
+
+def bench_read(raw, stats, **kwargs):
+    start = time.process_time()
+    count = sum(1 for _ in read(BytesIO(raw), stats=stats, **kwargs))
+    return count / (time.process_time() - start)
+
+
+def bench_write(records, stats):
+    writer = create_writer(validator="fast", stats=stats)
+    s = BytesIO()
+    start = time.process_time()
+    for i, data in enumerate(records):
+        writer.write(s, "http://www.example.com/%d" % i, data=data)
+    writer.flush_stats()
+    return len(records) / (time.process_time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = spage_corpus(args.records)
+    records = [b"<html>%d</html>" % i * 100 for i in range(args.records)]
+    cases = (
+        ("read line", lambda stats: bench_read(raw, stats)),
+        ("read buffered", lambda stats: bench_read(raw, stats, engine="buffered")),
+        ("write", lambda stats: bench_write(records, stats)),
+    )
+    stats = Stats()
+    for name, func in cases:
+        off = on = 0
+        for _ in range(args.repeat):
+            off = max(off, func(None))
+            on = max(on, func(stats))
+        print(
+            "%-14s %10.0f records/sec off %10.0f on %6.1f%%"
+            % (name, off, on, (on - off) * 100.0 / off)
+        )
+    print(json.dumps(stats.snapshot(), indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Report the per-record cost of the writer validators.
+
+$ python benchmarks/bench_validate.py --records 20000
+"""
+
+import argparse
+import copy
+import time
+from datetime import datetime
+
+from os_spage.spage_writer import create_writer, get_validator
+
+INNER_HEADER = {
+    "batchID": "bench",
+    "User-Agent": "Mozilla/5.0",
+    "Fetch-Time": datetime.now(),
+    "IP-Address": "10.0.0.1",
+}
+
+
+def bench_validate(name, records, repeat):
+    best = None
+    for _ in range(repeat):
+        validator = get_validator(name)
+        batch = copy.deepcopy(records)
+        start = time.time()
+        for record in batch:
+            validator.validate(record)
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def bench_encode(name, count, repeat):
+    best = None
+    writer = create_writer(validator=name)
+    data = b"x" * 4096
+    for _ in range(repeat):
+        start = time.time()
+        for i in range(count):
+            writer.encode(
+                "http://www.example.com/%d" % i,
+                inner_header=INNER_HEADER,
+                http_header={"k": "v"},
+                data=data,
+            )
+        cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = [
+        {
+            "url": "http://www.example.com/%d" % i,
+            "inner_header": dict(INNER_HEADER, Type="flat", **{"Original-Size": 1}),
+            "http_header": {"k": "v"},
+            "data": b"x",
+        }
+        for i in range(args.records)
+    ]
+    for name in (None, "fast", "trusted"):
+        validate = bench_validate(name, records, args.repeat)
+        encode = bench_encode(name, args.records, args.repeat)
+        print(
+            "%-10s validate %8.2fus/record    encode %8.2fus/record"
+            % (
+                name or "jsonschema",
+                validate * 1e6 / args.records,
+                encode * 1e6 / args.records,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
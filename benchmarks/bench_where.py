@@ -0,0 +1,70 @@
+"""Report records/sec of read with where, and of filtering read records.
+
+About 1% of the corpus urls match the url prefix, no record matches the
+batchID, which is checked after the inner header is parsed.
+
+$ python benchmarks/bench_where.py --records 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from corpus import write_spage
+from os_spage import read
+
+URL_PREFIX = "http://www.example.com/99"
+
+
+def bench(filename, repeat, engine, where=None, check=None):
+    best = None
+    for _ in range(repeat):
+        with open(filename, "rb") as f:
+            start = time.time()
+            count = 0
+            for record in read(f, engine=engine, where=where):
+                if check is None or check(record):
+                    count += 1
+            cost = time.time() - start
+        best = cost if best is None else min(best, cost)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=16384)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_spage(f, args.records, args.page_size)
+        for engine in ("line", "buffered"):
+            for name, where, check in (
+                (
+                    "url/filter",
+                    None,
+                    lambda r: r["url"].startswith(URL_PREFIX),
+                ),
+                ("url/where", {"url_prefix": URL_PREFIX}, None),
+                (
+                    "batchID/filter",
+                    None,
+                    lambda r: r["inner_header"]["batchID"] == "other",
+                ),
+                ("batchID/where", {"inner_header": {"batchID": "other"}}, None),
+            ):
+                count, cost = bench(filename, args.repeat, engine, where, check)
+                print(
+                    "%-24s %8d matched %8.3fs %10.0f records/sec"
+                    % (engine + "/" + name, count, cost, args.records / cost)
+                )
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Report records/sec of SpageWriter.write, write_many and buffered mode.
+
+$ python benchmarks/bench_write.py --records 20000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from os_spage import open_file
+
+
+def make_records(records, page_size, http_headers):
+    data = os.urandom(page_size // 4) * 4
+    http_header = dict(("X-Header-%d" % i, "value-%d" % i) for i in range(http_headers))
+    return [
+        {
+            "url": "http://www.example.com/%d" % i,
+            "inner_header": {"batchID": "bench", "User-Agent": "Mozilla/5.0"},
+            "http_header": http_header,
+            "data": data,
+        }
+        for i in range(records)
+    ]
+
+
+def bench(records, repeat, roll_size, how, **kwargs):
+    best = best_caller = None
+    for _ in range(repeat):
+        path = tempfile.mkdtemp()
+        try:
+            start = time.time()
+            f = open_file(
+                os.path.join(path, "spage_"), "w", roll_size=roll_size, **kwargs
+            )
+            if how == "write_many":
+                f.write_many(records)
+            else:
+                for record in records:
+                    f.write(**record)
+            caller = time.time() - start
+            f.close()
+            cost = time.time() - start
+        finally:
+            shutil.rmtree(path)
+        best = cost if best is None else min(best, cost)
+        best_caller = caller if best_caller is None else min(best_caller, caller)
+    return len(records), best, best_caller
+
+
+def report(name, count, cost, caller):
+    print(
+        "%-24s %8d records %8.3fs %10.0f records/sec, %8.3fs before close"
+        % (name, count, cost, count / cost, caller)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--http-headers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--roll-size", default="16M")
+    parser.add_argument("--buffer-size", default="1M")
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.page_size, args.http_headers)
+    for compress in (True, False):
+        suffix = "" if compress else "/flat"
+        report(
+            "write" + suffix,
+            *bench(records, args.repeat, args.roll_size, "write", compress=compress)
+        )
+        report(
+            "write/buffered" + suffix,
+            *bench(
+                records,
+                args.repeat,
+                args.roll_size,
+                "write",
+                compress=compress,
+                buffer_size=args.buffer_size,
+            )
+        )
+        for workers in (1, 2):
+            report(
+                "write/background/%d%s" % (workers, suffix),
+                *bench(
+                    records,
+                    args.repeat,
+                    args.roll_size,
+                    "write",
+                    compress=compress,
+                    background=True,
+                    workers=workers,
+                )
+            )
+        report(
+            "write_many" + suffix,
+            *bench(
+                records, args.repeat, args.roll_size, "write_many", compress=compress
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Synthetic spage/offpage corpora for the benchmark scripts."""
+
+import os
+
+from os_rotatefile import open_file as open_rotatefile
+from os_spage import read
+from os_spage.spage_writer import create_writer
+
+
+def page(page_size):
+    return os.urandom(page_size // 4) * 4
+
+
+def http_header(count):
+    return dict(("X-Header-%d" % i, "value-%d" % i) for i in range(count))
+
+
+def write_spage(f, records, page_size=4096, http_headers=8, compress=True):
+    writer = create_writer(compress=compress, validator="fast")
+    data = page(page_size)
+    headers = http_header(http_headers)
+    for i in range(records):
+        writer.write(
+            f,
+            "http://www.example.com/%d" % i,
+            inner_header={"batchID": "bench", "User-Agent": "Mozilla/5.0"},
+            http_header=headers,
+            data=data,
+        )
+
+
+def spage_corpus(records=10000, page_size=4096, http_headers=8, compress=True):
+    from io import BytesIO
+
+    o = BytesIO()
+    write_spage(o, records, page_size, http_headers, compress)
+    return o.getvalue()
+
+
+def offpage_corpus(spage):
+    from io import BytesIO
+
+    return b"".join(read(BytesIO(spage), page_type="s2o"))
+
+
+def write_corpus_files(path, roll_size="1G", **kwargs):
+    """Write a rotated spage corpus and its offpage, return their base names.
+
+    kwargs are those of ``write_spage``.
+    """
+    spage_base = os.path.join(path, "spage_")
+    offpage_base = os.path.join(path, "offpage_")
+    f = open_rotatefile(spage_base, "w", roll_size=roll_size)
+    write_spage(f, **kwargs)
+    f.close()
+
+    o = open_rotatefile(offpage_base, "w", roll_size=roll_size)
+    s = open_rotatefile(spage_base, "r")
+    for record in read(s, page_type="s2o"):
+        o.write(record)
+    s.close()
+    o.close()
+    return spage_base, offpage_base
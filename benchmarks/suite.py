@@ -0,0 +1,297 @@
+"""Benchmark suite of the read, write, s2o, offpage and validate paths.
+
+Each case runs in a fresh interpreter so its peak RSS is its own. Read
+cases read rotated segments from disk, written once per corpus. Results
+are written as JSON, and two result files can be compared.
+
+$ python benchmarks/suite.py --output before.json
+$ python benchmarks/suite.py --output after.json
+$ python benchmarks/suite.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGE_SIZES = ["1k", "16k", "256k"]
+HTTP_HEADERS = [2, 32]
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def cases(page_sizes, http_headers):
+    for page_size in page_sizes:
+        for headers in http_headers:
+            for compress in (True, False):
+                corpus = {
+                    "page_size": page_size,
+                    "http_headers": headers,
+                    "compress": compress,
+                }
+                for engine in ("line", "buffered"):
+                    yield "read", dict(corpus, engine=engine)
+                yield "s2o", corpus
+                yield "offpage", corpus
+                for encoder in ("default", "fast"):
+                    yield "write", dict(corpus, validator="fast", encoder=encoder)
+    for validator in ("default", "fast"):
+        yield "validate", {"validator": validator}
+
+
+def case_name(kind, params):
+    return "/".join([kind] + ["%s=%s" % (k, params[k]) for k in sorted(params)])
+
+
+def run_read(params, files, records):
+    from os_spage import open_file
+
+    base = files["spage" if params["kind"] != "offpage" else "offpage"]
+    kwargs = {}
+    if params["kind"] == "read":
+        kwargs["engine"] = params["engine"]
+    else:
+        kwargs["page_type"] = params["kind"]
+    start = time.time()
+    f = open_file(base, "r", **kwargs)
+    count = sum(1 for _ in f.read())
+    f.close()
+    cost = time.time() - start
+    size = sum(os.path.getsize(n) for n in files["segments"][base])
+    return count, size, cost
+
+
+def run_write(params, files, records):
+    from corpus import http_header, page
+    from os_rotatefile.rotatefile import valid_size
+    from os_spage import open_file
+
+    path = tempfile.mkdtemp()
+    try:
+        data = page(valid_size(params["page_size"]))
+        headers = http_header(params["http_headers"])
+        base = os.path.join(path, "spage_")
+        start = time.time()
+        f = open_file(
+            base,
+            "w",
+            roll_size=files["roll_size"],
+            compress=params["compress"],
+            validator=params["validator"],
+            encoder=None if params["encoder"] == "default" else params["encoder"],
+        )
+        for i in range(records):
+            f.write("http://www.example.com/%d" % i, http_header=headers, data=data)
+        f.close()
+        cost = time.time() - start
+        size = sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+        return records, size, cost
+    finally:
+        shutil.rmtree(path)
+
+
+def run_validate(params, files, records):
+    from os_spage.spage_writer import get_validator
+
+    validator = get_validator(None if params["validator"] == "default" else "fast")
+    record = {
+        "url": "http://www.example.com/",
+        "inner_header": {
+            "Type": "compressed",
+            "Original-Size": 1000,
+            "Store-Size": 100,
+            "batchID": "bench",
+        },
+        "http_header": {"Content-Type": "text/html"},
+        "data": b"",
+    }
+    start = time.time()
+    for _ in range(records):
+        validator.validate(dict(record, inner_header=dict(record["inner_header"])))
+    return records, 0, time.time() - start
+
+
+RUNNERS = {
+    "read": run_read,
+    "s2o": run_read,
+    "offpage": run_read,
+    "write": run_write,
+    "validate": run_validate,
+}
+
+
+def run_case(spec):
+    """Run one case in this process, print its result as JSON."""
+    sys.path.insert(0, HERE)
+    kind, params, files, records = spec
+    rss_base = peak_rss_kb()
+    count, size, cost = RUNNERS[kind](dict(params, kind=kind), files, records)
+    print(
+        json.dumps(
+            {
+                "name": case_name(kind, params),
+                "kind": kind,
+                "params": params,
+                "records": count,
+                "bytes": size,
+                "seconds": cost,
+                "records_per_sec": count / cost if cost else None,
+                "mb_per_sec": size / cost / 2.0**20 if cost and size else None,
+                "rss_base_kb": rss_base,
+                "peak_rss_kb": peak_rss_kb(),
+            }
+        )
+    )
+
+
+def write_corpora(path, specs, records, roll_size):
+    from corpus import write_corpus_files
+    from os_rotatefile.rotatefile import valid_size
+    from os_spage.segment import list_segments
+
+    corpora = {}
+    for kind, params in specs:
+        if kind not in ("read", "s2o", "offpage"):
+            continue
+        key = (params["page_size"], params["http_headers"], params["compress"])
+        if key in corpora:
+            continue
+        corpus_path = os.path.join(path, "%s_%d_%d" % (key[0], key[1], key[2]))
+        os.mkdir(corpus_path)
+        spage_base, offpage_base = write_corpus_files(
+            corpus_path,
+            roll_size=roll_size,
+            records=records,
+            page_size=valid_size(key[0]),
+            http_headers=key[1],
+            compress=key[2],
+        )
+        corpora[key] = {
+            "spage": spage_base,
+            "offpage": offpage_base,
+            "segments": {
+                spage_base: list_segments(spage_base),
+                offpage_base: list_segments(offpage_base),
+            },
+        }
+    return corpora
+
+
+def run_suite(args):
+    sys.path.insert(0, HERE)
+    import os_spage
+
+    specs = [
+        (kind, params)
+        for kind, params in cases(args.page_sizes, args.http_headers)
+        if args.filter is None or args.filter in case_name(kind, params)
+    ]
+    path = tempfile.mkdtemp()
+    results = []
+    try:
+        corpora = write_corpora(path, specs, args.records, args.roll_size)
+        for kind, params in specs:
+            files = {"roll_size": args.roll_size}
+            if "page_size" in params and kind != "write":
+                key = (params["page_size"], params["http_headers"], params["compress"])
+                files.update(corpora[key])
+            records = args.records * (50 if kind == "validate" else 1)
+            spec = json.dumps([kind, params, files, records])
+            out = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), "--run-case", spec]
+            )
+            result = json.loads(out.decode("utf-8").strip().splitlines()[-1])
+            results.append(result)
+            print(format_result(result))
+    finally:
+        shutil.rmtree(path)
+
+    report = {
+        "os_spage": os_spage.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "records": args.records,
+        "roll_size": args.roll_size,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+def format_result(result):
+    mb = result["mb_per_sec"]
+    return "%-84s %10.0f records/sec %8s MB/sec %8s KB peak" % (
+        result["name"],
+        result["records_per_sec"] or 0,
+        "-" if mb is None else "%.1f" % mb,
+        result["peak_rss_kb"] or "-",
+    )
+
+
+def compare(old_file, new_file):
+    with open(old_file) as f:
+        old = json.load(f)
+    with open(new_file) as f:
+        new = json.load(f)
+    print("%s -> %s" % (old["os_spage"], new["os_spage"]))
+    old_results = dict((r["name"], r) for r in old["results"])
+    for result in new["results"]:
+        before = old_results.get(result["name"])
+        if before is None or not before["records_per_sec"]:
+            continue
+        change = result["records_per_sec"] / before["records_per_sec"] - 1
+        print(
+            "%-84s %10.0f -> %10.0f records/sec %+7.1f%%"
+            % (
+                result["name"],
+                before["records_per_sec"],
+                result["records_per_sec"],
+                change * 100,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--page-sizes", type=lambda s: s.split(","), default=PAGE_SIZES)
+    parser.add_argument(
+        "--http-headers",
+        type=lambda s: [int(i) for i in s.split(",")],
+        default=HTTP_HEADERS,
+    )
+    parser.add_argument("--roll-size", default="16M")
+    parser.add_argument("--filter", help="run the cases whose name contains it")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(json.loads(args.run_case))
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
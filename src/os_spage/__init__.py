@@ -1,12 +1,55 @@
+import importlib
 import pkgutil
 import sys
 
 from .offpage_reader import OffpageReader, read as read_offpage
 from .spage_reader import SpageReader, read as read_spage
-from .spage_to_offpage import SpageToOffpage, read as spage_to_offpage
-from .spage_writer import SpageWriter, write as _write
+from .spage_to_offpage import (
+    SpageToOffpage,
+    convert as _spage_to_offpage,
+    read as spage_to_offpage,
+)
 
-write = _write
+# Imported on first use: the writers import jsonschema, parallel_read
+# multiprocessing.
+_LAZY = {
+    "MmapSpageReader": (".mmap_reader", "MmapSpageReader"),
+    "OffpageWriter": (".offpage_writer", "OffpageWriter"),
+    "write_offpage": (".offpage_writer", "write"),
+    "parallel_read": (".parallel", "parallel_read"),
+    "SpageWriter": (".spage_writer", "SpageWriter"),
+    "write": (".spage_writer", "write"),
+}
+
+
+def _load(name):
+    module, attr = _LAZY[name]
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _load(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+if sys.version_info < (3, 7):  # no module __getattr__
+    for _name in _LAZY:
+        _load(_name)
+
+
+_write = None
+
+
+def write(f, url, inner_header=None, http_header=None, data=None):
+    # replaced by spage_writer.write in the module on first call, kept for
+    # the callers that imported it
+    global _write
+    if _write is None:
+        _write = _load("write")
+    _write(f, url, inner_header=inner_header, http_header=http_header, data=data)
 
 
 def __not_supported_mode(name, **kwargs):
@@ -17,24 +60,38 @@ def __not_supported_page_type(name, **kwargs):
     raise ValueError("page_type must be 'spage', 'offpage', 's2o'")
 
 
-def read(s, page_type="spage"):
+def __not_supported_conversion(src, dst, **kwargs):
+    raise ValueError("only 'spage' to 'offpage' conversion is supported")
+
+
+def read(s, page_type="spage", **kwargs):
     r = {"spage": read_spage, "offpage": read_offpage, "s2o": spage_to_offpage}.get(
         page_type, __not_supported_page_type
     )
-    return r(s)
+    return r(s, **kwargs)
 
 
 def open_file(name, mode, **kwargs):
     r = {
-        "w": SpageWriter,
+        "w": {"spage": "SpageWriter", "offpage": "OffpageWriter"},
         "r": {"spage": SpageReader, "offpage": OffpageReader, "s2o": SpageToOffpage},
     }.get(mode, __not_supported_mode)
-    if mode == "r":
+    if mode in ("r", "w"):
         r = r.get(kwargs.pop("page_type", "spage"), __not_supported_page_type)
+    if r in _LAZY:
+        r = _load(r)
 
     return r(name, **kwargs)
 
 
+def convert(src, dst, src_type="spage", dst_type="offpage", **kwargs):
+    """Convert the records read from file object src and write them to dst."""
+    c = {("spage", "offpage"): _spage_to_offpage}.get(
+        (src_type, dst_type), __not_supported_conversion
+    )
+    return c(src, dst, **kwargs)
+
+
 __all__ = ["__version__", "version_info", "open_file"]
 
 __version__ = pkgutil.get_data(__package__, "VERSION").decode("ascii").strip()
@@ -0,0 +1,165 @@
+"""Read and write spage over asyncio streams, Python 3.6+ only.
+
+Records are parsed by the handlers of the line engine and encoded by the
+writer of ``create_writer``, only the I/O is asynchronous.
+"""
+
+import asyncio
+import inspect
+
+from os_rotatefile.rotatefile import valid_size
+
+from .default_schema import InnerHeaderKeys as I_KEYS, SpageKeys as S_KEYS
+from .record import LazyDataRecord, decompress_record
+from .spage_reader import Reader
+from .spage_writer import create_writer
+
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+
+class AsyncReader(Reader):
+    """Line engine over an asyncio StreamReader."""
+
+    async def _readline(self):
+        parts = []
+        while True:
+            try:
+                parts.append(await self._fp.readuntil(b"\n"))
+                break
+            except asyncio.IncompleteReadError as e:
+                parts.append(e.partial)
+                break
+            except asyncio.LimitOverrunError as e:
+                parts.append(await self._fp.readexactly(e.consumed))
+        return b"".join(parts)
+
+    async def _read_bytes(self, size):
+        try:
+            return await self._fp.readexactly(size)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+    async def _aread_data(self):
+        # same rules as Reader._read_data
+        size = int(self._inner_header.get(I_KEYS.STORE_SIZE, -1))
+        if size < 0 or self._url_latest is not None:
+            return self._generate()
+
+        data = await self._read_bytes(size)
+        if size > 0 and not data:
+            return None
+
+        if not self._http_header:
+            if data[0:2] == b"\r\n":
+                o = await self._read_bytes(2)
+                data = data[2:] + o
+        self._data = data
+        return self._generate()
+
+    async def _aread(self):
+        while True:
+            line = await self._readline()
+            if not line:
+                return None
+            if self._on_line(line):
+                return await self._aread_data()
+
+    async def read(self):
+        while True:
+            record = await self._aread()
+            if record is None:
+                return
+            yield record
+            self._reset()
+
+
+async def read(reader, decompress=False, record_class=None):
+    """Yield the records of spage read from an asyncio StreamReader.
+
+    decompress and record_class are the same as in ``os_spage.read``.
+    """
+    async for record in AsyncReader(reader, record_class=record_class).read():
+        if decompress == "lazy":
+            record = LazyDataRecord(record)
+        elif decompress:
+            record = decompress_record(record)
+        yield record
+
+
+class AsyncSpageWriter(object):
+    """Write records to an asyncio StreamWriter or an aiofiles-like object.
+
+    Encoded records are joined and written once ``buffer_size`` bytes are
+    pending, or on ``flush``. After each write the writer's ``drain`` is
+    awaited when it has one, so a slow peer holds back the producer.
+    """
+
+    def __init__(self, writer, buffer_size="64k", **kwargs):
+        self._writer = writer
+        self._buffer_size = valid_size(buffer_size)
+        self._record_writer = create_writer(**kwargs)
+        self._buffer = []
+        self._buffered = 0
+
+    async def _write_buffer(self):
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        await _maybe_await(self._writer.write(data))
+        drain = getattr(self._writer, "drain", None)
+        if drain is not None:
+            await drain()
+
+    def _buffer_record(self, url, inner_header, http_header, data):
+        _, encoded = self._record_writer.encode(
+            url, inner_header=inner_header, http_header=http_header, data=data
+        )
+        self._buffer.append(encoded)
+        self._buffered += len(encoded)
+
+    async def write(
+        self, url, inner_header=None, http_header=None, data=None, flush=False
+    ):
+        self._buffer_record(url, inner_header, http_header, data)
+        if self._buffered >= self._buffer_size:
+            await self._write_buffer()
+        if flush:
+            await self.flush()
+
+    async def write_many(self, records, flush=False):
+        """Write records, dicts with the keys of the records read."""
+        for record in records:
+            self._buffer_record(
+                record[S_KEYS.URL],
+                record.get(S_KEYS.INNER_HEADER),
+                record.get(S_KEYS.HTTP_HEADER),
+                record.get(S_KEYS.DATA),
+            )
+            if self._buffered >= self._buffer_size:
+                await self._write_buffer()
+        if flush:
+            await self.flush()
+
+    async def flush(self):
+        await self._write_buffer()
+        flush = getattr(self._writer, "flush", None)
+        if flush is not None:
+            await _maybe_await(flush())
+
+    async def close(self):
+        await self.flush()
+        await _maybe_await(self._writer.close())
+        wait_closed = getattr(self._writer, "wait_closed", None)
+        if wait_closed is not None:
+            await wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,113 @@
+"""Encode and write records off the caller's thread."""
+
+import threading
+
+from .compat import Queue
+
+
+class _Job(object):
+    __slots__ = ("args", "result", "error", "done")
+
+    def __init__(self, args):
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BackgroundPipeline(object):
+    """Run encode(*args) on worker threads and put(args, result) in order.
+
+    At most queue_size jobs are pending, submit() blocks beyond that. A
+    single thread calls put() and flush(), in submission order. The first
+    error raised by any of them is re-raised by the next submit(), flush()
+    or close(). close() can be called again, submit() and flush() raise
+    ValueError after it.
+    """
+
+    def __init__(self, encode, put, flush, queue_size=1024, workers=1):
+        if queue_size <= 0 or workers <= 0:
+            raise ValueError("queue_size and workers must be > 0")
+        self._encode = encode
+        self._put = put
+        self._flush = flush
+        self._jobs = Queue(queue_size)
+        self._tasks = Queue()
+        self._error = None
+        self._closed = False
+        self._threads = [threading.Thread(target=self._put_loop)]
+        self._threads.extend(
+            threading.Thread(target=self._encode_loop) for _ in range(workers)
+        )
+        for t in self._threads:
+            t.daemon = True
+            t.start()
+
+    def _encode_loop(self):
+        while True:
+            job = self._tasks.get()
+            if job is None:
+                return
+            try:
+                job.result = self._encode(*job.args)
+            except Exception as e:
+                job.error = e
+            job.done.set()
+
+    def _put_loop(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                job.done.wait()
+                if job.error is None:
+                    try:
+                        if job.args is None:
+                            self._flush()
+                        else:
+                            self._put(job.args, job.result)
+                    except Exception as e:
+                        job.error = e
+                if job.error is not None and self._error is None:
+                    self._error = job.error
+            finally:
+                self._jobs.task_done()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _check_closed(self):
+        if self._closed:
+            raise ValueError("I/O operation on closed writer")
+
+    def submit(self, *args):
+        self._check_closed()
+        self._raise_error()
+        job = _Job(args)
+        self._jobs.put(job)
+        self._tasks.put(job)
+
+    def flush(self):
+        """Wait for the jobs submitted so far to be put, then flush."""
+        self._check_closed()
+        job = _Job(None)
+        job.done.set()
+        self._jobs.put(job)
+        self._jobs.join()
+        self._raise_error()
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            for _ in self._threads[1:]:
+                self._tasks.put(None)
+            self._jobs.put(None)
+            for t in self._threads:
+                t.join()
@@ -0,0 +1,118 @@
+from .common import COLON, DEFAULT_ENCODING
+from .stats import TIMING_SAMPLE, TimedFile, clock
+
+SKIP_BUFFER_SIZE = 64 * 1024
+
+
+def decode_line(line):
+    try:
+        return line.decode(DEFAULT_ENCODING).strip()
+    except Exception:
+        return None
+
+
+def parse_header_line(line, header):
+    d = line.find(COLON)
+    if d > 0:
+        key = line[0:d].strip()
+        value = line[d + 1 :].strip()
+        header[key] = value
+
+
+def skip_bytes(fp, size):
+    """Move size bytes forward in fp.
+
+    Seek if fp can, otherwise read and drop at most SKIP_BUFFER_SIZE bytes
+    at a time.
+    """
+    try:
+        fp.seek(size, 1)
+        return
+    except (AttributeError, IOError, OSError, ValueError):
+        pass
+    while size > 0:
+        d = fp.read(min(size, SKIP_BUFFER_SIZE))
+        if not d:
+            break
+        size -= len(d)
+
+
+class BaseReader(object):
+    """Line driven state machine shared by the page readers.
+
+    Subclasses implement ``_reset``, which must point ``self._on_line`` at the
+    handler of the first header block, and ``_read_data``, returning the
+    record or None to skip it. A line handler
+    consumes one line and returns True when the data block should be read
+    next. Handlers never read from ``fp`` themselves, so the whole record is
+    parsed by the loop in ``_read`` without growing the stack.
+
+    With ``stats``, an ``os_spage.stats.Stats``, reads are timed and counted
+    through a ``TimedFile``, readline times are sampled.
+    """
+
+    def __init__(self, fp, stats=None):
+        self._stats = stats
+        self._sample = TIMING_SAMPLE - 1
+        self._fp = fp if stats is None else TimedFile(fp, stats)
+        self._url_latest = None
+        self._reset()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _read_data(self):
+        raise NotImplementedError
+
+    def _read(self):
+        if self._stats is None:
+            return self._read_record()
+        return self._fp.read_record(self._read_record_timed)
+
+    def _read_record_timed(self):
+        # _read_record counting the bytes of lines, their readline calls are
+        # timed for one record in TIMING_SAMPLE
+        readline = self._fp.raw.readline
+        self._sample = (self._sample + 1) % TIMING_SAMPLE
+        timed = self._sample == 0
+        readline_time = 0.0
+        size = 0
+        try:
+            while True:
+                if timed:
+                    start = clock()
+                    line = readline()
+                    readline_time += clock() - start
+                else:
+                    line = readline()
+                if not line:
+                    raise StopIteration
+                size += len(line)
+                if self._on_line(line):
+                    break
+        finally:
+            self._fp.add_readline(readline_time * TIMING_SAMPLE, size)
+        return self._read_data()
+
+    def _read_record(self):
+        readline = self._fp.readline
+        while True:
+            line = readline()
+            if not line:
+                raise StopIteration
+            if self._on_line(line):
+                return self._read_data()
+
+    def read(self):
+        try:
+            while True:
+                try:
+                    record = self._read()
+                    if record is not None:
+                        yield record
+                    self._reset()
+                except StopIteration:
+                    return
+        finally:
+            if self._stats is not None:
+                self._fp.flush()
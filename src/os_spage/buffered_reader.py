@@ -0,0 +1,508 @@
+import re
+
+from os_rotatefile.rotatefile import valid_size
+
+from .base_reader import decode_line, parse_header_line, skip_bytes
+from .common import COLON, DEFAULT_ENCODING, simple_check_url
+from .compat import isascii
+from .default_schema import InnerHeaderKeys as I_KEYS
+from .stats import TimedFile, count
+
+STORE_SIZE = I_KEYS.STORE_SIZE
+
+_INCOMPLETE = object()
+
+# record keys, text on Python 2 as well, as those of the line engine
+_URL, _INNER_HEADER, _HTTP_HEADER, _DATA = (
+    k.decode("ascii") for k in (b"url", b"inner_header", b"http_header", b"data")
+)
+
+# inner header lines that can follow the url line of a record
+INNER_HEADER_PREFIXES = tuple(
+    (getattr(I_KEYS, k) + COLON).encode(DEFAULT_ENCODING)
+    for k in dir(I_KEYS)
+    if not k.startswith("_")
+)
+# longest url line and inner header line prefix a record candidate spans
+RESYNC_MARGIN = 1024 + 64
+
+
+def find_record(buf, pos):
+    """Return the offset of the first record candidate in buf[pos:].
+
+    A candidate is a url line following a line feed and followed by an inner
+    header line. Candidates that do not fit in buf are not reported, -1 is
+    returned when there is none.
+    """
+    while True:
+        d = buf.find(b"://", pos)
+        if d < 0:
+            return -1
+        start = buf.rfind(b"\n", pos, d) + 1
+        if start <= 0 or start == d or buf.find(b":", start, d) >= 0:
+            pos = d + 3
+            continue
+        end = buf.find(b"\n", d)
+        if end < 0 or end + 32 > len(buf):
+            return -1
+        if end - start <= 1024 and buf.startswith(INNER_HEADER_PREFIXES, end + 1):
+            return start
+        pos = d + 3
+
+
+_LINE_BREAKS = re.compile(b"[\r\n]*")
+
+
+def _record_at(buf, pos):
+    # whether a record candidate, see find_record, starts at pos
+    d = buf.find(b"://", pos, pos + 1024)
+    if d <= pos or buf.find(b":", pos, d) >= 0 or buf.find(b"\n", pos, d) >= 0:
+        return False
+    end = buf.find(b"\n", d, pos + 1025)
+    return (
+        end >= 0
+        and end + 32 <= len(buf)
+        and buf.startswith(INNER_HEADER_PREFIXES, end + 1)
+    )
+
+
+def _parse_block(block, inner):
+    # Parse a whole header block at once, return None if any line would need
+    # the per-line rules: url lines, blank or separator-less lines and, in
+    # inner header, over long lines.
+    try:
+        text = block.decode(DEFAULT_ENCODING)
+    except Exception:
+        return None
+    lines = text.split("\n")
+    if inner and len(text) > 1024 and max(map(len, lines)) > 1024:
+        return None
+    header = {}
+    for key, sep, value in [line.partition(COLON) for line in lines]:
+        if not sep or value[:2] == "//":
+            return None
+        key = key.strip()
+        if key:
+            header[key] = value.strip()
+    return header
+
+
+def parse_header_block(block, inner):
+    """Parse a header block kept raw by ``_raw_block``."""
+    header = _parse_block(block, inner)
+    if header is None:
+        header = {}
+        for line in block.split(b"\n"):
+            line = decode_line(line)
+            if line is None or (inner and len(line) > 1024):
+                continue
+            parse_header_line(line, header)
+    return header
+
+
+# a line not starting with a key and a separator, or a url line
+_RAW_HAZARD = re.compile(b"^(?![!-9;-~][^:\n]*:(?!//))", re.M)
+_RAW_STORE_SIZE = (STORE_SIZE + COLON).encode(DEFAULT_ENCODING)
+
+
+def _raw_block(block, inner):
+    # A header block can be kept raw, and parsed later by parse_header_block,
+    # when the per-line rules can not end it early or leave it empty: ascii
+    # lines that all start with a key followed by a separator, none of them a
+    # url line, and in inner header a first line short enough to be kept.
+    if not isascii(block) or _RAW_HAZARD.search(block):
+        return False
+    return not inner or len(block) <= 1024 or block.find(b"\n", 0, 1025) >= 0
+
+
+def _raw_store_size(block):
+    # Store-Size of a raw inner header block, -1 if there is none and None
+    # if it can not be told without parsing the block.
+    count = block.count(_RAW_STORE_SIZE[:-1])
+    if count == 0:
+        return -1
+    line = b"\n" + _RAW_STORE_SIZE
+    if block.count(line) + block.startswith(_RAW_STORE_SIZE) != count:
+        return None
+    start = block.rfind(line) + 1
+    end = block.find(b"\n", start)
+    if end < 0:
+        end = len(block)
+    if end - start > 1024:
+        return None
+    value = block[start + len(_RAW_STORE_SIZE) : end].strip()
+    return int(value) if value.isdigit() else None
+
+
+def read(fp, **kwargs):
+    reader = Reader(fp, **kwargs)
+    for record in reader.read():
+        yield record
+
+
+class Reader(object):
+    """Parse spage from large blocks instead of one readline() per line.
+
+    Record boundaries are located with ``bytes.find`` over the current block.
+    Well formed header blocks are decoded and split in one go, anything else
+    falls back to per-line parsing with the same rules as the line engine.
+    The block is an immutable bytes object that is replaced, never modified,
+    when more input is needed, so with ``zero_copy=True`` the ``data`` of each
+    record is returned as a memoryview over the block that stays valid after
+    the reader moves on.
+
+    ``offset`` is the stream offset of the url line of the last record read.
+    With ``skip_data=True`` data is seeked over when it is not in the block.
+
+    Records are built by ``record_class(url, inner_header, http_header,
+    data)`` when given. If it has a true ``raw_headers`` attribute, header
+    blocks that are safe to parse later are passed as bytes, see
+    ``parse_header_block``.
+
+    With ``recover=True`` anything that is not a record where one should
+    start is skipped up to the next record candidate, see ``find_record``,
+    and ``on_skip(start, end)`` is called with the stream offsets skipped.
+    Data running into a record candidate, when Store-Size is too large or
+    the stream is truncated, is cut before it. A record whose Store-Size is
+    not a number or is negative is skipped with its data.
+
+    With ``stats``, an ``os_spage.stats.Stats``, reads are timed and counted
+    through a ``TimedFile``.
+
+    With ``where``, an ``os_spage.where.Where``, the header blocks of
+    records failing its url conditions are kept raw and not parsed when
+    they can be, the data of records failing any condition is skipped and
+    they are not returned.
+    """
+
+    def __init__(
+        self,
+        fp,
+        block_size="1M",
+        zero_copy=False,
+        skip_data=False,
+        record_class=None,
+        recover=False,
+        on_skip=None,
+        stats=None,
+        where=None,
+    ):
+        self._stats = stats
+        self._where = where
+        self._fp = fp if stats is None else TimedFile(fp, stats)
+        self._recover = recover
+        self._on_skip = on_skip
+        self._skip_data = skip_data
+        self._record_class = record_class
+        self._raw = getattr(record_class, "raw_headers", False)
+        self._raw_size = -1
+        self._block_size = valid_size(block_size)
+        self._zero_copy = zero_copy
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+        self._base = 0
+        self._url_latest = None
+        self._url_latest_offset = -1
+        self.offset = -1
+
+    def _fill(self):
+        if self._eof:
+            return False
+        block = self._fp.read(self._block_size)
+        if not block:
+            self._eof = True
+            return False
+        self._base += self._pos
+        self._buf = self._buf[self._pos :] + block
+        self._pos = 0
+        return True
+
+    def resync(self):
+        """Skip to the next record candidate, see ``find_record``.
+
+        Return False if the stream ends before one is found.
+        """
+        count(self._stats, "resyncs")
+        self._url_latest = None
+        while True:
+            found = find_record(self._buf, self._pos)
+            if found >= 0:
+                self._pos = found
+                return True
+            self._pos = max(self._pos, len(self._buf) - RESYNC_MARGIN)
+            if not self._fill():
+                self._pos = len(self._buf)
+                return False
+
+    def _at_record(self):
+        # skip the line breaks ending the previous record, then tell whether
+        # the stream ends or a record candidate starts
+        while len(self._buf) - self._pos < RESYNC_MARGIN and self._fill():
+            pass
+        buf = self._buf
+        self._pos = pos = _LINE_BREAKS.match(buf, self._pos).end()
+        return pos >= len(buf) or _record_at(buf, pos)
+
+    def _skipped(self, start):
+        end = self._base + self._pos
+        if end > start:
+            count(self._stats, "skipped_bytes", end - start)
+            if self._on_skip is not None:
+                self._on_skip(start, end)
+
+    def _skip_garbage(self):
+        if not self._at_record():
+            start = self._base + self._pos
+            self.resync()
+            self._skipped(start)
+
+    def _recover_data(self, data, size):
+        if data is None:
+            self._skip_garbage()
+            return data
+        end = self._base + self._pos
+        if len(data) == size and self._at_record():
+            return data
+        garbage = self._base + self._pos
+        start = end - len(data)
+        # data follows a line break, a record candidate can start it
+        self._buf = b"\n" + bytes(data) + self._buf[end - self._base :]
+        self._base = start - 1
+        self._pos = 0
+        if self.resync() and self._base + self._pos < end:
+            size = self._base + self._pos - start
+            if data[size - 2 : size] == b"\r\n":
+                size -= 2
+            return data[:size]
+        self._skipped(garbage)
+        return data
+
+    def _read_bytes(self, size):
+        buf, pos = self._buf, self._pos
+        end = pos + size
+        if end <= len(buf):
+            self._pos = end
+            if self._zero_copy:
+                return memoryview(buf)[pos:end]
+            return buf[pos:end]
+
+        parts = [buf[pos:]]
+        need = end - len(buf)
+        self._base += len(buf)
+        self._buf = b""
+        self._pos = 0
+        while need > 0 and not self._eof:
+            d = self._fp.read(need)
+            if not d:
+                self._eof = True
+                break
+            parts.append(d)
+            need -= len(d)
+            self._base += len(d)
+        data = b"".join(parts)
+        return memoryview(data) if self._zero_copy else data
+
+    def _skip_bytes(self, size):
+        end = self._pos + size
+        if end <= len(self._buf):
+            self._pos = end
+            return
+        need = end - len(self._buf)
+        self._base += len(self._buf) + need
+        self._buf = b""
+        self._pos = 0
+        skip_bytes(self._fp, need)
+
+    def _startswith_crlf(self):
+        while len(self._buf) - self._pos < 2:
+            if not self._fill():
+                break
+        return self._buf[self._pos : self._pos + 2] == b"\r\n"
+
+    def _read_data(self, size, http_header, skip=False):
+        if size < 0 or self._url_latest is not None:
+            return None
+
+        # compat invalid format: no http headers but write two '\r\n'
+        crlf = not http_header and size >= 2 and self._startswith_crlf()
+        if crlf:
+            self._pos += 2
+
+        if self._skip_data or skip:
+            if size > 0 and not crlf and self._pos >= len(self._buf):
+                if not self._fill():
+                    raise StopIteration
+            self._skip_bytes(size)
+            return None
+
+        data = self._read_bytes(size)
+        if size > 0 and not data and not crlf:
+            raise StopIteration
+        return data
+
+    def _parse_block(self, block, inner, raw):
+        if raw and _raw_block(block, inner):
+            if not inner:
+                return block
+            size = _raw_store_size(block)
+            if size is not None:
+                self._raw_size = size
+                return block
+        return _parse_block(block, inner)
+
+    def _parse_headers(self, buf, pos, raw):
+        end = buf.find(b"\n\n", pos)
+        if end < 0:
+            return _INCOMPLETE
+        elif end == pos:
+            return None
+        inner_header = self._parse_block(buf[pos:end], True, raw)
+        if not inner_header:
+            return None
+        pos = end + 2
+        if buf[pos : pos + 2] == b"\r\n":
+            return inner_header, {}, pos + 2
+        end = buf.find(b"\r\n\r\n", pos)
+        if end < 0:
+            return _INCOMPLETE
+        http_header = self._parse_block(buf[pos:end], False, raw)
+        if http_header is None:
+            return None
+        return inner_header, http_header, end + 4
+
+    def _rejects_url(self, url):
+        return self._where is not None and not self._where.match_url(url)
+
+    def _rejects_inner_header(self, inner_header):
+        if self._where is None:
+            return False
+        if isinstance(inner_header, bytes):
+            inner_header = parse_header_block(inner_header, True)
+        return not self._where.match_inner_header(inner_header)
+
+    def _store_size(self, inner_header):
+        # Store-Size, -1 if there is none and None if damaged in recover mode
+        value = inner_header.get(STORE_SIZE)
+        if value is None:
+            return -1
+        if not self._recover:
+            return int(value)
+        try:
+            size = int(value)
+        except ValueError:
+            return None
+        return size if size >= 0 else None
+
+    def _read(self):
+        if self._stats is None:
+            return self._read_record()
+        return self._fp.read_record(self._read_record)
+
+    def _read_record(self):
+        url = self._url_latest
+        offset = self._url_latest_offset
+        self._url_latest = None
+        inner_header = {}
+        http_header = {}
+        header = inner_header
+        buf, pos = self._buf, self._pos
+        fast = retry = url is not None
+        # the headers of a record to skip are kept raw when they can be
+        skip = fast and self._rejects_url(url)
+        while True:
+            if fast:
+                headers = self._parse_headers(buf, pos, self._raw or skip)
+                if headers is _INCOMPLETE and retry:
+                    retry = False
+                    self._pos = pos
+                    if self._fill():
+                        buf, pos = self._buf, self._pos
+                        continue
+                fast = False
+                if headers is not None and headers is not _INCOMPLETE:
+                    inner_header, http_header, pos = headers
+                    break
+
+            nl = buf.find(b"\n", pos)
+            if nl < 0:
+                self._pos = pos
+                if self._fill():
+                    buf, pos = self._buf, self._pos
+                    continue
+                if pos >= len(buf):
+                    raise StopIteration
+                nl = len(buf)
+            line = decode_line(buf[pos:nl])
+            start = pos
+            pos = nl + 1
+            if line is None:
+                count(self._stats, "decode_failures")
+                continue
+
+            if header is inner_header:
+                line_length = len(line)
+                if line_length <= 0 and inner_header and url:
+                    header = http_header
+                    continue
+                elif line_length > 1024:
+                    count(self._stats, "skipped_lines")
+                    continue
+                elif simple_check_url(line):
+                    url = line
+                    offset = self._base + start
+                    inner_header = {}
+                    http_header = {}
+                    header = inner_header
+                    fast = retry = True
+                    skip = self._rejects_url(url)
+                    continue
+            elif not line:
+                break
+            elif simple_check_url(line):
+                self._url_latest = line
+                self._url_latest_offset = self._base + start
+                break
+            parse_header_line(line, header)
+
+        self._pos = min(pos, len(buf))
+        self.offset = offset
+        if isinstance(inner_header, bytes):
+            size = self._raw_size
+        else:
+            size = self._store_size(inner_header)
+        if size is None and self._url_latest is not None:
+            size = -1
+        elif size is None:
+            self.resync()
+            self._skipped(offset)
+            return None
+        skip = skip or self._rejects_inner_header(inner_header)
+        data = self._read_data(size, http_header, skip)
+        if self._recover and self._url_latest is None:
+            data = self._recover_data(data, size)
+        if skip:
+            return None
+        if self._record_class is not None:
+            return self._record_class(url, inner_header, http_header, data)
+        return {
+            _URL: url,
+            _INNER_HEADER: inner_header,
+            _HTTP_HEADER: http_header,
+            _DATA: data,
+        }
+
+    def read(self):
+        try:
+            if self._recover:
+                self._skip_garbage()
+            while True:
+                try:
+                    record = self._read()
+                except StopIteration:
+                    return
+                if record is not None:
+                    yield record
+        finally:
+            if self._stats is not None:
+                self._fp.flush()
@@ -0,0 +1,87 @@
+"""Compression codecs of compressed records.
+
+The codec of a compressed record is named by its Codec inner header, zlib
+when there is none.
+"""
+
+import bz2
+import zlib
+from collections import namedtuple
+
+from .default_schema import InnerHeaderKeys as I_KEYS, RecordTypes as R_TYPES
+
+try:
+    import lzma
+except ImportError:  # python 2
+    lzma = None
+
+DEFAULT_CODEC = "zlib"
+
+Codec = namedtuple("Codec", ["compress", "decompress"])
+
+CODECS = {}
+
+
+def register_codec(name, compress, decompress):
+    """Register a codec.
+
+    compress(data, level) gets level None for the codec default.
+    """
+    CODECS[name] = Codec(compress, decompress)
+
+
+def get_codec(name=None):
+    if name is None:
+        name = DEFAULT_CODEC
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            "codec must be one of %s, not %r" % (", ".join(sorted(CODECS)), name)
+        )
+
+
+def decompress(data, codec=None):
+    return get_codec(codec).decompress(data)
+
+
+def decompress_data(inner_header, data):
+    """Return the data of a record as it was before compression.
+
+    ValueError is raised when it can not be decompressed or its size differs
+    from Original-Size.
+    """
+    if data is None or inner_header.get(I_KEYS.TYPE) != R_TYPES.COMPRESSED:
+        return data
+    codec = inner_header.get(I_KEYS.CODEC)
+    try:
+        data = decompress(data, codec)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(
+            "can not decompress data with %s: %s" % (codec or DEFAULT_CODEC, e)
+        )
+    original_size = inner_header.get(I_KEYS.ORIGINAL_SIZE)
+    if original_size is not None and str(len(data)) != str(original_size):
+        raise ValueError(
+            "decompressed %d bytes, %s is %s"
+            % (len(data), I_KEYS.ORIGINAL_SIZE, original_size)
+        )
+    return data
+
+
+register_codec(
+    "zlib",
+    lambda data, level: zlib.compress(data, -1 if level is None else level),
+    zlib.decompress,
+)
+register_codec(
+    "bz2",
+    lambda data, level: bz2.compress(data, 9 if level is None else level),
+    bz2.decompress,
+)
+if lzma is not None:
+    register_codec(
+        "lzma", lambda data, level: lzma.compress(data, preset=level), lzma.decompress
+    )
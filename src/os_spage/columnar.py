@@ -0,0 +1,417 @@
+"""Columnar export of the inner headers of spage records.
+
+Records are exported once to a column file, inner header values parsed
+into numbers, timestamps and dictionary encoded strings, so statistics
+are computed over memory mapped columns without parsing headers again.
+
+The file starts with a header, followed by a directory of its columns
+and the column buffers, all little-endian and aligned on 8 bytes:
+
+    int     int64 per record, -1 if missing or not a number
+    time    int64 unix timestamp per record, -1 if missing or invalid
+    dict    int32 code per record, -1 if missing, and the dictionary of
+            the codes: int64 end offsets of its strings in utf-8 data
+    str     int64 end offset per record of its string in utf-8 data,
+            an empty string if missing
+
+Columns are read with ``ColumnFile``, ``column()`` returns the numbers of
+a column without copying them, e.g. ``numpy.frombuffer(f.column(name),
+dtype='<i8')`` for numpy arrays, ``'<i4'`` for dict codes.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+from .common import DEFAULT_ENCODING
+from .compat import INT64, str_types
+from .default_schema import InnerHeaderKeys as I_KEYS, SpageKeys as S_KEYS
+from .index import fetch_timestamp
+from .spage_reader import SpageReader
+from .where import url_host
+
+COLUMNS_MAGIC = b"SPCL"
+COLUMNS_VERSION = 1
+
+# magic, version, column count, record count
+COLUMNS_HEADER = struct.Struct("<4sHHQ")
+# kind, name length, offset and size of the values, the string end offsets
+# and the string data, followed by the utf-8 name
+COLUMN_ENTRY = struct.Struct("<BxH6Q")
+
+INT, TIME, DICT, STR = 1, 2, 3, 4
+KIND_NAMES = {INT: "int", TIME: "time", DICT: "dict", STR: "str"}
+
+# name, kind, inner header key, None for the url
+COLUMNS = (
+    ("url", STR, None),
+    ("host", DICT, None),
+    ("type", DICT, I_KEYS.TYPE),
+    ("fetch_time", TIME, I_KEYS.FETCH_TIME),
+    ("node_fetch_time", TIME, I_KEYS.NODE_FETCH_TIME),
+    ("original_size", INT, I_KEYS.ORIGINAL_SIZE),
+    ("store_size", INT, I_KEYS.STORE_SIZE),
+    ("batch_id", DICT, I_KEYS.BATCH_ID),
+    ("error_reason", DICT, I_KEYS.ERROR_REASON),
+    ("ip_address", DICT, I_KEYS.IP_ADDRESS),
+    ("fetch_ip", DICT, I_KEYS.FETCH_IP),
+    ("spider_address", DICT, I_KEYS.SPIDER_ADDRESS),
+    ("user_agent", DICT, I_KEYS.USER_AGENT),
+    ("codec", DICT, I_KEYS.CODEC),
+    ("digest", STR, I_KEYS.DIGEST),
+)
+COLUMN_NAMES = [c[0] for c in COLUMNS]
+
+LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _text(value):
+    return value if isinstance(value, str_types) else str(value)
+
+
+def _pad(size):
+    return -size % 8
+
+
+class _Numbers(object):
+    kind = INT
+
+    def __init__(self, key):
+        self._key = key
+        self.values = array(INT64)
+
+    def add(self, url, inner_header):
+        try:
+            value = int(inner_header[self._key])
+        except (KeyError, TypeError, ValueError):
+            value = -1
+        self.values.append(value)
+
+    def buffers(self):
+        return self.values, b"", b""
+
+
+class _Times(_Numbers):
+    kind = TIME
+
+    def __init__(self, key):
+        super(_Times, self).__init__(key)
+        self._hours = {}
+
+    def _timestamp(self, value):
+        # "Thu Mar 01 12:30:15 2018", only the hour is parsed, once
+        if (
+            not isinstance(value, str_types)
+            or len(value) != 24
+            or value[13] != ":"
+            or value[16] != ":"
+            or not (value[14:16] + value[17:19]).isdigit()
+        ):
+            return fetch_timestamp(value)
+        hour = value[:14] + "00:00" + value[19:]
+        start = self._hours.get(hour)
+        if start is None:
+            start = self._hours[hour] = fetch_timestamp(hour)
+        minutes, seconds = int(value[14:16]), int(value[17:19])
+        if start < 0 or minutes > 59 or seconds > 59:
+            return -1
+        return start + minutes * 60 + seconds
+
+    def add(self, url, inner_header):
+        self.values.append(self._timestamp(inner_header.get(self._key)))
+
+
+class _Dictionary(object):
+    kind = DICT
+
+    def __init__(self, key):
+        self._key = key
+        self._codes = {}
+        self.values = array("i")
+
+    def add(self, url, inner_header):
+        value = url_host(url) if self._key is None else inner_header.get(self._key)
+        if value is None:
+            self.values.append(-1)
+            return
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._codes)
+        self.values.append(code)
+
+    def buffers(self):
+        offsets, data = array(INT64), bytearray()
+        for value in sorted(self._codes, key=self._codes.get):
+            data += _text(value).encode(DEFAULT_ENCODING)
+            offsets.append(len(data))
+        return self.values, offsets, data
+
+
+class _Strings(object):
+    kind = STR
+
+    def __init__(self, key):
+        self._key = key
+        self.offsets = array(INT64)
+        self.data = bytearray()
+
+    def add(self, url, inner_header):
+        value = url if self._key is None else inner_header.get(self._key)
+        if value is not None:
+            self.data += _text(value).encode(DEFAULT_ENCODING)
+        self.offsets.append(len(self.data))
+
+    def buffers(self):
+        return b"", self.offsets, self.data
+
+
+BUILDERS = {INT: _Numbers, TIME: _Times, DICT: _Dictionary, STR: _Strings}
+
+
+def select_columns(names=None):
+    """Return the definitions of the named columns, all of them by default."""
+    if names is None:
+        return COLUMNS
+    unknown = set(names) - set(COLUMN_NAMES)
+    if unknown:
+        raise ValueError(
+            "columns must be in %s, not %s"
+            % (", ".join(COLUMN_NAMES), ", ".join(sorted(unknown)))
+        )
+    return tuple(c for c in COLUMNS if c[0] in names)
+
+
+def _little_endian(buf):
+    if LITTLE_ENDIAN or not isinstance(buf, array):
+        return buf
+    buf = array(buf.typecode, buf)
+    buf.byteswap()
+    return buf
+
+
+def _size(buf):
+    if isinstance(buf, array):
+        return len(buf) * buf.itemsize
+    return len(buf)
+
+
+def _write_buffer(f, buf):
+    if isinstance(buf, array):
+        _little_endian(buf).tofile(f)
+    else:
+        f.write(buf)
+
+
+class ColumnWriter(object):
+    """Build the columns of the records added, written to filename on close.
+
+    Columns are kept in memory as arrays until then, about 8 bytes per
+    record and number column, 4 per dict column.
+    """
+
+    def __init__(self, filename, columns=None):
+        if INT64 is None:
+            raise ValueError("no array typecode of 64-bit integers")
+        self._filename = filename
+        self._columns = select_columns(columns)
+        self._builders = [BUILDERS[kind](key) for _, kind, key in self._columns]
+        self._count = 0
+        self._closed = False
+
+    def __len__(self):
+        return self._count
+
+    def add(self, url, inner_header):
+        for builder in self._builders:
+            builder.add(url, inner_header)
+        self._count += 1
+
+    def add_record(self, record):
+        self.add(record[S_KEYS.URL], record[S_KEYS.INNER_HEADER])
+
+    def _layout(self, names):
+        offset = COLUMNS_HEADER.size
+        for name in names:
+            offset += COLUMN_ENTRY.size + len(name)
+        offset += _pad(offset)
+        layout = []
+        for builder in self._builders:
+            entry = []
+            for buf in builder.buffers():
+                size = _size(buf)
+                entry.append((buf, offset if size else 0, size))
+                offset += size + _pad(size)
+            layout.append(entry)
+        return layout
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        names = [name.encode(DEFAULT_ENCODING) for name, _, _ in self._columns]
+        layout = self._layout(names)
+        tmp_filename = "%s.%d" % (self._filename, os.getpid())
+        with open(tmp_filename, "wb") as f:
+            f.write(
+                COLUMNS_HEADER.pack(
+                    COLUMNS_MAGIC, COLUMNS_VERSION, len(names), self._count
+                )
+            )
+            for name, builder, entry in zip(names, self._builders, layout):
+                positions = [v for _, offset, size in entry for v in (offset, size)]
+                f.write(COLUMN_ENTRY.pack(builder.kind, len(name), *positions))
+                f.write(name)
+            for entry in layout:
+                for buf, offset, size in entry:
+                    if size:
+                        f.write(b"\0" * (offset - f.tell()))
+                        _write_buffer(f, buf)
+            f.write(b"\0" * _pad(f.tell()))
+        os.rename(tmp_filename, self._filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def export(records, filename, columns=None):
+    """Write the columns of records, dicts or SpageRecords, to filename.
+
+    Return the number of records exported.
+    """
+    with ColumnWriter(filename, columns) as writer:
+        for record in records:
+            writer.add_record(record)
+    return len(writer)
+
+
+def export_spage(base_filename, filename, columns=None, engine="buffered", **kwargs):
+    """Export the records of a size-rotate-file, read without their data.
+
+    kwargs are passed to ``SpageReader``, e.g. where to export some records.
+    """
+    reader = SpageReader(base_filename, engine=engine, skip_data=True, **kwargs)
+    try:
+        return export(reader.read(), filename, columns)
+    finally:
+        reader.close()
+
+
+class ColumnFile(object):
+    """Memory mapped columns of a file written by ``ColumnWriter``."""
+
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError("%s is not a column file" % filename)
+        try:
+            self._load_directory(filename)
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("%s is not a column file" % filename)
+
+    def _load_directory(self, filename):
+        magic, version, count, self._count = COLUMNS_HEADER.unpack_from(self._map)
+        if magic != COLUMNS_MAGIC or version != COLUMNS_VERSION:
+            raise ValueError(filename)
+        self._columns = OrderedDict()
+        pos = COLUMNS_HEADER.size
+        for _ in range(count):
+            entry = COLUMN_ENTRY.unpack_from(self._map, pos)
+            pos += COLUMN_ENTRY.size
+            name = self._map[pos : pos + entry[1]].decode(DEFAULT_ENCODING)
+            pos += entry[1]
+            if entry[-2] + entry[-1] > len(self._map):
+                raise ValueError(filename)
+            self._columns[name] = (entry[0], entry[2:4], entry[4:6], entry[6:8])
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def kind(self, name):
+        """Return the kind of a column: 'int', 'time', 'dict' or 'str'."""
+        return KIND_NAMES[self._get(name)[0]]
+
+    def _get(self, name):
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise ValueError(
+                "column must be in %s, not %s" % (", ".join(self._columns), name)
+            )
+
+    def _numbers(self, typecode, position):
+        offset, size = position
+        if LITTLE_ENDIAN and hasattr(memoryview, "cast"):
+            return memoryview(self._map)[offset : offset + size].cast(typecode)
+        numbers = array(typecode, self._map[offset : offset + size])
+        if not LITTLE_ENDIAN:
+            numbers.byteswap()
+        return numbers
+
+    def _strings(self, offsets, data):
+        start = data[0]
+        strings = []
+        for end in self._numbers(INT64, offsets):
+            strings.append(self._map[start : data[0] + end].decode(DEFAULT_ENCODING))
+            start = data[0] + end
+        return strings
+
+    def column(self, name):
+        """Return the int64 numbers or int32 dictionary codes of a column.
+
+        The numbers are a view of the mapped file where supported, it is
+        released before the file is closed.
+        """
+        kind, values, _, _ = self._get(name)
+        if kind == STR:
+            raise ValueError("%s is a str column, read it with values()" % name)
+        return self._numbers("i" if kind == DICT else INT64, values)
+
+    def dictionary(self, name):
+        """Return the strings of the codes of a dict column."""
+        kind, _, offsets, data = self._get(name)
+        if kind != DICT:
+            raise ValueError("%s is not a dict column" % name)
+        return self._strings(offsets, data)
+
+    def values(self, name):
+        """Return the values of a column as a list, decoded from dict codes."""
+        kind, _, offsets, data = self._get(name)
+        if kind == STR:
+            return self._strings(offsets, data)
+        numbers = self.column(name)
+        try:
+            if kind != DICT:
+                return list(numbers)
+            strings = self.dictionary(name) + [None]
+            return [strings[code] for code in numbers]
+        finally:
+            if isinstance(numbers, memoryview):
+                numbers.release()
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:  # columns still in use, unmapped once released
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
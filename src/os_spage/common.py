@@ -3,3 +3,16 @@ DEFAULT_ENCODING = "utf-8"
 COLON = ":"
 
 TIME_FORMAT = "%a %b %d %X %Y"
+
+
+def simple_check_url(url):
+    b1 = ":"
+    b2 = "://"
+    if isinstance(url, bytes):
+        b1 = b":"
+        b2 = b"://"
+    if len(url) > 0:
+        t = url.find(b1)
+        if t > 0 and url[t : t + 3] == b2:
+            return True
+    return False
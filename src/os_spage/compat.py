@@ -1,20 +1,67 @@
 import operator
 import sys
+from array import array
 
 PY3 = sys.version_info[0] >= 3
 
 if PY3:
+    from collections.abc import MutableMapping
     from io import StringIO as _StringIO
     from io import BytesIO as _BytesIO
+    from queue import Queue
 
     iteritems = operator.methodcaller("items")
+    str_types = (str,)
 
+    def iter_unpack(s, buffer):
+        return s.iter_unpack(buffer)
 
 else:
+    from collections import MutableMapping
+    from Queue import Queue
     from StringIO import StringIO as _StringIO
     from StringIO import StringIO as _BytesIO
 
     iteritems = operator.methodcaller("iteritems")
+    str_types = (type(b"".decode("ascii")), str)
+
+    def iter_unpack(s, buffer):
+        for offset in range(0, len(buffer), s.size):
+            yield s.unpack_from(buffer, offset)
+
 
 StringIO = _StringIO
 BytesIO = _BytesIO
+
+
+def _isascii(b):
+    try:
+        b.decode("ascii")
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+isascii = getattr(bytes, "isascii", _isascii)
+
+
+def _typecode(typecodes, itemsize):
+    for typecode in typecodes:
+        try:
+            if array(typecode).itemsize == itemsize:
+                return typecode
+        except ValueError:  # "q" and "Q" are Python 3.3+
+            pass
+    return None
+
+
+# array typecodes of 64-bit integers, None where there is none
+INT64 = _typecode("ql", 8)
+UINT64 = _typecode("QL", 8)
+
+
+def uint64_array(values):
+    """Return an array of unsigned 64-bit values, a list without one."""
+    if UINT64 is None:
+        return list(values)
+    return array(UINT64, values)
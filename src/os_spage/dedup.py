@@ -0,0 +1,143 @@
+"""Payload digests of a deduplicating ``SpageWriter``.
+
+The digests of the payloads written are kept in a ``DigestSet``, a table of
+a fixed number of 16 byte slots. A digest is kept in the slot picked by its
+first bytes and replaces the one there, so recent payloads are remembered
+and a digest never matches one that was not added.
+
+The set is saved next to the rotated files, named after the base filename
+with a ``.digests`` suffix, with the size of the files when it was saved. It
+is only loaded back when the files have that size still.
+"""
+
+import hashlib
+import os
+import struct
+from binascii import hexlify, unhexlify
+
+from .segment import list_segments
+
+DIGESTS_SUFFIX = ".digests"
+DIGESTS_MAGIC = b"SPDG"
+DIGESTS_VERSION = 1
+
+# magic, version, reserved, slot count, size of the files when saved
+DIGESTS_HEADER = struct.Struct("<4sHHQQ")
+DIGEST_SIZE = 16
+SLOT = struct.Struct("<Q")
+
+DEFAULT_CAPACITY = 2**20  # 16M of memory
+EMPTY = b"\0" * DIGEST_SIZE
+
+
+def content_digest(data):
+    """Return the Digest of a payload, its md5 as 32 hex characters."""
+    return hashlib.md5(data).hexdigest()
+
+
+def digests_filename(base_filename):
+    return base_filename + DIGESTS_SUFFIX
+
+
+def archive_size(base_filename):
+    try:
+        return sum(os.path.getsize(f) for f in list_segments(base_filename))
+    except (IOError, OSError):
+        return 0
+
+
+class DigestSet(object):
+    """Bounded set of digests, see the module docstring.
+
+    Membership tests and additions are single slice operations, safe from
+    several threads.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self._capacity = capacity
+        self._table = bytearray(DIGEST_SIZE * capacity)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def _slot(self, raw):
+        return SLOT.unpack_from(raw)[0] % self._capacity * DIGEST_SIZE
+
+    def _add(self, raw):
+        pos = self._slot(raw)
+        self._table[pos : pos + DIGEST_SIZE] = raw
+
+    def __contains__(self, digest):
+        raw = unhexlify(digest)
+        pos = self._slot(raw)
+        return self._table[pos : pos + DIGEST_SIZE] == raw
+
+    def add(self, digest):
+        self._add(unhexlify(digest))
+
+    def __len__(self):
+        return sum(1 for _ in self._raw_digests())
+
+    def _raw_digests(self):
+        table = bytes(self._table)
+        for pos in range(0, len(table), DIGEST_SIZE):
+            raw = table[pos : pos + DIGEST_SIZE]
+            if raw != EMPTY:
+                yield raw
+
+    def __iter__(self):
+        for raw in self._raw_digests():
+            yield hexlify(raw).decode("ascii")
+
+    def save(self, base_filename):
+        """Save the set of the rotated files of base_filename next to them."""
+        filename = digests_filename(base_filename)
+        tmp_filename = "%s.%d" % (filename, os.getpid())
+        with open(tmp_filename, "wb") as f:
+            f.write(
+                DIGESTS_HEADER.pack(
+                    DIGESTS_MAGIC,
+                    DIGESTS_VERSION,
+                    0,
+                    self._capacity,
+                    archive_size(base_filename),
+                )
+            )
+            f.write(self._table)
+        os.rename(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, base_filename, capacity=DEFAULT_CAPACITY):
+        """Return the set saved for the rotated files of base_filename.
+
+        An empty set is returned when the file is missing, of another format,
+        or was saved when the rotated files had another size. Digests are
+        moved to new slots when the capacity differs.
+        """
+        digests = cls(capacity)
+        try:
+            with open(digests_filename(base_filename), "rb") as f:
+                raw = f.read()
+        except (IOError, OSError):
+            return digests
+        if len(raw) < DIGESTS_HEADER.size:
+            return digests
+        magic, version, _, saved_capacity, size = DIGESTS_HEADER.unpack_from(raw)
+        if magic != DIGESTS_MAGIC or version != DIGESTS_VERSION:
+            return digests
+        table = raw[DIGESTS_HEADER.size :]
+        if len(table) != saved_capacity * DIGEST_SIZE:
+            return digests
+        if size != archive_size(base_filename):
+            return digests
+        if saved_capacity == capacity:
+            digests._table = bytearray(table)
+            return digests
+        saved = cls(saved_capacity)
+        saved._table = bytearray(table)
+        for raw_digest in saved._raw_digests():
+            digests._add(raw_digest)
+        return digests
@@ -6,6 +6,7 @@ class RecordTypes(object):
     FLAT = "flat"
     DELETED = "deleted"
     COMPRESSED = "compressed"
+    DUPLICATE = "duplicate"  # no data, that of the record with the same Digest
 
 
 class InnerHeaderKeys(object):
@@ -23,6 +24,7 @@ class InnerHeaderKeys(object):
     FETCH_IP = "Fetch-IP"
     NODE_FETCH_TIME = "Node-Fetch-Time"
     ERROR_REASON = "Error-Reason"
+    CODEC = "Codec"
 
 
 INNER_HEADER_SCHEMA = {
@@ -110,6 +112,10 @@ INNER_HEADER_SCHEMA = {
                 InnerHeaderKeys.ERROR_REASON,
                 {"type": "string", "format": "error_reaseon"},
             ),
+            (
+                InnerHeaderKeys.CODEC,
+                {"type": "string"},  # codec of compressed data if not zlib
+            ),
         ]
     ),
 }
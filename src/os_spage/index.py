@@ -0,0 +1,173 @@
+"""Sidecar index files of spage segments.
+
+The index of a segment is stored next to it, named after it with an
+``.idx`` suffix. It starts with a header holding the size of the segment
+when the index was written, followed by one fixed size entry per record
+starting in the segment: url hash, offset of the url line in the segment,
+Store-Size, Type and Fetch-Time.
+"""
+
+import hashlib
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from os_rotatefile.rotatefile import valid_size
+
+from .common import DEFAULT_ENCODING, TIME_FORMAT
+from .compat import iter_unpack
+from .default_schema import InnerHeaderKeys as I_KEYS, RecordTypes as R_TYPES
+from .segment import segment_filename, segment_indexes
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"SPIX"
+INDEX_VERSION = 2
+
+# magic, version, reserved, size of the indexed segment
+INDEX_HEADER = struct.Struct("<4sHHQ")
+# url hash, offset, store size (-1 if no data), type code, fetch time (-1 if unknown)
+INDEX_ENTRY = struct.Struct("<QQqBq")
+
+# segment size of an index not covering all the records of its segment
+INCOMPLETE = 2**64 - 1
+
+TYPE_CODES = {
+    R_TYPES.FLAT: 1,
+    R_TYPES.DELETED: 2,
+    R_TYPES.COMPRESSED: 3,
+    R_TYPES.DUPLICATE: 4,
+}
+CODE_TYPES = dict((v, k) for k, v in TYPE_CODES.items())
+
+IndexEntry = namedtuple(
+    "IndexEntry", ["url_hash", "offset", "store_size", "type", "fetch_time"]
+)
+
+
+def url_hash(url):
+    if not isinstance(url, bytes):
+        url = url.encode(DEFAULT_ENCODING)
+    return struct.unpack("<Q", hashlib.md5(url).digest()[:8])[0]
+
+
+def fetch_timestamp(fetch_time):
+    try:
+        if not isinstance(fetch_time, datetime):
+            fetch_time = datetime.strptime(fetch_time, TIME_FORMAT)
+        return int(time.mktime(fetch_time.timetuple()))
+    except Exception:
+        return -1
+
+
+def index_entry(url, offset, inner_header):
+    try:
+        store_size = int(inner_header.get(I_KEYS.STORE_SIZE, -1))
+    except ValueError:
+        store_size = -1
+    return IndexEntry(
+        url_hash(url),
+        offset,
+        store_size,
+        TYPE_CODES.get(inner_header.get(I_KEYS.TYPE), 0),
+        fetch_timestamp(inner_header.get(I_KEYS.FETCH_TIME)),
+    )
+
+
+def index_filename(filename):
+    return filename + INDEX_SUFFIX
+
+
+def write_index(filename, entries, segment_size=None):
+    if segment_size is None:
+        segment_size = os.path.getsize(filename)
+    tmp_filename = "%s.%d" % (index_filename(filename), os.getpid())
+    with open(tmp_filename, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, segment_size))
+        for entry in entries:
+            f.write(INDEX_ENTRY.pack(*entry))
+    os.rename(tmp_filename, index_filename(filename))
+
+
+def load_index(filename):
+    """Return the entries indexed for a segment file.
+
+    None is returned when the index file is missing, of another format, or
+    was not built from the current content of the segment.
+    """
+    try:
+        with open(index_filename(filename), "rb") as f:
+            raw = f.read()
+    except (IOError, OSError):
+        return None
+    if len(raw) < INDEX_HEADER.size:
+        return None
+    magic, version, _, segment_size = INDEX_HEADER.unpack_from(raw)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+    if segment_size != os.path.getsize(filename):
+        return None
+    body = raw[INDEX_HEADER.size :]
+    if len(body) % INDEX_ENTRY.size:
+        return None
+    return list(map(IndexEntry._make, iter_unpack(INDEX_ENTRY, body)))
+
+
+class IndexWriter(object):
+    """Keep the index files of the segments written by a rotate writer.
+
+    Record positions are derived from the encoded record sizes the same way
+    os-rotatefile rolls segments, so the index file of a segment is closed
+    and the next one opened when the writer rolls.
+    """
+
+    def __init__(self, base_filename, roll_size="1G"):
+        self._base_filename = base_filename
+        self._roll_size = valid_size(roll_size)
+        self._idx = max(segment_indexes(base_filename))
+        filename = segment_filename(base_filename, self._idx)
+        self._size = os.path.getsize(filename)
+        entries = load_index(filename) if self._size > 0 else []
+        self._complete = entries is not None
+        self._fp = None
+        self._open(entries or [])
+
+    def _open(self, entries):
+        filename = segment_filename(self._base_filename, self._idx)
+        self._fp = open(index_filename(filename), "wb")
+        self._fp.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, INCOMPLETE))
+        for entry in entries:
+            self._fp.write(INDEX_ENTRY.pack(*entry))
+
+    def _close(self, segment_size):
+        if not self._complete:
+            segment_size = INCOMPLETE
+        self._fp.seek(0)
+        self._fp.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, segment_size))
+        self._fp.close()
+        self._fp = None
+
+    def _roll(self, size):
+        self._close(self._roll_size)
+        self._idx += 1
+        self._size = size
+        self._complete = True
+        self._open([])
+
+    def add(self, url, inner_header, size):
+        """Index a record of size bytes written just after the previous one."""
+        if self._size >= self._roll_size:
+            self._roll(0)
+        entry = index_entry(url, self._size, inner_header)
+        self._fp.write(INDEX_ENTRY.pack(*entry))
+        self._size += size
+        while self._size > self._roll_size:
+            self._roll(self._size - self._roll_size)
+
+    def flush(self):
+        self._fp.flush()
+
+    def close(self):
+        if self._fp is not None:
+            self._close(self._size)
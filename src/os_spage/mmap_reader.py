@@ -0,0 +1,155 @@
+import mmap
+import os
+from bisect import bisect_left, bisect_right
+
+from .buffered_reader import Reader as BufferedReader
+from .compat import uint64_array
+from .default_schema import SpageKeys as S_KEYS
+from .index import index_entry, load_index, url_hash, write_index
+from .segment import list_segments
+
+
+class SegmentStream(object):
+    """Read-only file-like object over mapped segments, as one stream."""
+
+    def __init__(self, maps, idx=0, pos=0):
+        self._maps = maps
+        self._idx = idx
+        self._pos = pos
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0 and self._idx < len(self._maps):
+            m = self._maps[self._idx]
+            end = len(m) if size < 0 else min(len(m), self._pos + size)
+            if end > self._pos:
+                parts.append(m[self._pos : end])
+                if size > 0:
+                    size -= end - self._pos
+            if end >= len(m):
+                self._idx += 1
+                self._pos = 0
+            else:
+                self._pos = end
+        return b"".join(parts)
+
+
+class MmapSpageReader(object):
+    """Random access to the records of a size-rotate-file.
+
+    Every segment is memory mapped and indexed by a sidecar file named after
+    the segment with an ``.idx`` suffix, see ``os_spage.index``. Missing or
+    out of date index files are rebuilt on open, by scanning from the last
+    record of the closest segment that is still indexed.
+
+    Offsets are positions in the concatenation of all segments, records
+    split by the writer over two segments are read transparently.
+    """
+
+    def __init__(self, base_filename, rebuild=False, block_size="64k"):
+        self._filenames = list_segments(base_filename)
+        self._block_size = block_size
+        self._files = []
+        self._maps = []
+        self._starts = []
+        start = 0
+        for filename in self._filenames:
+            f = open(filename, "rb")
+            self._files.append(f)
+            size = os.fstat(f.fileno()).st_size
+            m = b""
+            if size > 0:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(m)
+            self._starts.append(start)
+            start += size
+        self._size = start
+        self._load_index(rebuild)
+
+    def _stream(self, offset):
+        idx = bisect_right(self._starts, offset) - 1
+        return SegmentStream(self._maps, idx, offset - self._starts[idx])
+
+    def _rebuild_index(self, entries, first):
+        offset = 0
+        for idx in range(first - 1, -1, -1):
+            if entries[idx]:
+                offset = self._starts[idx] + entries[idx][-1].offset
+                break
+        for idx in range(first, len(entries)):
+            entries[idx] = []
+
+        reader = BufferedReader(self._stream(offset))
+        for record in reader.read():
+            record_offset = offset + reader.offset
+            idx = bisect_right(self._starts, record_offset) - 1
+            if idx < first:
+                continue
+            entries[idx].append(
+                index_entry(
+                    record[S_KEYS.URL],
+                    record_offset - self._starts[idx],
+                    record[S_KEYS.INNER_HEADER],
+                )
+            )
+
+        for idx in range(first, len(entries)):
+            try:
+                write_index(
+                    self._filenames[idx],
+                    entries[idx],
+                    segment_size=len(self._maps[idx]),
+                )
+            except (IOError, OSError):  # read only archive, keep it in memory
+                pass
+
+    def _load_index(self, rebuild):
+        entries = [None if rebuild else load_index(f) for f in self._filenames]
+        stale = [idx for idx, e in enumerate(entries) if e is None]
+        if stale:
+            self._rebuild_index(entries, stale[0])
+
+        index = []
+        for idx, segment_entries in enumerate(entries):
+            start = self._starts[idx]
+            index.extend((e.url_hash, start + e.offset) for e in segment_entries)
+        index.sort()
+        self._hashes = uint64_array(i[0] for i in index)
+        self._offsets = uint64_array(i[1] for i in index)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def offsets(self, url):
+        """Offsets of the records of url, oldest first, matched on url hash."""
+        h = url_hash(url)
+        lo = bisect_left(self._hashes, h)
+        hi = bisect_right(self._hashes, h, lo)
+        return [self._offsets[i] for i in range(lo, hi)]
+
+    def at(self, offset):
+        if offset < 0 or offset >= self._size:
+            raise ValueError("offset must be in [0, %d)" % self._size)
+        reader = BufferedReader(self._stream(offset), block_size=self._block_size)
+        return next(reader.read(), None)
+
+    def get(self, url):
+        """Return the last written record of url, None if not found."""
+        for offset in reversed(self.offsets(url)):
+            record = self.at(offset)
+            if record is not None and record[S_KEYS.URL] == url:
+                return record
+        return None
+
+    def read(self):
+        for record in BufferedReader(SegmentStream(self._maps)).read():
+            yield record
+
+    def close(self):
+        for m in self._maps:
+            if m:
+                m.close()
+        for f in self._files:
+            f.close()
+        self._maps = []
+        self._files = []
@@ -1,28 +1,24 @@
 from os_rotatefile import open_file
 
-from .common import COLON, DEFAULT_ENCODING
-from .validator import simple_check_url
+from .base_reader import BaseReader, decode_line, parse_header_line
+from .common import simple_check_url
+from .stats import count
 
 CONTENT_TYPE = "Content-Type"
 
 
-def read(fp):
-    reader = Reader(fp)
+def read(fp, stats=None):
+    reader = Reader(fp, stats)
     for record in reader.read():
         yield record
 
 
-class Reader(object):
-    def __init__(self, fp):
-        self._fp = fp
-        self._url_latest = None
-        self._reset()
-
+class Reader(BaseReader):
     def _reset(self):
         self._url = self._url_latest
         self._header = {}
         self._data = {}
-        self._read = self._read_header
+        self._on_line = self._on_header_line
         self._url_latest = None
 
     def _generate(self):
@@ -32,29 +28,22 @@ class Reader(object):
         d[u"data"] = self._data
         return d
 
-    def _read_header(self):
-        line = self._fp.readline()
-        if not line:
-            raise StopIteration
-        try:
-            line = line.decode(DEFAULT_ENCODING).strip()
-        except Exception:
-            return self._read()
+    def _on_header_line(self, line):
+        line = decode_line(line)
+        if line is None:
+            count(self._stats, "decode_failures")
+            return False
         line_length = len(line)
         if line_length <= 0 and self._header:
-            self._read = self._read_data
+            return True
         elif line_length > 1024:
-            pass
+            count(self._stats, "skipped_lines")
         elif simple_check_url(line):
             self._reset()
             self._url = line
         else:
-            d = line.find(COLON)
-            if d > 0:
-                key = line[0:d].strip()
-                value = line[d + 1 :].strip()
-                self._header[key] = value
-        return self._read()
+            parse_header_line(line, self._header)
+        return False
 
     def _split_series(self, series):
         s = [tuple(i.split(",")) for i in series.split(";") if "," in i]
@@ -74,22 +63,15 @@ class Reader(object):
         self._data = data
         return self._generate()
 
-    def read(self):
-        while True:
-            try:
-                yield self._read()
-                self._reset()
-            except StopIteration:
-                return
-
 
 class OffpageReader(object):
-    def __init__(self, base_filename):
+    def __init__(self, base_filename, stats=None):
         self._fp = open_file(base_filename, "r")
+        self._stats = stats
 
     def close(self):
         self._fp.close()
 
     def read(self):
-        for record in read(self._fp):
+        for record in read(self._fp, self._stats):
             yield record
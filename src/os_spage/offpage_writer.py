@@ -0,0 +1,114 @@
+import io
+import os
+
+from os_rotatefile import open_file
+
+from .common import DEFAULT_ENCODING, simple_check_url
+from .compat import iteritems
+from .offpage_reader import CONTENT_TYPE
+
+
+def _check_part(key, part):
+    if not key or "," in key or ";" in key:
+        raise ValueError("invalid data key %r" % key)
+    if not isinstance(part, (bytes, bytearray, memoryview)):
+        raise ValueError(
+            "bytes-like data is required, not {}".format(type(part).__name__)
+        )
+
+
+def encode_head(url, header=None, data=None):
+    """Return the bytes before the data parts of an offpage record.
+
+    Content-Type is generated from data, one in header is ignored.
+    """
+    if not simple_check_url(url):
+        raise ValueError("invalid url %r" % url)
+    lines = [url]
+    for k, v in iteritems(header or {}):
+        k = str(k).strip()
+        if k == CONTENT_TYPE:
+            continue
+        lines.append(": ".join((k, str(v).strip())))
+    series = []
+    for k, part in iteritems(data or {}):
+        _check_part(k, part)
+        series.append("%s, %d;" % (k, len(part)))
+    lines.append("%s: %s" % (CONTENT_TYPE, "".join(series)))
+    lines.append("\n")
+    return "\n".join(lines).encode(DEFAULT_ENCODING)
+
+
+def _iov_max():
+    try:
+        iov_max = os.sysconf("SC_IOV_MAX")
+    except (AttributeError, ValueError, OSError):
+        iov_max = -1
+    return iov_max if iov_max > 0 else 16  # the POSIX minimum
+
+
+IOV_MAX = _iov_max()
+
+# file objects whose fileno is the file written, not a wrapped one as the
+# file of a gzip.GzipFile
+_RAW_FILES = (io.FileIO, io.BufferedWriter, io.BufferedRandom)
+
+
+def _writev(fd, parts):
+    parts = [memoryview(p).cast("B") for p in parts]
+    pos = 0
+    while pos < len(parts):
+        written = os.writev(fd, parts[pos : pos + IOV_MAX])
+        while pos < len(parts) and written >= len(parts[pos]):
+            written -= len(parts[pos])
+            pos += 1
+        if written:
+            parts[pos] = parts[pos][written:]
+
+
+def write_parts(fp, parts):
+    """Write parts in order without joining them.
+
+    Scatter writes of at most IOV_MAX parts are used when fp is a raw binary
+    file, io.FileIO or a buffered one, fp is flushed first. Otherwise each
+    part is written on its own with fp.write.
+    """
+    if isinstance(fp, _RAW_FILES) and hasattr(os, "writev"):
+        try:
+            fd = fp.fileno()
+        except Exception:
+            fd = None
+        if fd is not None:
+            fp.flush()
+            _writev(fd, parts)
+            return
+    for part in parts:
+        fp.write(part)
+
+
+def write(fp, url, header=None, data=None):
+    """Write an offpage record, data is a dict of named bytes-like parts."""
+    head = encode_head(url, header, data)
+    write_parts(fp, [head] + list((data or {}).values()) + [b"\n"])
+
+
+class OffpageWriter(object):
+    """Write offpage records to a size-rotate-file.
+
+    os-rotatefile only takes bytes, so parts of other types are copied.
+    """
+
+    def __init__(self, base_filename, roll_size="1G"):
+        self._fp = open_file(base_filename, "w", roll_size=roll_size)
+
+    def close(self):
+        self._fp.close()
+
+    def write(self, url, header=None, data=None, flush=False):
+        head = encode_head(url, header, data)
+        self._fp.write(head)
+        for part in (data or {}).values():
+            self._fp.write(part if isinstance(part, bytes) else bytes(part))
+        self._fp.write(b"\n")
+        if flush:
+            self._fp.flush()
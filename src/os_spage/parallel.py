@@ -0,0 +1,112 @@
+"""Read the records of a size-rotate-file with a pool of processes.
+
+The concatenation of the segments is cut into chunks of about
+``chunk_size`` bytes, never crossing a segment boundary. A chunk is owned by
+the records whose url line starts in it: a worker reads from the byte before
+the chunk, resynchronizes on the first url line followed by an inner header
+line, see ``buffered_reader.find_record``, and stops at the first record
+starting after the chunk.
+
+A candidate may be a line of a payload, so the first record a worker read
+is checked against the record the worker of the previous chunk stopped at.
+A chunk that did not start there is read again from there, in the caller's
+process, so chunks are yielded once the chunks before them are checked.
+"""
+
+import os
+from bisect import bisect_right
+from multiprocessing import Pool
+
+from os_rotatefile.rotatefile import valid_size
+
+from .buffered_reader import Reader as BufferedReader
+from .segment import SegmentFile, list_segments
+
+
+def _chunks(filenames, chunk_size):
+    starts = []
+    chunks = []
+    start = 0
+    for filename in filenames:
+        starts.append(start)
+        end = start + os.path.getsize(filename)
+        while start < end:
+            chunks.append((start, min(start + chunk_size, end)))
+            start += chunk_size
+        start = end
+    return starts, chunks
+
+
+def _read_chunk(task, at=None):
+    # Return the offsets of the first record read and of the first record
+    # after the chunk, None at the end of the stream, and the results of the
+    # records of the chunk. Records are read from offset at when given.
+    filenames, starts, start, end, func, block_size = task
+    base = max(start - 1, 0) if at is None else at
+    idx = bisect_right(starts, base) - 1
+    stream = SegmentFile(filenames, idx, base - starts[idx])
+    first = following = None
+    results = []
+    try:
+        reader = BufferedReader(stream, block_size=block_size)
+        if at is None and start > 0 and not reader.resync():
+            return first, following, results
+        for record in reader.read():
+            offset = base + reader.offset
+            if first is None:
+                first = offset
+            if offset >= end:
+                following = offset
+                break
+            results.append(record if func is None else func(record))
+    finally:
+        stream.close()
+    return first, following, results
+
+
+def _read_indexed(indexed_task):
+    idx, task = indexed_task
+    return idx, _read_chunk(task)
+
+
+def parallel_read(
+    base_filename,
+    func=None,
+    workers=None,
+    chunk_size="64M",
+    block_size="1M",
+):
+    """Yield func(record) for each record, computed by a pool of workers.
+
+    func must be picklable, records themselves are yielded when it is None.
+    Results come in record order: a chunk can only be checked once the chunks
+    before it are, see the module docstring.
+    """
+    filenames = list_segments(base_filename)
+    starts, chunks = _chunks(filenames, valid_size(chunk_size))
+    tasks = [(filenames, starts, start, end, func, block_size) for start, end in chunks]
+
+    pool = Pool(workers)
+    try:
+        read = {}
+        checked = 0
+        following = 0
+        for idx, chunk in pool.imap_unordered(_read_indexed, enumerate(tasks)):
+            read[idx] = chunk
+            while checked in read:
+                first, next_following, results = read.pop(checked)
+                if checked > 0 and first != following:
+                    if following is None:
+                        next_following, results = None, []
+                    else:
+                        _, next_following, results = _read_chunk(
+                            tasks[checked], at=following
+                        )
+                following = next_following
+                checked += 1
+                for result in results:
+                    yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
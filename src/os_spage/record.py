@@ -0,0 +1,114 @@
+from .buffered_reader import parse_header_block
+from .codec import decompress_data
+from .compat import MutableMapping
+from .default_schema import SpageKeys as S_KEYS
+
+FIELDS = (S_KEYS.URL, S_KEYS.INNER_HEADER, S_KEYS.HTTP_HEADER, S_KEYS.DATA)
+
+
+def decompress_record(record):
+    record[S_KEYS.DATA] = decompress_data(
+        record[S_KEYS.INNER_HEADER], record[S_KEYS.DATA]
+    )
+    return record
+
+
+class LazyDataRecord(MutableMapping):
+    """Mapping over a read record whose data is decompressed on first access."""
+
+    __slots__ = ("_record", "_pending")
+
+    def __init__(self, record):
+        self._record = record
+        self._pending = True
+
+    def __getitem__(self, key):
+        if key == S_KEYS.DATA and self._pending:
+            decompress_record(self._record)
+            self._pending = False
+        return self._record[key]
+
+    def __setitem__(self, key, value):
+        if key == S_KEYS.DATA:
+            self._pending = False
+        self._record[key] = value
+
+    def __delitem__(self, key):
+        if key == S_KEYS.DATA:
+            self._pending = False
+        del self._record[key]
+
+    def __contains__(self, key):
+        return key in self._record
+
+    def __iter__(self):
+        return iter(self._record)
+
+    def __len__(self):
+        return len(self._record)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self._record)
+
+
+class SpageRecord(MutableMapping):
+    """Compact record, a mapping with the keys of the dict records.
+
+    Header blocks the buffered engine keeps as raw bytes are parsed into
+    dicts on first access. Keys can be set but not deleted.
+    """
+
+    __slots__ = ("url", "_inner_header", "_http_header", "data")
+
+    raw_headers = True
+
+    def __init__(self, url, inner_header, http_header, data):
+        self.url = url
+        self._inner_header = inner_header
+        self._http_header = http_header
+        self.data = data
+
+    @property
+    def inner_header(self):
+        if isinstance(self._inner_header, bytes):
+            self._inner_header = parse_header_block(self._inner_header, True)
+        return self._inner_header
+
+    @inner_header.setter
+    def inner_header(self, value):
+        self._inner_header = value
+
+    @property
+    def http_header(self):
+        if isinstance(self._http_header, bytes):
+            self._http_header = parse_header_block(self._http_header, False)
+        return self._http_header
+
+    @http_header.setter
+    def http_header(self, value):
+        self._http_header = value
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("keys of %s can not be deleted" % self.__class__.__name__)
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self))
@@ -0,0 +1,113 @@
+import os
+
+
+def segment_filename(base_filename, idx):
+    return os.path.join(
+        os.path.abspath(os.path.dirname(base_filename)),
+        "%s%d" % (os.path.basename(base_filename), idx),
+    )
+
+
+def segment_indexes(base_filename):
+    """Return the indexes of the existing segments of a size-rotate-file.
+
+    Segments are named the same way as os-rotatefile does: base_filename plus
+    an index without leading zeros.
+    """
+    path = os.path.abspath(os.path.dirname(base_filename))
+    prefix = os.path.basename(base_filename)
+    idxs = set()
+    for x in os.listdir(path):
+        if not x.startswith(prefix):
+            continue
+        idx = x[len(prefix) :]
+        if not idx.isdigit() or (idx.startswith("0") and idx != "0"):
+            continue
+        idxs.add(int(idx))
+    return idxs
+
+
+def list_segments(base_filename):
+    """Return the segment files of a size-rotate-file, in reading order.
+
+    As os-rotatefile reads them, segments are consecutive from the smallest
+    index and a plain file is its own single segment.
+    """
+    if os.path.isfile(base_filename):
+        return [base_filename]
+    idxs = segment_indexes(base_filename)
+    if not idxs:
+        raise IOError("file not found")
+
+    segments = []
+    idx = min(idxs)
+    while idx in idxs:
+        segments.append(segment_filename(base_filename, idx))
+        idx += 1
+    return segments
+
+
+class SegmentFile(object):
+    """Read-only file-like object over segment files, as one stream.
+
+    Only relative forward seeks are supported.
+    """
+
+    def __init__(self, filenames, idx=0, pos=0):
+        self._filenames = filenames
+        self._idx = idx
+        self._pos = pos
+        self._fp = None
+
+    def _current(self):
+        if self._fp is None and self._idx < len(self._filenames):
+            self._fp = open(self._filenames[self._idx], "rb")
+            self._fp.seek(self._pos)
+        return self._fp
+
+    def _next(self):
+        self._fp.close()
+        self._fp = None
+        self._idx += 1
+        self._pos = 0
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0 and self._current() is not None:
+            data = self._fp.read(size)
+            if not data:
+                self._next()
+                continue
+            parts.append(data)
+            if size > 0:
+                size -= len(data)
+        return b"".join(parts)
+
+    def readline(self):
+        parts = []
+        while self._current() is not None:
+            line = self._fp.readline()
+            if not line:
+                self._next()
+                continue
+            parts.append(line)
+            if line[-1:] == b"\n":
+                break
+        return b"".join(parts)
+
+    def seek(self, offset, whence=0):
+        if whence != 1 or offset < 0:
+            raise ValueError("only relative forward seek is supported")
+        while offset > 0 and self._current() is not None:
+            left = os.fstat(self._fp.fileno()).st_size - self._fp.tell()
+            if offset <= left:
+                self._fp.seek(offset, 1)
+                break
+            offset -= left
+            self._next()
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        self._idx = len(self._filenames)
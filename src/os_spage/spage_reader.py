@@ -1,31 +1,144 @@
 from os_rotatefile import open_file
 
-from .common import COLON, DEFAULT_ENCODING
-from .default_schema import InnerHeaderKeys as I_KEYS
-from .validator import simple_check_url
+from .base_reader import BaseReader, decode_line, parse_header_line, skip_bytes
+from .buffered_reader import Reader as BufferedReader
+from .common import simple_check_url
+from .default_schema import InnerHeaderKeys as I_KEYS, SpageKeys as S_KEYS
+from .record import FIELDS, LazyDataRecord, decompress_record
+from .segment import SegmentFile, list_segments
+from .stats import TIMING_SAMPLE, clock, count
+from .where import compile_where
+
+FIELDS_WITHOUT_DATA = FIELDS[:-1]
+
+STORE_SIZE = I_KEYS.STORE_SIZE
+
+
+def __not_supported_engine(fp, **kwargs):
+    raise ValueError("engine must be 'line' or 'buffered'")
+
+
+def _read_fields(fields=None, skip_data=False):
+    if fields is None:
+        return FIELDS_WITHOUT_DATA if skip_data else FIELDS
+    if not set(fields).issubset(FIELDS):
+        raise ValueError("fields must be in %s" % ", ".join(FIELDS))
+    return tuple(fields)
+
+
+def read(
+    fp,
+    engine="line",
+    decompress=False,
+    fields=None,
+    skip_data=False,
+    record_class=None,
+    stats=None,
+    where=None,
+    **kwargs
+):
+    """Read records of spage from fp.
+
+    With decompress=True the data of compressed records is decompressed,
+    with decompress='lazy' only when a record's data is first accessed.
+
+    fields selects the keys of the records, data is skipped without being
+    read when it is not one of them, skip_data=True selects all the others.
+
+    Records are dicts, or built by ``record_class(url, inner_header,
+    http_header, data)``, e.g. ``os_spage.record.SpageRecord``. Those keep
+    all the keys, the data of skipped data is None.
+
+    The buffered engine can skip corrupt parts with recover=True, see
+    ``buffered_reader.Reader``.
+
+    stats, an ``os_spage.stats.Stats``, is updated as records are read and
+    eagerly decompressed.
+
+    where filters the records on url and inner header conditions checked
+    before the rest of a record is read, see ``os_spage.where``.
+    """
+    if kwargs.get("recover") and engine != "buffered":
+        raise ValueError("recover requires engine='buffered'")
+    fields = _read_fields(fields, skip_data)
+    skip_data = S_KEYS.DATA not in fields
+    reader = {"line": Reader, "buffered": BufferedReader}.get(
+        engine, __not_supported_engine
+    )(
+        fp,
+        skip_data=skip_data,
+        record_class=record_class,
+        stats=stats,
+        where=compile_where(where),
+        **kwargs
+    )
+    records = reader.read()
+    if decompress == "lazy" and not skip_data:
+        records = (LazyDataRecord(record) for record in records)
+    elif decompress and not skip_data and stats is not None:
+        records = _decompress_timed(records, stats)
+    elif decompress and not skip_data:
+        records = (decompress_record(record) for record in records)
+    if fields != FIELDS and record_class is None:
+        records = (dict((k, record[k]) for k in fields) for record in records)
+    for record in records:
+        yield record
 
 
-def read(fp):
-    reader = Reader(fp)
-    for record in reader.read():
-        yield record
+def _decompress_timed(records, stats):
+    counters = {"stored_bytes": 0, "original_bytes": 0}
+    timers = {"decompress": 0.0}
+    try:
+        for idx, record in enumerate(records, 1):
+            stored = record[S_KEYS.DATA]
+            start = clock()
+            record = decompress_record(record)
+            timers["decompress"] += clock() - start
+            if stored is not None:
+                counters["stored_bytes"] += len(stored)
+                counters["original_bytes"] += len(record[S_KEYS.DATA])
+            if idx % TIMING_SAMPLE == 0:
+                stats.add(counters, timers)
+                counters = dict.fromkeys(counters, 0)
+                timers = {"decompress": 0.0}
+            yield record
+    finally:
+        stats.add(counters, timers)
 
 
-class Reader(object):
-    def __init__(self, fp):
-        self._fp = fp
-        self._url_latest = None
-        self._reset()
+class Reader(BaseReader):
+    """Line engine.
+
+    With ``where``, an ``os_spage.where.Where``, the headers of records
+    failing its url conditions are not parsed, only Store-Size and what
+    tells the end of a header block, and the data of records failing any
+    condition is skipped. Those records are not returned.
+    """
+
+    def __init__(self, fp, skip_data=False, record_class=None, stats=None, where=None):
+        self._skip_data = skip_data
+        self._record_class = record_class
+        self._where = where
+        super(Reader, self).__init__(fp, stats)
 
     def _reset(self):
         self._url = self._url_latest
         self._inner_header = {}
         self._http_header = {}
         self._data = None
-        self._read = self._read_inner_header
+        self._on_line = self._on_inner_header_line
         self._url_latest = None
+        self._skip = (
+            self._where is not None
+            and self._url is not None
+            and not self._where.match_url(self._url)
+        )
 
     def _generate(self):
+        if self._record_class is not None:
+            return self._record_class(
+                self._url, self._inner_header, self._http_header, self._data
+            )
         d = {}
         d[u"url"] = self._url
         d[u"inner_header"] = self._inner_header
@@ -33,56 +146,55 @@ class Reader(object):
         d[u"data"] = self._data
         return d
 
-    def _read_inner_header(self):
-        line = self._fp.readline()
-        if not line:
-            raise StopIteration
-        try:
-            line = line.decode(DEFAULT_ENCODING).strip()
-        except Exception:
-            return self._read()
+    def _on_inner_header_line(self, line):
+        line = decode_line(line)
+        if line is None:
+            count(self._stats, "decode_failures")
+            return False
         line_length = len(line)
         if line_length <= 0 and self._inner_header and self._url:
-            self._read = self._read_http_header
+            self._on_line = self._on_http_header_line
+            if not self._skip and self._where is not None:
+                self._skip = not self._where.match_inner_header(self._inner_header)
         elif line_length > 1024:
-            pass
+            count(self._stats, "skipped_lines")
         elif simple_check_url(line):
             self._reset()
             self._url = line
-        else:
-            d = line.find(COLON)
-            if d > 0:
-                key = line[0:d].strip()
-                value = line[d + 1 :].strip()
-                self._inner_header[key] = value
-        return self._read()
-
-    def _read_http_header(self):
-        line = self._fp.readline()
+            if self._where is not None:
+                self._skip = not self._where.match_url(line)
+        elif not self._skip or not self._inner_header or line.startswith(STORE_SIZE):
+            parse_header_line(line, self._inner_header)
+        return False
+
+    def _on_http_header_line(self, line):
+        line = decode_line(line)
+        if line is None:
+            count(self._stats, "decode_failures")
+            return False
         if not line:
-            raise StopIteration
-        try:
-            line = line.decode(DEFAULT_ENCODING).strip()
-        except Exception:
-            return self._read()
-        if not line:
-            self._read = self._read_data
+            return True
         elif simple_check_url(line):
             self._url_latest = line
-            self._read = self._read_data
-        else:
-            d = line.find(COLON)
-            if d > 0:
-                key = line[0:d].strip()
-                value = line[d + 1 :].strip()
-                self._http_header[key] = value
-
-        return self._read()
+            return True
+        if not self._skip or not self._http_header:
+            parse_header_line(line, self._http_header)
+        return False
 
     def _read_data(self):
         size = int(self._inner_header.get(I_KEYS.STORE_SIZE, -1))
         if size < 0 or self._url_latest is not None:
-            return self._generate()
+            return None if self._skip else self._generate()
+
+        if self._skip_data or self._skip:
+            head = self._fp.read(min(size, 2))
+            if size > 0 and not head:
+                raise StopIteration
+            if not self._http_header and head == b"\r\n":
+                skip_bytes(self._fp, size)
+            else:
+                skip_bytes(self._fp, size - len(head))
+            return None if self._skip else self._generate()
 
         data = self._fp.read(size)
         if size > 0 and not data:
@@ -97,22 +209,26 @@ class Reader(object):
         self._data = data
         return self._generate()
 
-    def read(self):
-        while True:
-            try:
-                yield self._read()
-                self._reset()
-            except StopIteration:
-                return
-
 
 class SpageReader(object):
-    def __init__(self, base_filename):
-        self._fp = open_file(base_filename, "r")
+    """Read the records of a size-rotate-file.
+
+    When data is skipped the segments are read through ``SegmentFile``,
+    which seeks over data instead of reading it.
+    """
+
+    def __init__(self, base_filename, engine="line", **kwargs):
+        fields = _read_fields(kwargs.get("fields"), kwargs.get("skip_data", False))
+        if S_KEYS.DATA in fields:
+            self._fp = open_file(base_filename, "r")
+        else:
+            self._fp = SegmentFile(list_segments(base_filename))
+        self._engine = engine
+        self._kwargs = kwargs
 
     def close(self):
         self._fp.close()
 
     def read(self):
-        for record in read(self._fp):
+        for record in read(self._fp, engine=self._engine, **self._kwargs):
             yield record
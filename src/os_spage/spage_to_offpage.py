@@ -1,30 +1,35 @@
+import struct
 import zlib
 
 from os_rotatefile import open_file
+from os_rotatefile.rotatefile import valid_size
 
+from .base_reader import BaseReader
+from .codec import decompress
+from .common import DEFAULT_ENCODING, simple_check_url
 from .compat import BytesIO
-from .validator import simple_check_url
+from .offpage_writer import write_parts
+from .stats import clock, count
 
+CHUNK_SIZE = 64 * 1024
+ADLER_BASE = 65521
 
-def read(fp):
-    reader = Reader(fp)
+
+def read(fp, stats=None):
+    reader = Reader(fp, stats)
     for record in reader.read():
         yield record
 
 
-class Reader(object):
-    def __init__(self, fp):
-        self._fp = fp
-        self._url_latest = None
-        self._store_size = 0
-        self._reset()
-
+class Reader(BaseReader):
     def _reset(self):
         self._url = self._url_latest
         self._store_size = 0
+        self._codec = None
+        self._original_size = None
         self._inner_header = BytesIO()
         self._data = BytesIO()
-        self._read = self._read_inner_header
+        self._on_line = self._on_inner_header_line
         self._url_latest = None
 
     def _generate(self):
@@ -39,7 +44,10 @@ class Reader(object):
         data = self._data.read()
         original_size = len(data)
         if original_size > 0:
+            start = clock()
             data = zlib.compress(data)
+            if self._stats is not None:
+                self._stats.add_time("compress", clock() - start)
         store_size = len(data)
         out.write(b"Content-Type: snapshot, %d;\n" % store_size)
         out.write(b"Original-Size: snapshot, %d;\n" % original_size)
@@ -50,43 +58,39 @@ class Reader(object):
         out.seek(0)
         return out.read()
 
-    def _read_inner_header(self):
-        line = self._fp.readline()
-        if not line:
-            raise StopIteration
+    def _on_inner_header_line(self, line):
         line = line.strip()
         line_length = len(line)
         if line_length <= 0 and self._inner_header and self._url:
-            self._read = self._read_http_header
+            self._on_line = self._on_http_header_line
         elif line_length > 1024:
-            pass
+            count(self._stats, "skipped_lines")
         elif simple_check_url(line):
             self._reset()
             self._url = line
         else:
             if line.startswith(b"Original-Size:"):
-                pass
+                self._original_size = line.split(b":")[1].strip()
             elif line.startswith(b"Store-Size: "):
                 self._store_size = int(line.split(b":")[1].strip())
+            elif line.startswith(b"Codec:"):
+                codec = line.split(b":")[1].strip()
+                self._codec = codec.decode(DEFAULT_ENCODING, "replace")
             else:
                 self._inner_header.write(line)
                 self._inner_header.write(b"\n")
-        return self._read()
+        return False
 
-    def _read_http_header(self):
-        line = self._fp.readline()
-        if not line:
-            raise StopIteration
+    def _on_http_header_line(self, line):
         nline = line.strip()
         if not nline:
             self._data.write(line)
-            self._read = self._read_data
+            return True
         elif simple_check_url(nline):
             self._url_latest = nline
-            self._read = self._read_data
-        else:
-            self._data.write(line)
-        return self._read()
+            return True
+        self._data.write(line)
+        return False
 
     def _read_data(self):
         if self._store_size <= 0 or self._url_latest is not None:
@@ -94,7 +98,7 @@ class Reader(object):
 
         data = self._fp.read(self._store_size)
         try:
-            data = zlib.decompress(data)
+            data = decompress(data, self._codec)
         except:
             pass
         if self._store_size > 0 and not data:
@@ -109,22 +113,184 @@ class Reader(object):
         self._data.write(data)
         return self._generate()
 
-    def read(self):
-        while True:
-            try:
-                yield self._read()
-                self._reset()
-            except StopIteration:
-                return
+
+def adler32_combine(adler1, adler2, size2):
+    """Adler-32 of a + b from the Adler-32 of a, of b and the size of b."""
+    rem = size2 % ADLER_BASE
+    sum1 = adler1 & 0xFFFF
+    sum2 = ((adler1 >> 16) + (adler2 >> 16) + rem * sum1 - rem) % ADLER_BASE
+    sum1 = (sum1 + (adler2 & 0xFFFF) - 1) % ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+def _zlib_stream(data):
+    # a zlib stream, deflate without preset dictionary, with its trailer
+    if len(data) < 6:
+        return False
+    cmf, flg = bytearray(data[:2])
+    return cmf & 0x0F == 8 and not flg & 0x20 and (cmf << 8 | flg) % 31 == 0
+
+
+def convert(src, dst, passthrough=False, chunk_size=CHUNK_SIZE):
+    """Write the offpage of each spage record of src to dst.
+
+    Return the number of records converted, see ``StreamConverter``.
+    """
+    return sum(1 for _ in StreamConverter(src, dst, passthrough, chunk_size).read())
+
+
+class StreamConverter(Reader):
+    """Write the same offpage as Reader to dst, without whole page copies.
+
+    zlib payloads are piped from a decompressobj into a compressobj
+    chunk_size bytes at a time. The snapshot size precedes it, so the
+    compressed output is kept until the record is written, with scatter
+    writes when dst is a raw binary file, see ``write_parts``.
+
+    With ``passthrough=True`` a zlib payload with an Original-Size is not
+    re-encoded: the compressed http header is flushed to a byte boundary and
+    the payload deflate blocks follow it, with the Adler-32 of the whole
+    snapshot. The payload is decompressed once to check it and its
+    Original-Size, a payload that fails the check is re-encoded as without
+    passthrough. The snapshot bytes differ from a re-encoded one but
+    decompress to the same data.
+    """
+
+    def __init__(self, fp, dst, passthrough=False, chunk_size=CHUNK_SIZE):
+        self._dst = dst
+        self._passthrough = passthrough
+        self._chunk_size = valid_size(chunk_size)
+        super(StreamConverter, self).__init__(fp)
+
+    def _write(self, snapshot, original_size):
+        head = b"".join(
+            [
+                self._url,
+                b"\n",
+                self._inner_header.getvalue(),
+                b"Content-Type: snapshot, %d;\n" % sum(map(len, snapshot)),
+                b"Original-Size: snapshot, %d;\n" % original_size,
+                b"\n",
+            ]
+        )
+        write_parts(self._dst, [head] + snapshot + [b"\n"])
+        return self._url
+
+    def _read_payload(self):
+        """Return the stored payload in chunks of at most chunk_size bytes.
+
+        The whole compressed payload is held in memory, only the
+        decompressed data is streamed.
+        """
+        chunks = []
+        size = self._store_size
+        while size > 0:
+            d = self._fp.read(min(size, self._chunk_size))
+            if not d:
+                break
+            chunks.append(d)
+            size -= len(d)
+        return chunks
+
+    def _compress(self, head, chunks):
+        c = zlib.compressobj()
+        out = [c.compress(head)]
+        out.extend(c.compress(chunk) for chunk in chunks)
+        out.append(c.flush())
+        return [o for o in out if o], len(head) + sum(map(len, chunks))
+
+    def _recompress(self, head, chunks):
+        c = zlib.compressobj()
+        d = zlib.decompressobj()
+        out = [c.compress(head)]
+        size = len(head)
+        for chunk in chunks:
+            while chunk and not d.eof:
+                data = d.decompress(chunk, self._chunk_size)
+                chunk = d.unconsumed_tail
+                size += len(data)
+                out.append(c.compress(data))
+        data = d.flush()
+        if not d.eof:
+            raise zlib.error("incomplete or truncated stream")
+        size += len(data)
+        out.append(c.compress(data))
+        out.append(c.flush())
+        return [o for o in out if o], size
+
+    def _inflated_size(self, chunks):
+        # the size the payload decompresses to, None when it does not, its
+        # Adler-32 trailer included
+        d = zlib.decompressobj()
+        size = 0
+        try:
+            for chunk in chunks:
+                while chunk and not d.eof:
+                    size += len(d.decompress(chunk, self._chunk_size))
+                    chunk = d.unconsumed_tail
+            size += len(d.flush())
+        except zlib.error:
+            return None
+        if not d.eof or d.unused_data:
+            return None
+        return size
+
+    def _splice(self, head, chunks):
+        try:
+            original_size = int(self._original_size)
+        except (TypeError, ValueError):
+            return None
+        payload = b"".join(chunks)
+        if (
+            original_size <= 0
+            or len(payload) != self._store_size
+            or not _zlib_stream(payload)
+            or self._inflated_size(chunks) != original_size
+        ):
+            return None
+        c = zlib.compressobj()
+        prefix = c.compress(head) + c.flush(zlib.Z_SYNC_FLUSH)
+        adler = adler32_combine(
+            zlib.adler32(head) & 0xFFFFFFFF,
+            struct.unpack(">I", payload[-4:])[0],
+            original_size,
+        )
+        snapshot = [prefix, payload[2:-4], struct.pack(">I", adler)]
+        return snapshot, len(head) + original_size
+
+    def _read_data(self):
+        head = self._data.getvalue()
+        if self._store_size <= 0 or self._url_latest is not None:
+            return self._write([zlib.compress(head)] if head else [], len(head))
+        if not head or self._codec not in (None, "zlib"):
+            write_parts(self._dst, [Reader._read_data(self)])
+            return self._url
+
+        chunks = self._read_payload()
+        if not chunks:
+            raise StopIteration
+        if self._passthrough:
+            spliced = self._splice(head, chunks)
+            if spliced is not None:
+                return self._write(*spliced)
+        try:
+            snapshot, size = self._recompress(head, chunks)
+        except zlib.error:
+            snapshot, size = self._compress(head, chunks)
+        else:
+            if size == len(head):
+                raise StopIteration
+        return self._write(snapshot, size)
 
 
 class SpageToOffpage(object):
-    def __init__(self, base_filename):
+    def __init__(self, base_filename, stats=None):
         self._fp = open_file(base_filename, "r")
+        self._stats = stats
 
     def close(self):
         self._fp.close()
 
     def read(self):
-        for record in read(self._fp):
+        for record in read(self._fp, self._stats):
             yield record
@@ -1,20 +1,36 @@
 import abc
 import copy
-import zlib
 from datetime import datetime
 from io import BytesIO
 
 from os_rotatefile import open_file
+from os_rotatefile.rotatefile import valid_size
 
+from .background import BackgroundPipeline
+from .codec import DEFAULT_CODEC, get_codec
 from .common import DEFAULT_ENCODING, TIME_FORMAT
-from .compat import StringIO, iteritems
+from .compat import StringIO, iteritems, str_types
+from .dedup import DEFAULT_CAPACITY, DigestSet, content_digest
 from .default_schema import (
     META_SCHEMA,
     InnerHeaderKeys as I_KEYS,
     RecordTypes as R_TYPES,
     SpageKeys as S_KEYS,
 )
-from .validator import create_validator
+from .index import IndexWriter
+from .stats import StatsBuffer, clock
+from .validator import FastMetaValidator, create_validator
+
+DEFAULT_BATCH_SIZE = valid_size("4M")
+
+# Validators and encoders are shared by the writers of a process, they
+# keep no per record state. Values derived from other schemas are keyed by
+# schema identity, at most SCHEMA_CACHE_SIZE of them.
+SCHEMA_CACHE_SIZE = 64
+_VALIDATORS = {}
+_ENCODERS = {}
+_ALLOWED_KEYS = {}
+_CHECKED_LEVELS = set()
 
 
 class RecordProcessor(object):
@@ -26,14 +42,28 @@ class RecordProcessor(object):
 
 
 class SpageRecordProcessor(RecordProcessor):
-    def __init__(self, validator, compress=True):
+    def __init__(self, validator, compress=True, codec=DEFAULT_CODEC, level=None):
         self._validator = validator
         self._compress = compress
+        self._codec = codec
+        self._level = level
+        self._compress_func = get_codec(codec).compress
+        if (codec, level) in _CHECKED_LEVELS:
+            return
+        try:
+            self._compress_func(b"", level)
+        except Exception as e:
+            raise ValueError("invalid %s level %r: %s" % (codec, level, e))
+        _CHECKED_LEVELS.add((codec, level))
 
     def _compress_data(self, data):
-        return zlib.compress(data)
+        return self._compress_func(data, self._level)
 
-    def process(self, record, **kwargs):
+    def process(self, record, timers=None, **kwargs):
+        """Validate and compress record.
+
+        Stage times are added to timers, a defaultdict(float), when given.
+        """
         if not record[S_KEYS.HTTP_HEADER]:
             record.pop(S_KEYS.HTTP_HEADER)
         inner_header = record[S_KEYS.INNER_HEADER]
@@ -52,7 +82,14 @@ class SpageRecordProcessor(RecordProcessor):
                 inner_header[I_KEYS.ORIGINAL_SIZE] = original_size
                 if self._compress:
                     inner_header[I_KEYS.TYPE] = R_TYPES.COMPRESSED
+                    if self._codec == DEFAULT_CODEC:
+                        inner_header.pop(I_KEYS.CODEC, None)
+                    else:
+                        inner_header[I_KEYS.CODEC] = self._codec
+                    start = clock()
                     data = self._compress_data(data)
+                    if timers is not None:
+                        timers["compress"] += clock() - start
                     store_size = len(data)
                 else:
                     inner_header[I_KEYS.TYPE] = R_TYPES.FLAT
@@ -67,12 +104,15 @@ class SpageRecordProcessor(RecordProcessor):
         else:
             if I_KEYS.TYPE not in inner_header:
                 inner_header[I_KEYS.TYPE] = R_TYPES.FLAT
-            for i in (I_KEYS.ORIGINAL_SIZE, I_KEYS.STORE_SIZE):
-                if i in inner_header:
-                    inner_header.pop(i)
+            if inner_header[I_KEYS.TYPE] != R_TYPES.DUPLICATE:
+                inner_header.pop(I_KEYS.ORIGINAL_SIZE, None)
+            inner_header.pop(I_KEYS.STORE_SIZE, None)
             record.pop(S_KEYS.DATA)
 
+        start = clock()
         self._validator.validate(record)
+        if timers is not None:
+            timers["validate"] += clock() - start
         return record
 
 
@@ -139,6 +179,74 @@ class SpageRecordEncoder(RecordEncoder):
         return o.read()
 
 
+class FastSpageRecordEncoder(SpageRecordEncoder):
+    """Encode records as SpageRecordEncoder does, byte for byte.
+
+    The "key: " prefixes of the allowed inner header keys are built once,
+    the text before the data is encoded with one call and the record is
+    joined once. The last datetime formatted is kept, TIME_FORMAT has no
+    unit below the second.
+    """
+
+    def __init__(self, allowed_inner_header_keys=None):
+        super(FastSpageRecordEncoder, self).__init__(allowed_inner_header_keys)
+        self._prefixes = (
+            [(k, str(k).strip() + ": ") for k in allowed_inner_header_keys]
+            if allowed_inner_header_keys
+            else None
+        )
+        self._time = (None, None)
+
+    def _format_time(self, v):
+        key = v.replace(microsecond=0, tzinfo=None)
+        cached = self._time  # read once, encoders are shared by worker threads
+        if key != cached[0]:
+            cached = self._time = (key, v.strftime(TIME_FORMAT).strip())
+        return cached[1]
+
+    def _inner_header_lines(self, inner_header, lines):
+        prefixes = self._prefixes
+        if prefixes is None:
+            prefixes = [(k, str(k).strip() + ": ") for k in inner_header]
+        for k, prefix in prefixes:
+            if k not in inner_header:
+                continue
+            v = inner_header[k]
+            if v is None:
+                continue
+            if type(v) is int:
+                lines.append(prefix + str(v))
+            elif isinstance(v, datetime):
+                lines.append(prefix + self._format_time(v))
+            else:
+                lines.append(prefix + str(v).strip())
+
+    def dumps(self, record, **kwargs):
+        lines = []
+        self._inner_header_lines(record[S_KEYS.INNER_HEADER], lines)
+        text = [record[S_KEYS.URL], "\n", "\n".join(lines), "\n\n"]
+        http_header = record.get(S_KEYS.HTTP_HEADER, None)
+        if http_header:
+            text.append(
+                "\r\n".join(
+                    [k.strip() + ": " + v.strip() for k, v in iteritems(http_header)]
+                )
+            )
+            text.append("\r\n\r\n")
+        else:
+            text.append("\r\n")
+        head = "".join(text).encode(DEFAULT_ENCODING)
+
+        data = record.get(S_KEYS.DATA, None)
+        if data is None:
+            return head
+        return b"".join((head, data, b"\r\n"))
+
+
+def _same(obj):
+    return obj
+
+
 class RecordWriter(object):
     __metaclass__ = abc.ABCMeta
 
@@ -148,11 +256,30 @@ class RecordWriter(object):
 
 
 class SpageRecordWriter(RecordWriter):
-    def __init__(self, processor, encoder):
+    """Process and encode records.
+
+    The processor sets defaults and sizes in the headers, so they are
+    copied first, shallowly: header values are not modified. With
+    ``copy_headers=False`` the caller hands them over and they are
+    modified in place.
+
+    With ``stats`` the counts are added to it once every TIMING_SAMPLE
+    records, and on ``flush_stats``.
+    """
+
+    def __init__(self, processor, encoder, stats=None, copy_headers=True):
         self._processor = processor
         self._encoder = encoder
+        self._stats = None if stats is None else StatsBuffer(stats)
+        self._copy = copy.copy if copy_headers else _same
 
-    def write(self, f, url, inner_header=None, http_header=None, data=None):
+    def flush_stats(self):
+        """Add the counts of the records since the last batch to stats."""
+        if self._stats is not None:
+            self._stats.flush()
+
+    def encode(self, url, inner_header=None, http_header=None, data=None):
+        """Return the processed record and its encoded bytes."""
         if not isinstance(data, (bytes, type(None))):
             raise ValueError(
                 "bytes-like data is required, not {}".format(type(data).__name__)
@@ -160,43 +287,368 @@ class SpageRecordWriter(RecordWriter):
         record = {}
         record[S_KEYS.URL] = url
         record[S_KEYS.INNER_HEADER] = (
-            {} if inner_header is None else copy.deepcopy(inner_header)
+            {} if inner_header is None else self._copy(inner_header)
         )
         record[S_KEYS.HTTP_HEADER] = (
-            {} if http_header is None else copy.deepcopy(http_header)
+            {} if http_header is None else self._copy(http_header)
         )
         record[S_KEYS.DATA] = data
 
-        record = self._processor.process(record)
-        f.write(self._encoder.dumps(record))
+        if self._stats is None:
+            record = self._processor.process(record)
+            return record, self._encoder.dumps(record)
+        counts = self._stats.get()
+        record = self._processor.process(record, timers=counts.timers)
+        start = clock()
+        encoded = self._encoder.dumps(record)
+        counts.timers["encode"] += clock() - start
+        inner_header = record[S_KEYS.INNER_HEADER]
+        counters = counts.counters
+        counters["records"] += 1
+        counters["stored_bytes"] += int(inner_header.get(I_KEYS.STORE_SIZE, 0))
+        counters["original_bytes"] += int(inner_header.get(I_KEYS.ORIGINAL_SIZE, 0))
+        self._stats.updated(counts)
+        return record, encoded
+
+    def write(self, f, url, inner_header=None, http_header=None, data=None):
+        _, encoded = self.encode(
+            url, inner_header=inner_header, http_header=http_header, data=data
+        )
+        if self._stats is None:
+            f.write(encoded)
+            return
+        start = clock()
+        f.write(encoded)
+        # added with the batch of the record encoded
+        counts = self._stats.get()
+        counts.timers["write"] += clock() - start
+        counts.counters["bytes_written"] += len(encoded)
+
+
+def __not_supported_validator():
+    raise ValueError("validator must be 'fast', 'trusted' or a validator object")
+
+
+def get_validator(validator=None):
+    """Return the shared validator of None, 'fast' or 'trusted', or validator."""
+    if validator is not None and not isinstance(validator, str_types):
+        return validator
+    cached = _VALIDATORS.get(validator, None)
+    if cached is None:
+        cached = {
+            None: lambda: create_validator(META_SCHEMA),
+            "fast": lambda: FastMetaValidator(),
+            "trusted": lambda: FastMetaValidator(check=False),
+        }.get(validator, __not_supported_validator)()
+        cached = _VALIDATORS.setdefault(validator, cached)
+    return cached
+
+
+def __not_supported_encoder():
+    raise ValueError("encoder must be 'fast' or an encoder object")
+
+
+def get_encoder(encoder=None, allowed_inner_header_keys=None):
+    """Return the shared encoder of None or 'fast' and the keys, or encoder."""
+    if encoder is not None and not isinstance(encoder, str_types):
+        return encoder
+    keys = (
+        None if allowed_inner_header_keys is None else tuple(allowed_inner_header_keys)
+    )
+    cached = _ENCODERS.get((encoder, keys), None)
+    if cached is None:
+        cached = {
+            None: lambda: SpageRecordEncoder(keys),
+            "fast": lambda: FastSpageRecordEncoder(keys),
+        }.get(encoder, __not_supported_encoder)()
+        if len(_ENCODERS) >= SCHEMA_CACHE_SIZE:
+            _ENCODERS.clear()
+        cached = _ENCODERS.setdefault((encoder, keys), cached)
+    return cached
+
+
+def allowed_inner_header_keys(schema):
+    """Return the inner header keys of schema, in order."""
+    cached = _ALLOWED_KEYS.get(id(schema), None)
+    if cached is None or cached[0] is not schema:
+        keys = tuple(schema["properties"][S_KEYS.INNER_HEADER]["properties"].keys())
+        if len(_ALLOWED_KEYS) >= SCHEMA_CACHE_SIZE:
+            _ALLOWED_KEYS.clear()
+        cached = _ALLOWED_KEYS[id(schema)] = (schema, keys)
+    return cached[1]
 
 
 def create_writer(**kwargs):
-    validator = kwargs.get("validator", None)
-    validator = create_validator(META_SCHEMA) if validator is None else validator
-    processor = SpageRecordProcessor(validator, kwargs.get("compress", True))
-    allowed_keys = validator.schema["properties"][S_KEYS.INNER_HEADER][
-        "properties"
-    ].keys()
-    encoder = SpageRecordEncoder(allowed_keys)
-    return SpageRecordWriter(processor, encoder)
+    validator = get_validator(kwargs.get("validator", None))
+    stats = kwargs.get("stats", None)
+    processor = SpageRecordProcessor(
+        validator,
+        kwargs.get("compress", True),
+        kwargs.get("codec", DEFAULT_CODEC),
+        kwargs.get("level", None),
+    )
+    encoder = get_encoder(
+        kwargs.get("encoder", None), allowed_inner_header_keys(validator.schema)
+    )
+    return SpageRecordWriter(
+        processor, encoder, stats, kwargs.get("copy_headers", True)
+    )
 
 
 class SpageWriter(object):
-    def __init__(self, base_filename, roll_size="1G", compress=True, validator=None):
+    """Write records to a size-rotate-file.
+
+    With ``buffer_size`` set, encoded records are kept in memory and written
+    with one call once ``buffer_size`` bytes are pending, or on ``flush`` and
+    ``close``. Segments are cut at the same positions either way.
+
+    With ``background=True`` records are validated and compressed by
+    ``workers`` threads and written in order by another one, at most
+    ``queue_size`` of them pending. ``flush`` and ``close`` wait for the
+    pending records, and errors are raised by the next call after them.
+    Headers are copied on ``write``, data must not be modified afterwards.
+
+    With ``stats``, an ``os_spage.stats.Stats``, records are counted and
+    timed as they are validated, compressed, encoded and written. Counts
+    are added to it in batches, and on ``flush`` and ``close``.
+
+    ``encoder="fast"`` selects ``FastSpageRecordEncoder``, same output.
+
+    With ``copy_headers=False`` header dicts passed to ``write`` belong to
+    the writer, which fills them in place instead of copying them.
+
+    With ``dedup=True`` the Digest of records written with data and without
+    a Type is filled with the md5 of the data. Data already written is not
+    written again, the record is written with Type duplicate, Original-Size
+    and no data: its data is that of the last record before it with the
+    same Digest. Written digests are remembered by an
+    ``os_spage.dedup.DigestSet`` of ``dedup_capacity`` slots, saved next to
+    the files on ``close``. In background mode the digest is checked again
+    on the writer thread, a record encoded while one with the same data was
+    pending is encoded there again, without data.
+    """
+
+    def __init__(
+        self,
+        base_filename,
+        roll_size="1G",
+        compress=True,
+        validator=None,
+        index=False,
+        buffer_size=None,
+        codec=DEFAULT_CODEC,
+        level=None,
+        background=False,
+        queue_size=1024,
+        workers=1,
+        stats=None,
+        encoder=None,
+        copy_headers=True,
+        dedup=False,
+        dedup_capacity=DEFAULT_CAPACITY,
+    ):
+        self._base_filename = base_filename
         self._fp = open_file(base_filename, "w", roll_size=roll_size)
-        self._record_writer = create_writer(validator=validator, compress=compress)
+        self._stats = None if stats is None else StatsBuffer(stats)
+        self._record_writer = create_writer(
+            validator=validator,
+            compress=compress,
+            codec=codec,
+            level=level,
+            stats=stats,
+            encoder=encoder,
+            copy_headers=copy_headers,
+        )
+        self._index = IndexWriter(base_filename, roll_size) if index else None
+        self._buffer_size = None if buffer_size is None else valid_size(buffer_size)
+        self._buffer = []
+        self._buffered = 0
+        self._copy = dict if copy_headers else _same
+        self._digests = None
+        self._encode = self._record_writer.encode
+        if dedup:
+            self._digests = DigestSet.load(base_filename, dedup_capacity)
+            self._encode = self._encode_unique
+        self._pipeline = None
+        if background:
+            self._pipeline = BackgroundPipeline(
+                self._encode,
+                self._put,
+                self._flush,
+                queue_size=queue_size,
+                workers=workers,
+            )
+
+    def _write_buffer(self):
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        if self._stats is None:
+            self._fp.write(data)
+            return
+        start = clock()
+        self._fp.write(data)
+        counts = self._stats.get()
+        counts.timers["write"] += clock() - start
+        counts.counters["bytes_written"] += len(data)
+        self._stats.updated(counts)
+
+    def _encode_unique(self, url, inner_header=None, http_header=None, data=None):
+        """Encode a record without its data if written already.
+
+        Return the record, its encoded bytes and the digest of its data when
+        it is written, checked again and remembered by ``_buffer_record``.
+        """
+        digest = None
+        if isinstance(data, bytes) and I_KEYS.TYPE not in (inner_header or {}):
+            start = clock()
+            digest = content_digest(data)
+            inner_header = {} if inner_header is None else self._copy(inner_header)
+            inner_header[I_KEYS.DIGEST] = digest
+            duplicate = digest in self._digests
+            if duplicate:
+                inner_header[I_KEYS.TYPE] = R_TYPES.DUPLICATE
+                inner_header[I_KEYS.ORIGINAL_SIZE] = len(data)
+                data = digest = None
+            if self._stats is not None:
+                counts = self._stats.get()
+                counts.timers["digest"] += clock() - start
+                counts.counters["duplicates"] += int(duplicate)
+                self._stats.updated(counts)
+        record, encoded = self._record_writer.encode(
+            url, inner_header, http_header, data
+        )
+        return record, encoded, digest
+
+    def _encode_duplicate(self, url, record):
+        # a record encoded with its data on a worker thread while a record
+        # before it with the same digest was pending
+        inner_header = dict(record[S_KEYS.INNER_HEADER])
+        store_size = inner_header.pop(I_KEYS.STORE_SIZE)
+        inner_header.pop(I_KEYS.CODEC, None)
+        inner_header[I_KEYS.TYPE] = R_TYPES.DUPLICATE
+        if self._stats is not None:
+            counters = self._stats.get().counters
+            counters["records"] -= 1
+            counters["stored_bytes"] -= store_size
+            counters["original_bytes"] -= inner_header[I_KEYS.ORIGINAL_SIZE]
+            counters["duplicates"] += 1
+        return self._record_writer.encode(
+            url, inner_header, record.get(S_KEYS.HTTP_HEADER)
+        )
+
+    def _buffer_record(self, url, record, encoded, digest=None):
+        if digest is not None and digest in self._digests:
+            record, encoded = self._encode_duplicate(url, record)
+            digest = None
+        if self._index is not None:
+            self._index.add(url, record[S_KEYS.INNER_HEADER], len(encoded))
+        if digest is not None:
+            self._digests.add(digest)
+        self._buffer.append(encoded)
+        self._buffered += len(encoded)
+
+    def _put(self, args, result):
+        self._buffer_record(args[0], *result)
+        if self._buffer_size is None or self._buffered >= self._buffer_size:
+            self._write_buffer()
+
+    def _flush(self):
+        self._write_buffer()
+        self._fp.flush()
+        if self._index is not None:
+            self._index.flush()
+
+    def _flush_stats(self):
+        if self._stats is not None:
+            self._stats.flush()
+        self._record_writer.flush_stats()
+
+    def flush(self):
+        if self._pipeline is not None:
+            self._pipeline.flush()
+        else:
+            self._flush()
+        self._flush_stats()
 
     def close(self):
-        self._fp.close()
+        try:
+            if self._pipeline is not None:
+                self._pipeline.close()
+        finally:
+            self._write_buffer()
+            self._fp.close()
+            if self._index is not None:
+                self._index.close()
+            if self._digests is not None:
+                self._digests.save(self._base_filename)
+            self._flush_stats()
 
     def write(self, url, inner_header=None, http_header=None, data=None, flush=False):
-        self._record_writer.write(
-            self._fp, url, inner_header=inner_header, http_header=http_header, data=data
-        )
-
+        if self._pipeline is not None:
+            self._pipeline.submit(
+                url,
+                None if inner_header is None else self._copy(inner_header),
+                None if http_header is None else self._copy(http_header),
+                data,
+            )
+        else:
+            args = (url, inner_header, http_header, data)
+            self._put(args, self._encode(*args))
+        if flush:
+            self.flush()
+
+    def write_many(self, records, flush=False):
+        """Write records, dicts with the keys of the records read.
+
+        Encoded records are joined and written once per batch of
+        ``buffer_size`` bytes, or of DEFAULT_BATCH_SIZE when not buffered.
+        Records before one failing to encode are still written.
+        """
+        if self._pipeline is not None:
+            for record in records:
+                self.write(
+                    record[S_KEYS.URL],
+                    record.get(S_KEYS.INNER_HEADER),
+                    record.get(S_KEYS.HTTP_HEADER),
+                    record.get(S_KEYS.DATA),
+                )
+            if flush:
+                self.flush()
+            return
+
+        batch_size = self._buffer_size or DEFAULT_BATCH_SIZE
+        try:
+            for record in records:
+                url = record[S_KEYS.URL]
+                self._buffer_record(
+                    url,
+                    *self._encode(
+                        url,
+                        record.get(S_KEYS.INNER_HEADER),
+                        record.get(S_KEYS.HTTP_HEADER),
+                        record.get(S_KEYS.DATA),
+                    )
+                )
+                if self._buffered >= batch_size:
+                    self._write_buffer()
+        finally:
+            if self._buffer_size is None:
+                self._write_buffer()
         if flush:
-            self._fp.flush()
+            self.flush()
+
+
+_default_writer = None
 
 
-write = create_writer().write
+def write(f, url, inner_header=None, http_header=None, data=None):
+    """Write a record to f with the default writer, built on first use."""
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = create_writer()
+    _default_writer.write(
+        f, url, inner_header=inner_header, http_header=http_header, data=data
+    )
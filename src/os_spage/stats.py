@@ -0,0 +1,186 @@
+"""Counters and stage timers of the readers and writers.
+
+Readers and writers given a ``Stats`` object keep their counts and add
+them to it once every TIMING_SAMPLE records, and at the end of the stream
+or on ``flush`` and ``close``. Without one they do not time or count
+anything.
+
+Counters: records, bytes_read, bytes_written, stored_bytes and
+original_bytes (data before and after decompression, or after and before
+compression), decode_failures, skipped_lines (over long header lines),
+resyncs and skipped_bytes (buffered engine), and duplicates (records
+written without their data by a deduplicating writer).
+
+Timers, in seconds: readline, read (block and data reads), parse (the rest
+of reading a record), decompress, validate, compress, digest, encode and
+write. Timing every line would cost as much as reading it, so the readline
+calls of the line engines are timed for one record in TIMING_SAMPLE and
+their time scaled.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from .compat import iteritems
+
+clock = getattr(time, "perf_counter", time.time)
+
+TIMING_SAMPLE = 16
+
+
+class Stats(object):
+    """Counters and cumulative stage times, safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timers = defaultdict(float)
+
+    def add(self, counters=None, timers=None):
+        with self._lock:
+            for k, v in iteritems(counters or {}):
+                self._counters[k] += v
+            for k, v in iteritems(timers or {}):
+                self._timers[k] += v
+
+    def incr(self, name, value=1):
+        self.add(counters={name: value})
+
+    def add_time(self, name, seconds):
+        self.add(timers={name: seconds})
+
+    def snapshot(self):
+        """Return {"counters": {...}, "timers": {...}}, a copy."""
+        with self._lock:
+            return {"counters": dict(self._counters), "timers": dict(self._timers)}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+
+def count(stats, name, value=1):
+    if stats is not None:
+        stats.incr(name, value)
+
+
+class _Counts(object):
+    __slots__ = ("counters", "timers", "updates")
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.updates = 0
+
+
+class StatsBuffer(object):
+    """Counts and times kept per thread, added to stats in batches.
+
+    Callers add to the counters and timers of ``get()`` and call
+    ``updated`` with them, they are added to stats once every
+    TIMING_SAMPLE updates. ``flush`` adds those of all threads, it must be
+    called when no other thread updates them.
+    """
+
+    def __init__(self, stats):
+        self._stats = stats
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def get(self):
+        """Return the counts of the calling thread."""
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = self._local.counts = _Counts()
+            with self._lock:
+                self._all.append(counts)
+            return counts
+
+    def updated(self, counts):
+        counts.updates += 1
+        if counts.updates >= TIMING_SAMPLE:
+            self._add(counts)
+
+    def _add(self, counts):
+        self._stats.add(counts.counters, counts.timers)
+        counts.counters.clear()
+        counts.timers.clear()
+        counts.updates = 0
+
+    def flush(self):
+        with self._lock:
+            for counts in self._all:
+                self._add(counts)
+
+
+class TimedFile(object):
+    """Proxy of a file object timing and counting its reads.
+
+    Record counts and times are kept here and added to stats once every
+    TIMING_SAMPLE records, at the end of the stream and on ``flush``.
+    Readers timing their own calls to ``raw.readline`` add them with
+    ``add_readline``.
+    """
+
+    def __init__(self, fp, stats):
+        self.raw = fp
+        self._stats = stats
+        self._reset()
+
+    def _reset(self):
+        self._records = 0
+        self._bytes = 0
+        self._elapsed = 0.0
+        self._readline_time = 0.0
+        self._read_time = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def add_readline(self, seconds, size):
+        self._readline_time += seconds
+        self._bytes += size
+
+    def readline(self, *args):
+        start = clock()
+        line = self.raw.readline(*args)
+        self.add_readline(clock() - start, len(line))
+        return line
+
+    def read(self, *args):
+        start = clock()
+        data = self.raw.read(*args)
+        self._read_time += clock() - start
+        self._bytes += len(data)
+        return data
+
+    def read_record(self, read):
+        """Return read(), a record, or raise StopIteration at the end."""
+        start = clock()
+        try:
+            record = read()
+        except StopIteration:
+            self._elapsed += clock() - start
+            self.flush()
+            raise
+        self._elapsed += clock() - start
+        self._records += 1
+        if self._records >= TIMING_SAMPLE:
+            self.flush()
+        return record
+
+    def flush(self):
+        io_time = self._readline_time + self._read_time
+        self._stats.add(
+            {"records": self._records, "bytes_read": self._bytes},
+            {
+                "readline": self._readline_time,
+                "read": self._read_time,
+                "parse": self._elapsed - io_time,
+            },
+        )
+        self._reset()
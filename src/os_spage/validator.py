@@ -1,11 +1,16 @@
-import copy
+import numbers
 from datetime import datetime
 
 from jsonschema import Draft4Validator, FormatChecker, validators
-from jsonschema.compat import str_types
 
-from .common import TIME_FORMAT
-from .compat import iteritems
+from .common import TIME_FORMAT, simple_check_url
+from .compat import iteritems, str_types
+from .default_schema import (
+    INNER_HEADER_SCHEMA,
+    META_SCHEMA,
+    InnerHeaderKeys as I_KEYS,
+    SpageKeys as S_KEYS,
+)
 
 
 @FormatChecker.cls_checks("readable_time", raises=ValueError)
@@ -15,18 +20,8 @@ def check_datetime(instance):
     return datetime.strptime(instance, TIME_FORMAT)
 
 
-@FormatChecker.cls_checks("url")
-def simple_check_url(url):
-    b1 = ":"
-    b2 = "://"
-    if isinstance(url, bytes):
-        b1 = b":"
-        b2 = b"://"
-    if len(url) > 0:
-        t = url.find(b1)
-        if t > 0 and url[t : t + 3] == b2:
-            return True
-    return False
+# defined without jsonschema for the readers
+simple_check_url = FormatChecker.cls_checks("url")(simple_check_url)
 
 
 ERROR_TYPES = set(["HTTP", "SSL", "RULE", "SERVER", "DNS"])
@@ -63,13 +58,135 @@ DefaultPropertyDraft4Validator = extend_with_default(Draft4Validator)
 EXTRA_TYPES = {"datetime": datetime, "bytes": bytes}
 
 
+# validators of create_validator without extra types or format checker,
+# keyed by schema identity, at most VALIDATOR_CACHE_SIZE of them
+VALIDATOR_CACHE_SIZE = 64
+_validators = {}
+
+
 def create_validator(schema, extra_types=None, format_checker=None):
-    types = copy.deepcopy(EXTRA_TYPES)
+    """Return a validator of schema filling in the defaults.
+
+    Without extra_types and format_checker, the validator of a schema is
+    built once and shared.
+    """
+    cached = extra_types is None and format_checker is None
+    if cached:
+        item = _validators.get(id(schema), None)
+        if item is not None and item[0] is schema:
+            return item[1]
+
+    types = dict(EXTRA_TYPES)
     if extra_types:
         types.update(extra_types)
     if format_checker is None:
         format_checker = FormatChecker()
-
-    return DefaultPropertyDraft4Validator(
+    validator = DefaultPropertyDraft4Validator(
         schema, types=types, format_checker=format_checker
     )
+    if cached:
+        if len(_validators) >= VALIDATOR_CACHE_SIZE:
+            _validators.clear()
+        _validators[id(schema)] = (schema, validator)
+    return validator
+
+
+_conforms = FormatChecker().conforms
+
+
+def _is_string(instance):
+    return isinstance(instance, str_types)
+
+
+def _is_number(instance):
+    return isinstance(instance, numbers.Number) and not isinstance(instance, bool)
+
+
+def _is_time(instance):
+    if isinstance(instance, datetime):
+        return True
+    return isinstance(instance, str_types) and _conforms(instance, "readable_time")
+
+
+def _is_ipv4(instance):
+    if not isinstance(instance, str_types):
+        return False
+    return instance == "0.0.0.0" or _conforms(instance, "ipv4")
+
+
+_TYPES = INNER_HEADER_SCHEMA["properties"][I_KEYS.TYPE]["enum"]
+
+# INNER_HEADER_SCHEMA rules, Error-Reason has an unknown format so only its
+# type is checked
+INNER_HEADER_CHECKS = {
+    I_KEYS.VERSION: _is_string,
+    I_KEYS.TYPE: lambda v: _is_string(v) and v in _TYPES,
+    I_KEYS.FETCH_TIME: _is_time,
+    I_KEYS.ORIGINAL_SIZE: _is_number,
+    I_KEYS.STORE_SIZE: _is_number,
+    I_KEYS.BATCH_ID: lambda v: _is_string(v) and len(v) >= 3,
+    I_KEYS.ATTACH: _is_string,
+    I_KEYS.IP_ADDRESS: _is_ipv4,
+    I_KEYS.SPIDER_ADDRESS: _is_string,
+    I_KEYS.DIGEST: lambda v: _is_string(v) and len(v) == 32,
+    I_KEYS.USER_AGENT: _is_string,
+    I_KEYS.FETCH_IP: _is_ipv4,
+    I_KEYS.NODE_FETCH_TIME: _is_time,
+    I_KEYS.ERROR_REASON: _is_string,
+    I_KEYS.CODEC: _is_string,
+}
+
+
+class FastMetaValidator(object):
+    """Validator of META_SCHEMA hand-specialized from its rules.
+
+    It applies the same inner header defaults as the jsonschema validator
+    and accepts the same records. The jsonschema validator only runs on
+    invalid records, to raise the same error. With ``check=False`` defaults
+    are applied but records are not checked at all.
+    """
+
+    schema = META_SCHEMA
+
+    def __init__(self, check=True):
+        self._check = check
+        self._defaults = [
+            (k, v["default"])
+            for k, v in iteritems(INNER_HEADER_SCHEMA["properties"])
+            if "default" in v
+        ]
+        self._validator = None
+
+    def _is_valid(self, record):
+        if not isinstance(record, dict):
+            return False
+        if S_KEYS.URL not in record or S_KEYS.INNER_HEADER not in record:
+            return False
+        url = record[S_KEYS.URL]
+        if not isinstance(url, str_types) or not simple_check_url(url):
+            return False
+        inner_header = record[S_KEYS.INNER_HEADER]
+        if not isinstance(inner_header, dict):
+            return False
+        for k, v in iteritems(inner_header):
+            check = INNER_HEADER_CHECKS.get(k, None)
+            if check is not None and not check(v):
+                return False
+        if S_KEYS.HTTP_HEADER in record:
+            if not isinstance(record[S_KEYS.HTTP_HEADER], dict):
+                return False
+        if S_KEYS.DATA in record:
+            if not isinstance(record[S_KEYS.DATA], bytes):
+                return False
+        return True
+
+    def validate(self, record):
+        inner_header = record.get(S_KEYS.INNER_HEADER, None)
+        if isinstance(inner_header, dict):
+            for k, v in self._defaults:
+                if k not in inner_header:
+                    inner_header[k] = v() if callable(v) else v
+        if self._check and not self._is_valid(record):
+            if self._validator is None:
+                self._validator = create_validator(META_SCHEMA)
+            self._validator.validate(record)
@@ -0,0 +1,143 @@
+"""Record filters of ``read(fp, where=...)``.
+
+where is a dict of conditions a record must all meet:
+
+    url_prefix     a url prefix or a tuple of them
+    host           a host or a collection of them, ".example.com" matches
+                   example.com and its subdomains
+    inner_header   {key: condition}, condition a string, a collection of
+                   strings or a callable of the value read, None if missing
+    fetch_time     (since, until), datetimes or None, since <= Fetch-Time < until
+    store_size     (low, high), numbers or None, low <= Store-Size < high
+    original_size  the same for Original-Size
+
+Url conditions are checked on the url line, the others once the inner
+header is read. Records failing them are skipped, their data is not read.
+"""
+
+from datetime import datetime
+
+from .common import TIME_FORMAT
+from .compat import iteritems, str_types
+from .default_schema import InnerHeaderKeys as I_KEYS
+
+URL_KEYS = ("url_prefix", "host")
+HEADER_KEYS = ("inner_header", "fetch_time", "store_size", "original_size")
+
+
+def url_host(url):
+    start = url.find("://") + 3
+    end = len(url)
+    for c in "/?#":
+        d = url.find(c, start, end)
+        if d >= 0:
+            end = d
+    host = url[max(url.rfind("@", start, end) + 1, start) : end]
+    if not host.endswith("]"):  # not an ipv6 address without port
+        d = host.rfind(":")
+        if d >= 0:
+            host = host[:d]
+    return host.lower()
+
+
+def _strings(value):
+    return [value] if isinstance(value, str_types) else [str(v) for v in value]
+
+
+def _url_prefix(prefixes):
+    prefixes = tuple(_strings(prefixes))
+    return lambda url: url.startswith(prefixes)
+
+
+def _host_check(hosts):
+    hosts = [h.lower() for h in _strings(hosts)]
+    exact = frozenset(h.lstrip(".") for h in hosts)
+    suffixes = tuple(h for h in hosts if h.startswith("."))
+
+    def check(url):
+        host = url_host(url)
+        return host in exact or host.endswith(suffixes)
+
+    return check
+
+
+def _value_check(key, condition):
+    if callable(condition):
+        return lambda header: condition(header.get(key))
+    values = frozenset(_strings(condition))
+    return lambda header: header.get(key) in values
+
+
+def _range_check(key, bounds, convert):
+    low, high = bounds
+
+    def check(header):
+        try:
+            value = convert(header[key])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return (low is None or value >= low) and (high is None or value < high)
+
+    return check
+
+
+class _TimeParser(object):
+    # Fetch-Time has second resolution and records come in fetch order, the
+    # last one parsed is kept
+    def __init__(self):
+        self._last = (None, None)
+
+    def __call__(self, value):
+        last = self._last
+        if value != last[0]:
+            last = self._last = (value, datetime.strptime(value, TIME_FORMAT))
+        return last[1]
+
+
+class Where(object):
+    """Compiled where conditions, see the module docstring."""
+
+    def __init__(self, where):
+        unknown = set(where) - set(URL_KEYS + HEADER_KEYS)
+        if unknown:
+            raise ValueError(
+                "where keys must be in %s, not %s"
+                % (", ".join(URL_KEYS + HEADER_KEYS), ", ".join(sorted(unknown)))
+            )
+        self._url_checks = []
+        if where.get("url_prefix") is not None:
+            self._url_checks.append(_url_prefix(where["url_prefix"]))
+        if where.get("host") is not None:
+            self._url_checks.append(_host_check(where["host"]))
+
+        self._header_checks = []
+        for k, condition in iteritems(where.get("inner_header") or {}):
+            self._header_checks.append(_value_check(k, condition))
+        for name, key, convert in (
+            ("fetch_time", I_KEYS.FETCH_TIME, _TimeParser()),
+            ("store_size", I_KEYS.STORE_SIZE, float),
+            ("original_size", I_KEYS.ORIGINAL_SIZE, float),
+        ):
+            if where.get(name) is not None:
+                self._header_checks.append(_range_check(key, where[name], convert))
+
+    def match_url(self, url):
+        for check in self._url_checks:
+            if not check(url):
+                return False
+        return True
+
+    def match_inner_header(self, inner_header):
+        for check in self._header_checks:
+            if not check(inner_header):
+                return False
+        return True
+
+
+def compile_where(where):
+    """Return a Where of where, a dict, a Where or None."""
+    if where is None or isinstance(where, Where):
+        return where
+    if not isinstance(where, dict):
+        raise ValueError("where must be a dict")
+    return Where(where)
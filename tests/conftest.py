@@ -0,0 +1,5 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append("test_aio.py")
@@ -0,0 +1,110 @@
+import asyncio
+import socket
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+
+from os_spage import read, write
+from os_spage.aio import AsyncSpageWriter, read as aread
+from os_spage.default_schema import SpageKeys as S_KEYS
+
+FETCH_TIME = datetime(2019, 1, 2, 3, 4, 5)
+
+RECORDS = [
+    # inner_header, http_header, data
+    (None, None, None),
+    ({"batchID": "test"}, {"k1": "v1"}, b"hello"),
+    ({"batchID": "test"}, {}, b"hello"),
+    ({}, {"k1": "v1"}, b"hello" * 1000),
+    ({"Type": "flat", "Original-Size": 2}, None, b"\r\n"),
+]
+
+
+def records():
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        inner_header = dict(inner_header or {}, **{"Fetch-Time": FETCH_TIME})
+        yield "http://www.test.com/%d" % idx, inner_header, http_header, data
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class AsyncFile(object):
+    def __init__(self):
+        self.s = BytesIO()
+        self.closed = False
+
+    async def write(self, data):
+        self.s.write(data)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("buffer_size", [1, "1M"])
+def test_writer(buffer_size):
+    expected = BytesIO()
+    for url, inner_header, http_header, data in records():
+        write(expected, url, inner_header, http_header, data)
+
+    f = AsyncFile()
+
+    async def main():
+        async with AsyncSpageWriter(f, buffer_size=buffer_size) as w:
+            for url, inner_header, http_header, data in records():
+                await w.write(url, inner_header, http_header, data)
+                assert (f.s.tell() > 0) == (buffer_size == 1)
+
+    run(main())
+    assert f.closed
+    assert f.s.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize("limit", [16, 2**16])
+def test_reader(limit):
+    s = BytesIO()
+    for url, inner_header, http_header, data in records():
+        write(s, url, inner_header, http_header, data)
+    raw = b"garbage\n" + b"x" * 100 + b"\n" + s.getvalue()
+    raw = raw + raw[: len(raw) // 2]
+
+    async def main():
+        reader = asyncio.StreamReader(limit=limit)
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return [r async for r in aread(reader)]
+
+    assert run(main()) == list(read(BytesIO(raw)))
+
+
+def test_stream_over_socket():
+    count = 200
+
+    async def main():
+        rsock, wsock = socket.socketpair()
+        reader, rwriter = await asyncio.open_connection(sock=rsock)
+        wreader, writer = await asyncio.open_connection(sock=wsock)
+
+        async def produce():
+            async with AsyncSpageWriter(writer) as w:
+                for idx in range(count):
+                    await w.write("http://www.test.com/%d" % idx, data=b"x" * 10000)
+
+        async def consume():
+            return [r async for r in aread(reader, decompress=True)]
+
+        _, got = await asyncio.gather(produce(), consume())
+        rwriter.close()
+        return got
+
+    got = run(main())
+    assert [r[S_KEYS.URL] for r in got] == [
+        "http://www.test.com/%d" % i for i in range(count)
+    ]
+    assert all(r[S_KEYS.DATA] == b"x" * 10000 for r in got)
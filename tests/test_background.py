@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+from jsonschema import ValidationError
+
+from os_spage import open_file
+from os_spage.index import load_index
+from os_spage.segment import list_segments
+
+BASE_URL = "http://www.test.com/"
+FETCH_TIME = datetime(2019, 1, 2, 3, 4, 5)
+
+
+def make_records(count):
+    records = []
+    for idx in range(count):
+        data = None if idx % 5 == 0 else ("data%d" % idx).encode() * (idx % 40)
+        records.append(
+            {
+                "url": BASE_URL + str(idx),
+                "inner_header": {"batchID": "test", "Fetch-Time": FETCH_TIME},
+                "http_header": {"k1": "v1"},
+                "data": data,
+            }
+        )
+    return records
+
+
+def dump(filename_prefix):
+    segments = list_segments(filename_prefix)
+    return [open(s, "rb").read() for s in segments], [load_index(s) for s in segments]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("buffer_size", [None, "1k"])
+def test_same_files_as_foreground(tmpdir, workers, buffer_size):
+    records = make_records(200)
+    with tmpdir.as_cwd():
+        f = open_file("expected_", "w", roll_size=700, index=True)
+        f.write_many(records)
+        f.close()
+
+        f = open_file(
+            "background_",
+            "w",
+            roll_size=700,
+            index=True,
+            buffer_size=buffer_size,
+            background=True,
+            queue_size=2,
+            workers=workers,
+        )
+        for record in records[:100]:
+            f.write(**record)
+        f.flush()
+        f.write_many(records[100:])
+        f.close()
+
+        assert dump("background_") == dump("expected_")
+
+
+def test_errors_reported(tmpdir):
+    records = make_records(10)
+    records[3]["url"] = "not url"
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", background=True)
+        f.write_many(records)
+        with pytest.raises(ValidationError):
+            f.flush()
+        f.write(**records[0])
+        f.close()
+
+        f = open_file("test_file_", "w", background=True)
+        f.write(**records[3])
+        with pytest.raises(ValidationError):
+            f.close()
+
+        urls = [r["url"] for r in open_file("test_file_", "r").read()]
+        assert urls == [r["url"] for r in records if r["url"] != "not url"] + [
+            records[0]["url"]
+        ]
+        with pytest.raises(ValueError):
+            open_file("test_file_", "w", background=True, workers=0)
+
+
+def test_closed(tmpdir):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", background=True, index=True)
+        f.write(**make_records(1)[0])
+        f.close()
+        f.close()
+        with pytest.raises(ValueError):
+            f.write(**make_records(1)[0])
+        with pytest.raises(ValueError):
+            f.flush()
+        assert len(list(open_file("test_file_", "r").read())) == 1
@@ -0,0 +1,167 @@
+import zlib
+from io import BytesIO
+
+import pytest
+
+from os_spage import open_file, read, write
+from os_spage.default_schema import SpageKeys as S_KEYS
+from os_spage.stats import Stats
+
+RECORDS = [
+    # inner_header, http_header, data
+    (None, None, None),
+    ({"batchID": "test"}, {"k1": "v1"}, b"hello"),
+    ({"batchID": "test"}, {}, b"hello"),
+    ({"batchID": "test"}, {"Location": "http://www.test.com/"}, None),
+    ({}, {"k1": "v1"}, b"hello" * 1000),
+    ({"Type": "flat", "Original-Size": 2}, None, b"\r\n"),
+]
+
+
+def write_records(f):
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        url = "http://www.test.com/%d" % idx
+        f.write(url, inner_header=inner_header, http_header=http_header, data=data)
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 100, "1M"])
+def test_same_records_as_line_engine(block_size):
+    s = BytesIO()
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        url = "http://www.test.com/%d" % idx
+        write(s, url, inner_header=inner_header, http_header=http_header, data=data)
+    raw = s.getvalue()
+    raw = b"garbage\n\xff\n" + raw + raw[: len(raw) // 2]
+
+    expected = list(read(BytesIO(raw)))
+    records = list(read(BytesIO(raw), engine="buffered", block_size=block_size))
+    assert len(expected) > len(RECORDS)
+    assert records == expected
+
+
+def test_zero_copy(tmpdir):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", roll_size=100)
+        write_records(f)
+        f.close()
+
+        expected = list(open_file("test_file_", "r").read())
+        f = open_file("test_file_", "r", engine="buffered", zero_copy=True)
+        records = list(f.read())
+        f.close()
+
+    assert len(records) == len(RECORDS)
+    for record, e in zip(records, expected):
+        data = record[S_KEYS.DATA]
+        if e[S_KEYS.DATA] is None:
+            assert data is None
+        else:
+            assert isinstance(data, memoryview)
+            record[S_KEYS.DATA] = data.tobytes()
+        assert record == e
+    assert zlib.decompress(records[4][S_KEYS.DATA]) == b"hello" * 1000
+
+
+def test_not_supported_engine():
+    with pytest.raises(ValueError):
+        next(read(BytesIO(), engine="unknown"))
+
+
+def recover(raw, block_size="1M"):
+    skipped = []
+    records = list(
+        read(
+            BytesIO(raw),
+            engine="buffered",
+            block_size=block_size,
+            recover=True,
+            on_skip=lambda start, end: skipped.append((start, end)),
+        )
+    )
+    return records, skipped
+
+
+def spage_records():
+    parts = []
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        s = BytesIO()
+        url = "http://www.test.com/%d" % idx
+        write(s, url, inner_header=inner_header, http_header=http_header, data=data)
+        parts.append(s.getvalue())
+    return parts
+
+
+@pytest.mark.parametrize("block_size", [1, 100, "1M"])
+def test_recover_clean(block_size):
+    raw = b"".join(spage_records())
+    records, skipped = recover(raw, block_size)
+    assert records == list(read(BytesIO(raw)))
+    assert skipped == []
+
+
+@pytest.mark.parametrize("block_size", [1, 100, "1M"])
+def test_recover_garbage(block_size):
+    parts = spage_records()
+    expected = list(read(BytesIO(b"".join(parts))))
+    garbage = b"\x00garbage\nhttp://no.record/\n" * 100
+    raw = garbage + b"".join(parts[:3]) + garbage + b"".join(parts[3:])
+    records, skipped = recover(raw, block_size)
+    assert records == expected
+    start = len(garbage) + len(b"".join(parts[:3]))
+    assert skipped == [(0, len(garbage)), (start, start + len(garbage))]
+
+
+@pytest.mark.parametrize("delta", [-3, 100, 100000])
+def test_recover_store_size(delta):
+    parts = spage_records()
+    expected = list(read(BytesIO(b"".join(parts))))
+    size = len(expected[4][S_KEYS.DATA])
+    parts[4] = parts[4].replace(
+        b"Store-Size: %d" % size, b"Store-Size: %d" % (size + delta)
+    )
+    records, skipped = recover(b"".join(parts))
+    assert records[:4] == expected[:4]
+    assert records[5:] == expected[5:]
+    if delta < 0:
+        assert records[4][S_KEYS.DATA] == expected[4][S_KEYS.DATA][:delta]
+        end = len(b"".join(parts[:5]))
+        assert skipped == [(end - 2 + delta, end)]
+    else:
+        assert records[4][S_KEYS.DATA] == expected[4][S_KEYS.DATA]
+        assert skipped == []
+
+
+@pytest.mark.parametrize("value", [b"1x", b"-5", b""])
+@pytest.mark.parametrize("block_size", [1, "1M"])
+def test_recover_damaged_store_size(value, block_size):
+    parts = spage_records()
+    expected = list(read(BytesIO(b"".join(parts))))
+    size = len(expected[4][S_KEYS.DATA])
+    parts[4] = parts[4].replace(b"Store-Size: %d" % size, b"Store-Size: " + value)
+    stats = Stats()
+    records = list(
+        read(
+            BytesIO(b"".join(parts)),
+            engine="buffered",
+            block_size=block_size,
+            recover=True,
+            stats=stats,
+        )
+    )
+    assert records == expected[:4] + expected[5:]
+    assert stats.snapshot()["counters"]["resyncs"] == 1
+    assert stats.snapshot()["counters"]["skipped_bytes"] == len(parts[4])
+
+
+def test_recover_truncated():
+    parts = spage_records()
+    expected = list(read(BytesIO(b"".join(parts))))
+    raw = b"".join(parts[:4]) + parts[4][:300] + b"\n" + b"".join(parts[5:])
+    records, _ = recover(raw)
+    assert [r[S_KEYS.URL] for r in records] == [r[S_KEYS.URL] for r in expected]
+    assert records[5] == expected[5]
+
+
+def test_recover_engine():
+    with pytest.raises(ValueError):
+        next(read(BytesIO(), recover=True))
@@ -0,0 +1,40 @@
+import pytest
+
+from os_spage import open_file
+from os_spage.codec import CODECS, decompress
+from os_spage.default_schema import InnerHeaderKeys as I_KEYS, SpageKeys as S_KEYS
+
+BASE_URL = "http://www.test.com/"
+DATA = b"hello world " * 100
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+@pytest.mark.parametrize("level", [None, 1, 9])
+def test_write_and_read(tmpdir, codec, level):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", codec=codec, level=level)
+        f.write(BASE_URL + "0", data=DATA)
+        f.write(BASE_URL + "1", inner_header={I_KEYS.CODEC: "unknown"}, data=DATA)
+        f.write(BASE_URL + "2")
+        f.close()
+
+        records = list(open_file("test_file_", "r").read())
+        offpages = list(open_file("test_file_", "r", page_type="s2o").read())
+
+    for record in records[:2]:
+        inner_header = record[S_KEYS.INNER_HEADER]
+        assert inner_header.get(I_KEYS.CODEC) == (None if codec == "zlib" else codec)
+        assert decompress(record[S_KEYS.DATA], inner_header.get(I_KEYS.CODEC)) == DATA
+    assert I_KEYS.CODEC not in records[2][S_KEYS.INNER_HEADER]
+
+    for offpage in offpages[:2]:
+        assert b"Codec:" not in offpage
+        assert b"Original-Size: snapshot, %d;" % (len(DATA) + 2) in offpage
+
+
+def test_invalid_codec_and_level(tmpdir):
+    with tmpdir.as_cwd():
+        with pytest.raises(ValueError):
+            open_file("test_file_", "w", codec="unknown")
+        with pytest.raises(ValueError):
+            open_file("test_file_", "w", level=10)
@@ -0,0 +1,194 @@
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from os_spage import columnar, open_file, read, write
+from os_spage.columnar import (
+    COLUMN_NAMES,
+    ColumnFile,
+    ColumnWriter,
+    export,
+    export_spage,
+)
+from os_spage.index import fetch_timestamp
+
+NOW = datetime(2018, 3, 1, 12, 0, 0)
+
+
+def records():
+    for idx in range(30):
+        inner_header = {
+            "batchID": "b\u00e9%d" % (idx % 3),
+            "Fetch-Time": NOW + timedelta(seconds=idx // 4),
+        }
+        if idx % 5 == 0:
+            inner_header["Error-Reason"] = "timeout"
+            inner_header["IP-Address"] = "10.0.0.%d" % (idx % 2)
+        if idx % 7 == 0:
+            inner_header["Digest"] = "%032x" % idx
+        yield {
+            "url": "http://www%d.example.com:80/\u4e2d%d" % (idx % 2, idx),
+            "inner_header": inner_header,
+            "data": None if idx % 6 == 0 else b"x" * idx,
+        }
+
+
+def written(tmpdir):
+    base = tmpdir.join("spage_").strpath
+    f = open_file(base, "w", roll_size="1k")
+    for record in records():
+        f.write(**record)
+    f.close()
+    return base
+
+
+def check_columns(f, expected):
+    assert len(f) == len(expected)
+    assert f.names == COLUMN_NAMES
+    assert f.values("url") == [r["url"] for r in expected]
+    assert f.values("host") == [
+        "www%d.example.com" % (i % 2) for i in range(len(expected))
+    ]
+    for name, key in (
+        ("batch_id", "batchID"),
+        ("error_reason", "Error-Reason"),
+        ("ip_address", "IP-Address"),
+        ("type", "Type"),
+        ("codec", "Codec"),
+    ):
+        assert f.values(name) == [r["inner_header"].get(key) for r in expected]
+    assert f.values("digest") == [r["inner_header"].get("Digest", "") for r in expected]
+    for name, key in (("store_size", "Store-Size"), ("original_size", "Original-Size")):
+        assert list(f.column(name)) == [
+            int(r["inner_header"].get(key, -1)) for r in expected
+        ]
+    assert list(f.column("fetch_time")) == [
+        fetch_timestamp(r["inner_header"].get("Fetch-Time")) for r in expected
+    ]
+    assert set(f.column("node_fetch_time")) == set([-1])
+
+
+def test_export_spage(tmpdir):
+    base = written(tmpdir)
+    filename = tmpdir.join("columns").strpath
+    expected = list(open_file(base, "r", skip_data=True).read())
+    assert export_spage(base, filename) == len(expected) == 30
+    with ColumnFile(filename) as f:
+        check_columns(f, expected)
+        assert f.kind("error_reason") == "dict"
+        assert f.kind("fetch_time") == "time"
+        assert f.dictionary("error_reason") == ["timeout"]
+        codes = list(f.column("error_reason"))
+        assert codes == [0 if i % 5 == 0 else -1 for i in range(30)]
+        assert sorted(f.dictionary("batch_id")) == ["b\u00e90", "b\u00e91", "b\u00e92"]
+        assert sum(c for c in f.column("original_size") if c > 0) == sum(
+            len(r["data"] or b"") for r in records()
+        )
+        with pytest.raises(ValueError):
+            f.column("url")
+        with pytest.raises(ValueError):
+            f.dictionary("store_size")
+        with pytest.raises(ValueError):
+            f.values("unknown")
+
+
+def test_export_columns(tmpdir):
+    base = written(tmpdir)
+    filename = tmpdir.join("columns").strpath
+    where = {"inner_header": {"batchID": "b\u00e91"}}
+    count = export_spage(
+        base, filename, columns=["store_size", "batch_id"], engine="line", where=where
+    )
+    assert count == 10
+    with ColumnFile(filename) as f:
+        assert f.names == ["store_size", "batch_id"]
+        assert f.values("batch_id") == ["b\u00e91"] * 10
+    with pytest.raises(ValueError):
+        export([], filename, columns=["url", "data"])
+
+
+def test_export_records(tmpdir):
+    filename = tmpdir.join("columns").strpath
+    expected = list(records())
+    assert export(expected, filename, columns=["url", "fetch_time"]) == 30
+    with ColumnFile(filename) as f:
+        assert f.values("url") == [r["url"] for r in expected]
+        assert f.values("fetch_time") == [
+            fetch_timestamp(r["inner_header"]["Fetch-Time"]) for r in expected
+        ]
+
+
+def test_column_writer_empty(tmpdir):
+    filename = tmpdir.join("columns").strpath
+    ColumnWriter(filename).close()
+    with ColumnFile(filename) as f:
+        assert len(f) == 0
+        assert f.values("url") == []
+        assert list(f.column("store_size")) == []
+        assert f.dictionary("host") == []
+
+
+def test_column_writer_invalid_values(tmpdir):
+    filename = tmpdir.join("columns").strpath
+    with ColumnWriter(filename, columns=["store_size", "fetch_time"]) as w:
+        w.add("http://example.com/", {"Store-Size": "x", "Fetch-Time": "now"})
+        w.add("http://example.com/", {"Store-Size": 3})
+        w.add("http://example.com/", {"Fetch-Time": "Thu Mar 01 12:60:00 2018"})
+    with ColumnFile(filename) as f:
+        assert f.values("store_size") == [-1, 3, -1]
+        assert f.values("fetch_time") == [-1, -1, -1]
+
+
+def test_column_writer_error(tmpdir):
+    filename = tmpdir.join("columns")
+    with pytest.raises(KeyError):
+        with ColumnWriter(filename.strpath) as w:
+            w.add_record({"url": "http://example.com/"})
+    assert not filename.exists()
+
+
+def test_column_file_views(tmpdir):
+    filename = tmpdir.join("columns").strpath
+    export(read_records(), filename)
+    f = ColumnFile(filename)
+    sizes = f.column("store_size")
+    f.close()
+    assert list(sizes) == [len(zlib.compress(b"ab"))]
+
+
+def read_records():
+    from io import BytesIO
+
+    s = BytesIO()
+    write(s, "http://example.com/", data=b"ab")
+    s.seek(0)
+    return read(s)
+
+
+def test_not_column_file(tmpdir):
+    for content in (b"", b"SPIX" + b"\0" * 20):
+        filename = tmpdir.join("columns")
+        filename.write_binary(content)
+        with pytest.raises(ValueError):
+            ColumnFile(filename.strpath)
+
+
+def test_int64_typecode(tmpdir, monkeypatch):
+    expected = tmpdir.join("expected").strpath
+    export(records(), expected)
+    if columnar.array("l").itemsize == 8:  # py2 has no "q"
+        monkeypatch.setattr(columnar, "INT64", "l")
+        filename = tmpdir.join("columns").strpath
+        export(records(), filename)
+        assert (
+            tmpdir.join("columns").read_binary()
+            == tmpdir.join("expected").read_binary()
+        )
+        with ColumnFile(filename) as f:
+            assert list(f.column("fetch_time")) == [
+                fetch_timestamp(r["inner_header"]["Fetch-Time"]) for r in records()
+            ]
+    monkeypatch.setattr(columnar, "INT64", None)
+    with pytest.raises(ValueError):
+        ColumnWriter(expected)
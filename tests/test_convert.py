@@ -0,0 +1,103 @@
+import gzip
+import os
+import zlib
+from io import BytesIO
+
+import pytest
+
+from os_spage import convert, offpage_writer, read
+from os_spage.spage_to_offpage import adler32_combine
+from os_spage.spage_writer import create_writer
+
+URL = "http://www.google.com/"
+HTTP_HEADER = {"Content-Type": "text/html"}
+
+
+def spage(**kwargs):
+    writer = create_writer(**kwargs)
+    s = BytesIO()
+    writer.write(s, URL + "0")
+    writer.write(s, URL + "1", http_header=HTTP_HEADER, data=b"<html>" * 50000)
+    writer.write(s, URL + "2", http_header=HTTP_HEADER, data=os.urandom(100000))
+    writer.write(s, URL + "3", data=b"no http header")
+    return s.getvalue()
+
+
+def snapshots(raw):
+    records = read(BytesIO(raw), page_type="offpage")
+    return [zlib.decompress(r["data"]["snapshot"]) for r in records if r["data"]]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compress": False}, {"codec": "bz2"}])
+@pytest.mark.parametrize("chunk_size", [1, 1000, "64k"])
+def test_convert(kwargs, chunk_size):
+    raw = spage(**kwargs)
+    expected = b"".join(read(BytesIO(raw), page_type="s2o"))
+    out = BytesIO()
+    assert convert(BytesIO(raw), out, chunk_size=chunk_size) == 4
+    assert out.getvalue() == expected
+
+
+def test_convert_passthrough():
+    raw = spage()
+    expected = b"".join(read(BytesIO(raw), page_type="s2o"))
+    out = BytesIO()
+    assert convert(BytesIO(raw), out, "spage", "offpage", passthrough=True) == 4
+    assert out.getvalue() != expected
+    assert snapshots(out.getvalue()) == snapshots(expected)
+
+    # the stored payload is reused as is
+    payload = list(read(BytesIO(raw)))[2]["data"]
+    assert payload[2:-4] in out.getvalue()
+
+
+@pytest.mark.parametrize("pos", [-1, 5000])
+def test_convert_passthrough_corrupted(pos):
+    raw = spage()
+    payload = list(read(BytesIO(raw)))[2]["data"]
+    start = raw.index(payload)
+    raw = bytearray(raw)
+    raw[start + pos % len(payload)] ^= 0xFF
+    raw = bytes(raw)
+    expected = BytesIO()
+    convert(BytesIO(raw), expected, "spage", "offpage")
+    out = BytesIO()
+    assert convert(BytesIO(raw), out, "spage", "offpage", passthrough=True) == 4
+    assert snapshots(out.getvalue()) == snapshots(expected.getvalue())
+
+
+def test_convert_file(tmpdir):
+    raw = spage()
+    f = tmpdir.join("offpage.dat")
+    with open(f.strpath, "wb") as fp:
+        convert(BytesIO(raw), fp)
+    assert f.read_binary() == b"".join(read(BytesIO(raw), page_type="s2o"))
+
+
+@pytest.mark.parametrize("passthrough", [False, True])
+@pytest.mark.parametrize("open_func", [open, gzip.open])
+def test_convert_large_page(tmpdir, monkeypatch, open_func, passthrough):
+    # a page of tens of MB is written in more than IOV_MAX parts
+    monkeypatch.setattr(offpage_writer, "IOV_MAX", 4)
+    s = BytesIO()
+    create_writer().write(s, URL, http_header=HTTP_HEADER, data=os.urandom(300000))
+    raw = s.getvalue()
+    f = tmpdir.join("offpage.dat")
+    with open_func(f.strpath, "wb") as fp:
+        convert(BytesIO(raw), fp, passthrough=passthrough, chunk_size=64)
+    with open_func(f.strpath, "rb") as fp:
+        assert snapshots(fp.read()) == snapshots(
+            b"".join(read(BytesIO(raw), page_type="s2o"))
+        )
+
+
+def test_convert_not_supported():
+    with pytest.raises(ValueError):
+        convert(BytesIO(), BytesIO(), "offpage", "spage")
+
+
+def test_adler32_combine():
+    a, b = b"spage", os.urandom(70000)
+    assert adler32_combine(
+        zlib.adler32(a) & 0xFFFFFFFF, zlib.adler32(b) & 0xFFFFFFFF, len(b)
+    ) == (zlib.adler32(a + b) & 0xFFFFFFFF)
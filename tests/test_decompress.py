@@ -0,0 +1,57 @@
+import bz2
+import zlib
+from io import BytesIO
+
+import pytest
+
+from os_spage import open_file, read, write
+from os_spage.default_schema import InnerHeaderKeys as I_KEYS, SpageKeys as S_KEYS
+from os_spage.record import LazyDataRecord
+
+BASE_URL = "http://www.test.com/"
+DATA = b"hello world " * 100
+
+
+def write_records(f):
+    f.write(BASE_URL + "0", data=DATA)
+    f.write(BASE_URL + "1")
+    f.write(BASE_URL + "2", inner_header={"Type": "flat"}, data=DATA)
+
+
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+@pytest.mark.parametrize("decompress", [True, "lazy"])
+def test_decompress(tmpdir, engine, decompress):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", codec="bz2")
+        write_records(f)
+        f.close()
+
+        expected = list(open_file("test_file_", "r").read())
+        f = open_file("test_file_", "r", engine=engine, decompress=decompress)
+        records = list(f.read())
+        f.close()
+
+    assert expected[0][S_KEYS.DATA] == bz2.compress(DATA)
+    expected[0][S_KEYS.DATA] = DATA
+    assert [dict(r) for r in records] == expected
+
+
+def test_lazy_decompress():
+    s = BytesIO()
+    write(s, BASE_URL, data=DATA)
+    raw = s.getvalue().replace(b"Original-Size: 1200", b"Original-Size: 1201")
+
+    record = next(read(BytesIO(raw), decompress="lazy"))
+    assert isinstance(record, LazyDataRecord)
+    assert S_KEYS.DATA in record
+    assert record[S_KEYS.URL] == BASE_URL
+    assert record[S_KEYS.INNER_HEADER][I_KEYS.ORIGINAL_SIZE] == "1201"
+    with pytest.raises(ValueError):
+        record[S_KEYS.DATA]
+    record[S_KEYS.DATA] = b"replaced"
+    assert record.get(S_KEYS.DATA) == b"replaced"
+
+    with pytest.raises(ValueError):
+        next(read(BytesIO(raw), decompress=True))
+    record = next(read(BytesIO(raw)))
+    assert zlib.decompress(record[S_KEYS.DATA]) == DATA
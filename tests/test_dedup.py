@@ -0,0 +1,151 @@
+import hashlib
+
+import pytest
+
+from os_spage import open_file
+from os_spage.dedup import DigestSet, content_digest, digests_filename
+from os_spage.stats import Stats
+
+PAGES = [b"page%d" % (i % 3) for i in range(9)]
+
+
+def digest(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def test_digest_set():
+    digests = DigestSet(capacity=8)
+    assert digest(b"a") not in digests
+    digests.add(digest(b"a"))
+    digests.add(digest(b"b"))
+    assert digest(b"a") in digests
+    assert digest(b"c") not in digests
+    assert len(digests) == 2
+    assert sorted(digests) == sorted([digest(b"a"), digest(b"b")])
+
+    one = DigestSet(capacity=1)
+    one.add(digest(b"a"))
+    one.add(digest(b"b"))
+    assert digest(b"a") not in one
+    assert digest(b"b") in one
+    with pytest.raises(ValueError):
+        DigestSet(capacity=0)
+
+
+def test_digest_set_load(tmpdir):
+    base = tmpdir.join("spage_").strpath
+    tmpdir.join("spage_0").write_binary(b"x")
+    digests = DigestSet(capacity=16)
+    for i in range(10):
+        digests.add(digest(b"%d" % i))
+    digests.save(base)
+
+    assert sorted(DigestSet.load(base, capacity=16)) == sorted(digests)
+    moved = DigestSet.load(base, capacity=1024)
+    assert moved.capacity == 1024
+    assert sorted(moved) == sorted(digests)
+    assert len(DigestSet.load(tmpdir.join("other_").strpath)) == 0
+
+    tmpdir.join("spage_0").write_binary(b"xy")
+    assert len(DigestSet.load(base, capacity=16)) == 0
+    tmpdir.join(digests_filename("spage_")).write_binary(b"SPIX" + b"\0" * 100)
+    assert len(DigestSet.load(base, capacity=16)) == 0
+
+
+def write_pages(base, pages, **kwargs):
+    f = open_file(base, "w", dedup=True, **kwargs)
+    for i, data in enumerate(pages):
+        f.write("http://www.example.com/%d" % i, data=data)
+    f.close()
+
+
+def read_records(base):
+    f = open_file(base, "r", decompress=True)
+    records = list(f.read())
+    f.close()
+    return records
+
+
+def check_references(records, written=()):
+    payloads = dict((digest(data), data) for data in written)
+    for record in records:
+        inner_header = record["inner_header"]
+        if inner_header["Type"] == "duplicate":
+            assert record["data"] is None
+            data = payloads[inner_header["Digest"]]
+            assert int(inner_header["Original-Size"]) == len(data)
+        else:
+            assert inner_header["Digest"] == digest(record["data"])
+            payloads[inner_header["Digest"]] = record["data"]
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"buffer_size": "1k"}, {"background": True, "workers": 3}]
+)
+def test_write_dedup(tmpdir, kwargs):
+    base = tmpdir.join("spage_").strpath
+    write_pages(base, PAGES, roll_size="256", **kwargs)
+    records = read_records(base)
+    assert len(records) == len(PAGES)
+    check_references(records)
+    assert [r["data"] for r in records] == PAGES[:3] + [None] * 6
+    assert tmpdir.join(digests_filename("spage_")).check()
+
+    write_pages(base, [b"page1", b"page3"], **kwargs)
+    records = read_records(base)
+    assert [r["inner_header"]["Type"] for r in records[-2:]] == [
+        "duplicate",
+        "compressed",
+    ]
+    check_references(records)
+
+
+def test_write_dedup_background_stats(tmpdir):
+    base = tmpdir.join("spage_").strpath
+    stats = Stats()
+    write_pages(base, [b"page"] * 20, background=True, workers=4, stats=stats)
+    counters = stats.snapshot()["counters"]
+    assert counters["records"] == 20
+    assert counters["duplicates"] == 19
+    assert counters["original_bytes"] == 20 * len(b"page")
+    records = read_records(base)
+    assert [r["data"] for r in records] == [b"page"] + [None] * 19
+    assert counters["stored_bytes"] == int(records[0]["inner_header"]["Store-Size"])
+
+
+def test_write_dedup_stale_digests(tmpdir):
+    base = tmpdir.join("spage_").strpath
+    write_pages(base, [b"page"])
+    f = open_file(base, "w")
+    f.write("http://www.example.com/", data=b"other")
+    f.close()
+    write_pages(base, [b"page"])
+    assert [r["data"] for r in read_records(base)] == [b"page", b"other", b"page"]
+
+
+def test_write_dedup_typed_records(tmpdir):
+    base = tmpdir.join("spage_").strpath
+    inner_header = {"batchID": "batch"}
+    stats = Stats()
+    f = open_file(base, "w", dedup=True, compress=False, stats=stats)
+    f.write("http://www.example.com/0", inner_header=inner_header, data=b"page")
+    f.write("http://www.example.com/1", inner_header={"Type": "flat"}, data=b"page")
+    f.write("http://www.example.com/2", inner_header=inner_header, data=b"page")
+    f.write("http://www.example.com/3", inner_header=inner_header)
+    f.close()
+    assert inner_header == {"batchID": "batch"}
+    assert stats.snapshot()["counters"]["duplicates"] == 1
+    records = read_records(base)
+    assert [r["inner_header"]["Type"] for r in records] == [
+        "flat",
+        "flat",
+        "duplicate",
+        "flat",
+    ]
+    assert [r["inner_header"]["Digest"] for r in records] == [
+        content_digest(b"page"),
+        "0" * 32,
+        content_digest(b"page"),
+        "0" * 32,
+    ]
+    assert records[2]["inner_header"]["batchID"] == "batch"
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, tzinfo
+
+import pytest
+
+from os_spage import open_file
+from os_spage.spage_writer import (
+    FastSpageRecordEncoder,
+    SpageRecordEncoder,
+    create_writer,
+    get_encoder,
+    get_validator,
+)
+
+NOW = datetime(2018, 3, 1, 12, 30, 15, 500)
+
+
+class TZ(tzinfo):
+    def __init__(self, hours):
+        self._hours = hours
+
+    def __getinitargs__(self):
+        return (self._hours,)
+
+    def utcoffset(self, dt):
+        return timedelta(hours=self._hours)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
+RECORDS = [
+    {"url": "http://www.example.com/"},
+    {"url": "http://www.example.com/", "data": b""},
+    {"url": "http://www.example.com/", "data": b"\r\n<html>\r\n"},
+    {
+        "url": "http://www.example.com/\u4e2d\u6587",
+        "inner_header": {
+            "batchID": " b\u00e9 ",
+            "User-Agent": "Mozilla/5.0",
+            "Fetch-Time": NOW,
+            "Node-Fetch-Time": NOW + timedelta(microseconds=10),
+        },
+        "http_header": {" Content-Type ": " text/html ", "X-\u00e9": "\u00e9"},
+        "data": b"data",
+    },
+    {
+        "url": "http://www.example.com/",
+        "inner_header": {"Fetch-Time": NOW, "Node-Fetch-Time": NOW + timedelta(1)},
+        "data": b"data",
+    },
+    {
+        "url": "http://www.example.com/",
+        "inner_header": {"Fetch-Time": NOW.replace(tzinfo=TZ(0))},
+        "data": b"data",
+    },
+    {
+        "url": "http://www.example.com/",
+        "inner_header": {"Fetch-Time": NOW.replace(tzinfo=TZ(8))},
+        "data": b"data",
+    },
+]
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("record", RECORDS)
+def test_fast_encoder_output(record, compress):
+    default = create_writer(compress=compress)
+    fast = create_writer(compress=compress, encoder="fast")
+    assert fast.encode(**record)[1] == default.encode(**record)[1]
+
+
+@pytest.mark.parametrize("record", RECORDS)
+def test_fast_encoder_without_allowed_keys(record):
+    record = dict(record, inner_header=dict(record.get("inner_header", {})))
+    record["inner_header"]["attach"] = None
+    default, fast = SpageRecordEncoder(), FastSpageRecordEncoder()
+    assert fast.dumps(record) == default.dumps(record)
+
+
+def test_get_encoder():
+    encoder = SpageRecordEncoder()
+    assert get_encoder(encoder) is encoder
+    assert isinstance(get_encoder("fast"), FastSpageRecordEncoder)
+    assert type(get_encoder()) is SpageRecordEncoder
+    with pytest.raises(ValueError):
+        get_encoder("unknown")
+
+
+def test_spage_writer_fast_encoder(tmpdir):
+    files = []
+    for encoder in (None, "fast"):
+        base = tmpdir.join("%s_" % encoder).strpath
+        f = open_file(base, "w", encoder=encoder)
+        for record in RECORDS:
+            f.write(**record)
+        f.close()
+        files.append(tmpdir.join("%s_0" % encoder).read_binary())
+    assert files[0] == files[1]
+
+
+def test_shared_writer_state():
+    first, second = create_writer(encoder="fast"), create_writer(encoder="fast")
+    assert first._encoder is second._encoder
+    assert first._processor._validator is second._processor._validator
+    assert create_writer()._encoder is not first._encoder
+    assert get_validator("fast") is get_validator("fast")
+    assert get_validator("trusted") is not get_validator("fast")
+    assert get_encoder(None, ["a", "b"]) is get_encoder(None, ("a", "b"))
+    with pytest.raises(ValueError):
+        get_validator("unknown")
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+import pytest
+
+import os_spage
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="no module __getattr__")
+def test_import_is_lazy():
+    code = (
+        "import sys, io, os_spage; list(os_spage.read(io.BytesIO())); "
+        "print(' '.join(m for m in ('jsonschema', 'multiprocessing', "
+        "'os_spage.spage_writer') if m in sys.modules))"
+    )
+    assert subprocess.check_output([sys.executable, "-c", code]).strip() == b""
+
+
+def test_lazy_names():
+    from os_spage.parallel import parallel_read
+    from os_spage.spage_writer import SpageWriter
+
+    assert os_spage.parallel_read is parallel_read
+    assert os_spage.SpageWriter is SpageWriter
+    from os_spage import MmapSpageReader, OffpageWriter, write_offpage
+
+    assert all(map(callable, (MmapSpageReader, OffpageWriter, write_offpage)))
+    with pytest.raises(AttributeError):
+        os_spage.unknown
+
+
+def test_write_loaded_once():
+    from io import BytesIO
+
+    from os_spage import write
+    from os_spage.spage_writer import write as spage_write
+
+    write(BytesIO(), "http://www.example.com/")
+    assert os_spage.write is spage_write
+    assert os_spage._write is spage_write
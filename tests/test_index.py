@@ -0,0 +1,56 @@
+import os
+import time
+from datetime import datetime
+
+from os_spage import MmapSpageReader, open_file
+from os_spage.default_schema import InnerHeaderKeys as I_KEYS
+from os_spage.index import CODE_TYPES, load_index, url_hash
+from os_spage.segment import list_segments
+
+BASE_URL = "http://www.test.com/"
+FETCH_TIME = datetime(2019, 1, 2, 3, 4, 5)
+
+
+def write_records(filename_prefix, start, count, roll_size):
+    f = open_file(filename_prefix, "w", roll_size=roll_size, index=True)
+    for idx in range(start, start + count):
+        data = None if idx % 5 == 0 else ("data%d" % idx).encode() * (idx % 40)
+        inner_header = {I_KEYS.BATCH_ID: "test", I_KEYS.FETCH_TIME: FETCH_TIME}
+        f.write(BASE_URL + str(idx), inner_header=inner_header, data=data)
+    f.close()
+
+
+def test_writer_index(tmpdir):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 0, 50, 500)
+        write_records("test_file_", 50, 50, 500)
+
+        segments = list_segments("test_file_")
+        written = [load_index(s) for s in segments]
+        assert all(entries is not None for entries in written)
+        entries = [e for segment_entries in written for e in segment_entries]
+        assert len(entries) == 100
+        assert entries[0].url_hash == url_hash(BASE_URL + "0")
+        assert CODE_TYPES[entries[0].type] == "flat"
+        assert entries[0].store_size == -1
+        assert CODE_TYPES[entries[1].type] == "compressed"
+        assert entries[1].store_size > 0
+        assert entries[1].fetch_time == int(time.mktime(FETCH_TIME.timetuple()))
+
+        MmapSpageReader("test_file_", rebuild=True).close()
+        assert [load_index(s) for s in segments] == written
+
+
+def test_writer_index_after_plain_write(tmpdir):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", roll_size=500)
+        f.write(BASE_URL, data=b"hello")
+        f.close()
+        write_records("test_file_", 0, 3, 500)
+        assert load_index(list_segments("test_file_")[0]) is None
+
+        reader = MmapSpageReader("test_file_")
+        assert len(reader) == 4
+        assert reader.get(BASE_URL + "2")["url"] == BASE_URL + "2"
+        reader.close()
+        assert not [f for f in os.listdir(".") if ".idx." in f]
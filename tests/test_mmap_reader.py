@@ -0,0 +1,81 @@
+import os
+import zlib
+
+import pytest
+
+from os_spage import MmapSpageReader, compat, open_file
+from os_spage.default_schema import SpageKeys as S_KEYS
+
+BASE_URL = "http://www.test.com/"
+
+
+def write_records(filename_prefix, count, roll_size=1000):
+    f = open_file(filename_prefix, "w", roll_size=roll_size)
+    for idx in range(count):
+        data = None if idx % 5 == 0 else ("data%d" % idx).encode() * 10
+        f.write(BASE_URL + str(idx), inner_header={"batchID": "test"}, data=data)
+    f.close()
+
+
+def test_get_and_at(tmpdir):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 100)
+        f = open_file("test_file_", "w", roll_size=1000)
+        f.write(BASE_URL + "3", data=b"newer")
+        f.close()
+
+        reader = MmapSpageReader("test_file_")
+        assert len(reader) == 101
+        records = list(reader.read())
+        assert len(records) == 101
+        for idx in range(100):
+            url = BASE_URL + str(idx)
+            record = reader.get(url)
+            if idx == 3:
+                assert zlib.decompress(record[S_KEYS.DATA]) == b"newer"
+                assert [reader.at(o) for o in reader.offsets(url)] == [
+                    records[3],
+                    records[100],
+                ]
+            else:
+                assert record == records[idx]
+        assert reader.get(BASE_URL + "not_exist") is None
+        with pytest.raises(ValueError):
+            reader.at(-1)
+        reader.close()
+
+
+def test_index_files(tmpdir):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 100)
+        reader = MmapSpageReader("test_file_")
+        reader.close()
+        segments = sorted(f for f in os.listdir(".") if not f.endswith(".idx"))
+        assert sorted(f for f in os.listdir(".") if f.endswith(".idx")) == [
+            s + ".idx" for s in segments
+        ]
+
+        os.remove(segments[3] + ".idx")
+        write_records("test_file_", 10)
+        reader = MmapSpageReader("test_file_")
+        assert len(reader) == 110
+        assert reader.get(BASE_URL + "9") == list(reader.read())[-1]
+        reader.close()
+
+
+def test_plain_file(tmpdir):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 10, roll_size="1G")
+        reader = MmapSpageReader("test_file_0")
+        assert reader.get(BASE_URL + "7")[S_KEYS.URL] == BASE_URL + "7"
+        reader.close()
+
+
+@pytest.mark.parametrize("typecode", [None, compat.UINT64])
+def test_uint64_typecode(tmpdir, monkeypatch, typecode):
+    monkeypatch.setattr(compat, "UINT64", typecode)
+    with tmpdir.as_cwd():
+        write_records("test_file_", 20)
+        reader = MmapSpageReader("test_file_")
+        assert len(reader) == 20
+        assert reader.get(BASE_URL + "7")[S_KEYS.URL] == BASE_URL + "7"
@@ -0,0 +1,123 @@
+import bz2
+import gzip
+from io import BytesIO
+
+import pytest
+
+from os_spage import open_file, read
+from os_spage.offpage_writer import IOV_MAX, write
+
+URL = "http://www.google.com/"
+
+
+def records(count=10):
+    for i in range(count):
+        yield {
+            "url": "%s%d" % (URL, i),
+            "header": {"Key1": "Value%d" % i},
+            "data": {
+                "A": b"a" * i,
+                "B": bytearray(b"b" * (i * 3)),
+                "C": memoryview(b"\nc\n" * i),
+            },
+        }
+
+
+def check(pages, expected):
+    pages = list(pages)
+    assert len(pages) == len(expected)
+    for page, record in zip(pages, expected):
+        assert page["url"] == record["url"]
+        assert page["header"]["Key1"] == record["header"]["Key1"]
+        assert list(page["data"]) == list(record["data"])
+        for k, v in record["data"].items():
+            assert page["data"][k] == bytes(v)
+
+
+def test_write_offpage(tmpdir):
+    expected = list(records())
+    base = tmpdir.join("testfile").strpath
+    writer = open_file(base, "w", page_type="offpage", roll_size="100")
+    for record in expected:
+        writer.write(**record)
+    writer.close()
+    assert len(tmpdir.listdir()) > 1
+
+    reader = open_file(base, "r", page_type="offpage")
+    check(reader.read(), expected)
+    reader.close()
+
+
+def test_write_offpage_round_trip(tmpdir):
+    s = BytesIO()
+    for record in records():
+        write(s, **record)
+    s.seek(0)
+    expected = list(read(s, page_type="offpage"))
+
+    # Content-Type of the records read is generated again
+    s = BytesIO()
+    for record in expected:
+        write(s, **record)
+    s.seek(0)
+    check(read(s, page_type="offpage"), expected)
+
+
+def test_write_offpage_writev(tmpdir):
+    expected = list(records())
+    f = tmpdir.join("testfile.dat")
+    with open(f.strpath, "wb") as fp:
+        fp.write(b"\n")  # buffered, flushed before each scatter write
+        for record in expected:
+            write(fp, **record)
+    s = BytesIO()
+    for record in expected:
+        write(s, **record)
+    assert f.read_binary() == b"\n" + s.getvalue()
+    with open(f.strpath, "rb") as fp:
+        check(read(fp, page_type="offpage"), expected)
+
+
+def test_write_offpage_many_parts(tmpdir):
+    data = dict(("K%d" % i, b"%d" % i) for i in range(max(2000, IOV_MAX * 2 + 1)))
+    f = tmpdir.join("testfile.dat")
+    with open(f.strpath, "wb") as fp:
+        write(fp, URL, data=data)
+    s = BytesIO()
+    write(s, URL, data=data)
+    assert f.read_binary() == s.getvalue()
+
+
+@pytest.mark.parametrize("open_func", [gzip.open, bz2.BZ2File])
+def test_write_offpage_wrapped_file(tmpdir, open_func):
+    expected = list(records())
+    f = tmpdir.join("testfile.dat")
+    fp = open_func(f.strpath, "wb")
+    for record in expected:
+        write(fp, **record)
+    fp.close()
+    fp = open_func(f.strpath, "rb")
+    check(read(fp, page_type="offpage"), expected)
+    fp.close()
+
+
+@pytest.mark.parametrize(
+    "url, data",
+    [
+        ("www.google.com", {"A": b""}),
+        (URL, {"A,B": b""}),
+        (URL, {"A;": b""}),
+        (URL, {"": b""}),
+        (URL, {"A": "text"}),
+    ],
+)
+def test_write_offpage_invalid(url, data):
+    s = BytesIO()
+    with pytest.raises(ValueError):
+        write(s, url, data=data)
+    assert s.getvalue() == b""
+
+
+def test_open_file_page_type(tmpdir):
+    with pytest.raises(ValueError):
+        open_file(tmpdir.join("testfile").strpath, "w", page_type="s2o")
@@ -0,0 +1,62 @@
+import pytest
+
+from os_spage import open_file, parallel_read
+from os_spage.default_schema import SpageKeys as S_KEYS
+
+BASE_URL = "http://www.test.com/"
+
+
+def url_of(record):
+    return record[S_KEYS.URL]
+
+
+def write_records(filename_prefix, count, roll_size=5000):
+    f = open_file(filename_prefix, "w", roll_size=roll_size)
+    for idx in range(count):
+        data = None if idx % 5 == 0 else ("data%d" % idx).encode() * 10
+        http_header = None if idx % 7 == 0 else {"k1": "v1"}
+        f.write(
+            BASE_URL + str(idx),
+            inner_header={"batchID": "test"},
+            http_header=http_header,
+            data=data,
+        )
+    f.close()
+
+
+@pytest.mark.parametrize("chunk_size", [37, 333, "1M"])
+def test_same_records_as_sequential(tmpdir, chunk_size):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 200)
+        f = open_file("test_file_", "r")
+        expected = list(f.read())
+        f.close()
+
+        records = list(parallel_read("test_file_", workers=2, chunk_size=chunk_size))
+    assert len(expected) == 200
+    assert records == expected
+
+
+def test_func(tmpdir):
+    with tmpdir.as_cwd():
+        write_records("test_file_", 200)
+        urls = list(
+            parallel_read("test_file_", func=url_of, workers=2, chunk_size=1000)
+        )
+    assert urls == [BASE_URL + str(idx) for idx in range(200)]
+
+
+def test_spage_like_payloads(tmpdir):
+    payload = b"x" * 100 + b"\nhttp://embedded.example/\nUser-Agent: curl\n\n" * 20
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", compress=False)
+        for idx in range(300):
+            f.write(BASE_URL + str(idx), data=payload)
+        f.close()
+        f = open_file("test_file_", "r")
+        expected = list(f.read())
+        f.close()
+
+        records = list(parallel_read("test_file_", workers=2, chunk_size="4k"))
+    assert len(expected) == 300
+    assert records == expected
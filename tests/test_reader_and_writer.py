@@ -4,6 +4,7 @@ import pytest
 from jsonschema import ValidationError
 
 from os_spage import open_file, read, write
+from os_spage.common import TIME_FORMAT
 from os_spage.compat import iteritems
 from os_spage.default_schema import (
     InnerHeaderKeys as I_KEYS,
@@ -12,13 +13,47 @@ from os_spage.default_schema import (
 )
 
 
-def test_write_invalid_data(tmpdir):
+@pytest.mark.parametrize("validator", [None, "fast"])
+def test_write_invalid_data(tmpdir, validator):
     with tmpdir.as_cwd():
-        f = open_file("test", "w")
+        f = open_file("test", "w", validator=validator)
         with pytest.raises(ValidationError):
             f.write(url="abc", inner_header={I_KEYS.BATCH_ID: "test"})
 
 
+def test_write_trusted_data(tmpdir):
+    with tmpdir.as_cwd():
+        f = open_file("test", "w", validator="trusted")
+        f.write(url="http://www.test.com/", inner_header={I_KEYS.BATCH_ID: "t"})
+        f.close()
+        record = next(open_file("test", "r").read())
+        assert record[S_KEYS.INNER_HEADER][I_KEYS.BATCH_ID] == "t"
+        with pytest.raises(ValueError):
+            open_file("test", "w", validator="unknown")
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_write_copy_headers(tmpdir, background):
+    inner_header = {I_KEYS.BATCH_ID: "test"}
+    http_header = {"k1": "v1"}
+    with tmpdir.as_cwd():
+        f = open_file("test", "w", background=background)
+        f.write("http://www.test.com/", inner_header, http_header, b"hello")
+        f.close()
+        assert inner_header == {I_KEYS.BATCH_ID: "test"}
+        assert http_header == {"k1": "v1"}
+
+        f = open_file("owned", "w", background=background, copy_headers=False)
+        f.write("http://www.test.com/", inner_header, http_header, b"hello")
+        f.close()
+        assert inner_header[I_KEYS.STORE_SIZE] == len(zlib.compress(b"hello"))
+        record = next(open_file("owned", "r").read())
+        assert record[S_KEYS.HTTP_HEADER] == http_header
+        assert record[S_KEYS.INNER_HEADER][I_KEYS.FETCH_TIME] == inner_header[
+            I_KEYS.FETCH_TIME
+        ].strftime(TIME_FORMAT)
+
+
 def check_inner_header(w_inner_header, r_inner_header):
     if not w_inner_header:
         assert r_inner_header[I_KEYS.BATCH_ID] == "__CHANGE_ME__"
@@ -221,3 +256,18 @@ def test_read_no_http_headers():
     o.seek(0)
     page = next(read(o))
     assert decompress(page["data"]) == data
+
+
+def test_read_many_http_headers():
+    from io import BytesIO
+
+    http_header = dict(("k%d" % i, "v%d" % i) for i in range(5000))
+    o = BytesIO()
+    write(o, "http://example.com/", http_header=http_header, data=b"hello")
+    o.seek(0)
+    page = next(read(o))
+    assert page["http_header"] == http_header
+    assert zlib.decompress(page["data"]) == b"hello"
+
+    o.seek(0)
+    assert len(list(read(o, page_type="s2o"))) == 1
@@ -0,0 +1,73 @@
+from io import BytesIO
+
+import pytest
+
+from os_spage import read, write
+from os_spage.default_schema import SpageKeys as S_KEYS
+from os_spage.record import SpageRecord
+
+RECORDS = [
+    # inner_header, http_header, data
+    (None, None, None),
+    ({"batchID": "test"}, {"k1": "v1"}, b"hello"),
+    ({"batchID": "test"}, {"Location": "http://www.test.com/"}, None),
+    ({"batchID": "t\xe9st"}, {"k1": "v\xe9"}, b"hello" * 1000),
+    ({"Type": "flat", "Original-Size": 2}, None, b"\r\n"),
+]
+
+IRREGULAR = (
+    b"http://www.test.com/a\nStore-Size : 3\nk\n\nk1: v1\r\n\r\nabc\r\n"
+    b"http://www.test.com/b\n x: y\nStore-Size: 4\n\n\r\nabcd\r\n"
+)
+
+
+def make_raw():
+    s = BytesIO()
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        url = "http://www.test.com/%d" % idx
+        write(s, url, inner_header=inner_header, http_header=http_header, data=data)
+    raw = s.getvalue()
+    return raw + IRREGULAR + raw[: len(raw) // 2]
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"engine": "buffered"}, {"engine": "buffered", "block_size": 7}]
+)
+def test_same_records_as_dict(kwargs):
+    raw = make_raw()
+    expected = list(read(BytesIO(raw)))
+    records = list(read(BytesIO(raw), record_class=SpageRecord, **kwargs))
+    assert all(isinstance(r, SpageRecord) for r in records)
+    assert [dict(r) for r in records] == expected
+    assert records == expected
+
+
+def test_spage_record():
+    record = next(
+        read(BytesIO(make_raw()), engine="buffered", record_class=SpageRecord)
+    )
+    assert isinstance(record._inner_header, bytes)
+    assert record.url == record[S_KEYS.URL]
+    assert record[S_KEYS.INNER_HEADER]["batchID"] == "__CHANGE_ME__"
+    assert isinstance(record._inner_header, dict)
+    assert list(record) == ["url", "inner_header", "http_header", "data"]
+    assert S_KEYS.DATA in record and "unknown" not in record
+
+    record[S_KEYS.DATA] = b"new"
+    assert record.get(S_KEYS.DATA) == b"new"
+    with pytest.raises(KeyError):
+        record["unknown"] = 1
+    with pytest.raises(TypeError):
+        del record[S_KEYS.DATA]
+    with pytest.raises(AttributeError):
+        record.other = 1
+
+
+def test_skip_data_and_decompress():
+    raw = make_raw()
+    records = list(read(BytesIO(raw), record_class=SpageRecord, skip_data=True))
+    assert all(r.data is None for r in records)
+    records = list(
+        read(BytesIO(raw), engine="buffered", record_class=SpageRecord, decompress=True)
+    )
+    assert records[3][S_KEYS.DATA] == b"hello" * 1000
@@ -0,0 +1,78 @@
+from io import BytesIO
+
+import pytest
+
+from os_spage import open_file, read, write
+from os_spage.default_schema import SpageKeys as S_KEYS
+
+RECORDS = [
+    # inner_header, http_header, data
+    (None, None, None),
+    ({"batchID": "test"}, {"k1": "v1"}, b"hello"),
+    ({"batchID": "test"}, {}, b"hello"),
+    ({}, {"k1": "v1"}, b"hello" * 1000),
+    ({"Type": "flat", "Original-Size": 2}, None, b"\r\n"),
+    ({"Type": "flat", "Original-Size": 4}, None, b"\r\nab"),
+]
+
+
+class Unseekable(object):
+    def __init__(self, raw):
+        self._s = BytesIO(raw)
+        self.read = self._s.read
+        self.readline = self._s.readline
+
+
+def write_records(f):
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        url = "http://www.test.com/%d" % idx
+        f.write(url, inner_header=inner_header, http_header=http_header, data=data)
+
+
+def project(records, fields):
+    return [dict((k, r[k]) for k in fields) for r in records]
+
+
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+@pytest.mark.parametrize("stream", [BytesIO, Unseekable])
+@pytest.mark.parametrize(
+    "fields", [("url", "inner_header"), ("url", "inner_header", "http_header")]
+)
+def test_skip_data(engine, stream, fields):
+    s = BytesIO()
+    for idx, (inner_header, http_header, data) in enumerate(RECORDS):
+        url = "http://www.test.com/%d" % idx
+        write(s, url, inner_header=inner_header, http_header=http_header, data=data)
+    raw = s.getvalue()
+    raw = raw + raw[: len(raw) - 10]
+
+    expected = project(list(read(BytesIO(raw), engine=engine)), fields)
+    kwargs = {"block_size": 7} if engine == "buffered" else {}
+    records = list(read(stream(raw), engine=engine, fields=fields, **kwargs))
+    assert len(records) > len(RECORDS)
+    assert records == expected
+
+
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+def test_spage_reader_skip_data(tmpdir, engine):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", roll_size=100)
+        write_records(f)
+        write_records(f)
+        f.close()
+
+        expected = list(open_file("test_file_", "r").read())
+        f = open_file("test_file_", "r", engine=engine, skip_data=True)
+        records = list(f.read())
+        f.close()
+
+    assert len(records) == 2 * len(RECORDS)
+    assert records == project(expected, ("url", "inner_header", "http_header"))
+
+
+def test_invalid_fields():
+    with pytest.raises(ValueError):
+        next(read(BytesIO(), fields=("url", "unknown")))
+    assert S_KEYS.DATA not in next(
+        read(BytesIO(b"http://a/\nk: v\n\n\r\n"), fields=("url",))
+    )
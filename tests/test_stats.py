@@ -0,0 +1,160 @@
+import threading
+from io import BytesIO
+
+import pytest
+
+from os_spage import open_file, read, write
+from os_spage.spage_writer import create_writer
+from os_spage.stats import TIMING_SAMPLE, Stats, StatsBuffer
+
+URL = "http://www.google.com/"
+
+
+def spage(count=10):
+    s = BytesIO()
+    for i in range(count):
+        write(s, URL + str(i), http_header={"k": "v"}, data=b"hello" * 100)
+    return s.getvalue()
+
+
+def test_stats():
+    stats = Stats()
+    stats.incr("records")
+    stats.add({"records": 2, "bytes_read": 10}, {"read": 0.5})
+    stats.add_time("read", 0.25)
+    snapshot = stats.snapshot()
+    assert snapshot == {
+        "counters": {"records": 3, "bytes_read": 10},
+        "timers": {"read": 0.75},
+    }
+    stats.incr("records")
+    assert snapshot["counters"]["records"] == 3
+    stats.reset()
+    assert stats.snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_stats_threads():
+    stats = Stats()
+
+    def incr():
+        for _ in range(10000):
+            stats.incr("records")
+
+    threads = [threading.Thread(target=incr) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stats.snapshot()["counters"]["records"] == 40000
+
+
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+def test_read_stats(engine):
+    raw = spage()
+    stats = Stats()
+    records = list(read(BytesIO(raw), engine=engine, decompress=True, stats=stats))
+    snapshot = stats.snapshot()
+    counters = snapshot["counters"]
+    assert counters["records"] == len(records) == 10
+    assert counters["bytes_read"] == len(raw)
+    assert counters["original_bytes"] == 10 * 500
+    assert counters["stored_bytes"] < counters["original_bytes"]
+    for name in ("readline", "read", "parse", "decompress"):
+        assert snapshot["timers"][name] >= 0
+
+
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+def test_read_stats_skipped(engine):
+    raw = b"\xff\xfe\n" + b"k" * 2000 + b"\n" + spage(2)
+    stats = Stats()
+    assert len(list(read(BytesIO(raw), engine=engine, stats=stats))) == 2
+    counters = stats.snapshot()["counters"]
+    assert counters["decode_failures"] == 1
+    assert counters["skipped_lines"] == 1
+
+
+def test_read_stats_recover():
+    raw = b"garbage\n" + spage(2)
+    stats = Stats()
+    records = list(read(BytesIO(raw), engine="buffered", recover=True, stats=stats))
+    assert len(records) == 2
+    counters = stats.snapshot()["counters"]
+    assert counters["resyncs"] == 1
+    assert counters["skipped_bytes"] == len(b"garbage\n")
+
+
+def test_stats_buffer():
+    stats = Stats()
+    buffered = StatsBuffer(stats)
+
+    def update(count):
+        for _ in range(count):
+            counts = buffered.get()
+            counts.counters["records"] += 1
+            counts.timers["read"] += 0.5
+            buffered.updated(counts)
+
+    update(TIMING_SAMPLE - 1)
+    assert stats.snapshot()["counters"] == {}
+    update(1)
+    assert stats.snapshot()["counters"] == {"records": TIMING_SAMPLE}
+    threads = [threading.Thread(target=update, args=(5,)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    update(2)
+    buffered.flush()
+    assert stats.snapshot() == {
+        "counters": {"records": TIMING_SAMPLE + 17},
+        "timers": {"read": (TIMING_SAMPLE + 17) * 0.5},
+    }
+
+
+def test_record_writer_stats():
+    stats = Stats()
+    writer = create_writer(stats=stats)
+    s = BytesIO()
+    for i in range(TIMING_SAMPLE + 1):
+        writer.write(s, URL + str(i), data=b"hello")
+    assert stats.snapshot()["counters"]["records"] == TIMING_SAMPLE
+    writer.flush_stats()
+    counters = stats.snapshot()["counters"]
+    assert counters["records"] == TIMING_SAMPLE + 1
+    assert counters["bytes_written"] == len(s.getvalue())
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_writer_stats(tmpdir, background):
+    stats = Stats()
+    base = tmpdir.join("test_file_").strpath
+    f = open_file(base, "w", stats=stats, background=background, workers=2)
+    for i in range(40):
+        f.write(URL + str(i), data=b"hello" * 100)
+    f.write(URL)
+    f.close()
+    snapshot = stats.snapshot()
+    counters = snapshot["counters"]
+    assert counters["records"] == 41
+    assert counters["bytes_written"] == tmpdir.join("test_file_0").size()
+    assert counters["original_bytes"] == 40 * 500
+    assert 0 < counters["stored_bytes"] < counters["original_bytes"]
+    for name in ("validate", "compress", "encode", "write"):
+        assert snapshot["timers"][name] > 0
+
+
+@pytest.mark.parametrize("page_type", ["offpage", "s2o"])
+def test_offpage_stats(tmpdir, page_type):
+    raw = spage()
+    if page_type == "offpage":
+        raw = b"".join(read(BytesIO(raw), page_type="s2o"))
+    tmpdir.join("test_file_0").write_binary(raw)
+    stats = Stats()
+    f = open_file(
+        tmpdir.join("test_file_").strpath, "r", page_type=page_type, stats=stats
+    )
+    assert len(list(f.read())) == 10
+    f.close()
+    counters = stats.snapshot()["counters"]
+    assert counters["records"] == 10
+    assert counters["bytes_read"] == len(raw)
@@ -1,4 +1,15 @@
-from os_spage.validator import check_error_reason, simple_check_url
+from datetime import datetime
+
+import pytest
+from jsonschema import FormatChecker, ValidationError
+
+from os_spage.default_schema import META_SCHEMA
+from os_spage.validator import (
+    FastMetaValidator,
+    check_error_reason,
+    create_validator,
+    simple_check_url,
+)
 
 
 def test_check_error_reason():
@@ -19,3 +30,70 @@ def test_simple_check_url():
     invalid_data = ["htp//www.google.com/", "https/www.google.com/"]
     for data in invalid_data:
         assert simple_check_url(data) == False
+
+
+INNER_HEADERS = [
+    {},
+    {"Type": "flat"},
+    {"Type": "unknown"},
+    {"Type": 1},
+    {"Fetch-Time": datetime(2019, 1, 2, 3, 4, 5)},
+    {"Fetch-Time": "Wed Jan  2 03:04:05 2019"},
+    {"Fetch-Time": "2019-01-02"},
+    {"Node-Fetch-Time": 1},
+    {"Original-Size": 1.5, "Store-Size": 0},
+    {"Original-Size": True},
+    {"Store-Size": "1"},
+    {"batchID": "ab"},
+    {"batchID": "abc", "attach": "x", "User-Agent": "y"},
+    {"IP-Address": "1.2.3.4", "Fetch-IP": "255.255.255.255"},
+    {"IP-Address": "1.2.3.256"},
+    {"Fetch-IP": "1.2.3"},
+    {"Digest": "0" * 31},
+    {"Digest": "0" * 33},
+    {"Error-Reason": "anything"},
+    {"Error-Reason": 404},
+    {"Version": 1.2},
+    {"unknown": object()},
+]
+
+
+@pytest.mark.parametrize("inner_header", INNER_HEADERS)
+@pytest.mark.parametrize(
+    "url, extra",
+    [
+        ("http://www.test.com/", {}),
+        ("www.test.com", {}),
+        (b"http://www.test.com/", {}),
+        ("http://www.test.com/", {"http_header": []}),
+        ("http://www.test.com/", {"data": b"data".decode("ascii")}),
+    ],
+)
+def test_fast_validator(url, extra, inner_header):
+    fetch_time = datetime.now()
+    records = []
+    for validator in (create_validator(META_SCHEMA), FastMetaValidator()):
+        record = {"url": url, "inner_header": dict(inner_header)}
+        record["inner_header"].setdefault("Fetch-Time", fetch_time)
+        record.update(extra)
+        try:
+            validator.validate(record)
+            records.append(record)
+        except ValidationError as e:
+            records.append(e.message)
+    assert records[0] == records[1]
+
+
+def test_trusted_validator():
+    record = {"url": "not url", "inner_header": {"batchID": 1}}
+    FastMetaValidator(check=False).validate(record)
+    assert record["inner_header"]["Version"] == "1.2"
+    assert record["inner_header"]["batchID"] == 1
+
+
+def test_create_validator_cache():
+    schema = dict(META_SCHEMA)
+    validator = create_validator(schema)
+    assert create_validator(schema) is validator
+    assert create_validator(dict(META_SCHEMA)) is not validator
+    assert create_validator(schema, format_checker=FormatChecker()) is not validator
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pytest
+
+from os_spage import read, write
+from os_spage.common import TIME_FORMAT
+from os_spage.default_schema import (
+    InnerHeaderKeys as I_KEYS,
+    RecordTypes as R_TYPES,
+    SpageKeys as S_KEYS,
+)
+from os_spage.record import SpageRecord
+from os_spage.where import Where, compile_where
+
+NOW = datetime(2018, 3, 1, 12, 0, 0)
+
+
+def corpus():
+    s = BytesIO()
+    for idx in range(40):
+        host = ["www.example.com", "a.example.com", "Example.com:80", "b.test.com"][
+            idx % 4
+        ]
+        inner_header = {
+            I_KEYS.BATCH_ID: "batch%d" % (idx % 3),
+            I_KEYS.FETCH_TIME: NOW + timedelta(minutes=idx),
+        }
+        if idx % 5 == 0:
+            inner_header[I_KEYS.TYPE] = R_TYPES.DELETED
+            inner_header[I_KEYS.ORIGINAL_SIZE] = 0
+        write(
+            s,
+            "http://%s/%d" % (host, idx),
+            inner_header=inner_header,
+            http_header={"k": "v"} if idx % 2 else None,
+            data=None if idx % 7 == 0 else b"\r\n" * idx,
+        )
+    # a url line in http header ends a record without data
+    s.write(
+        b"http://www.example.com/latest\nbatchID: batch0\n\nk: v\n"
+        b"http://www.test.com/next\nbatchID: batch1\nStore-Size: 2\n\n\r\nab\r\n"
+    )
+    return s.getvalue()
+
+
+def fetch_time(record):
+    return datetime.strptime(
+        record[S_KEYS.INNER_HEADER][I_KEYS.FETCH_TIME], TIME_FORMAT
+    )
+
+
+WHERES = [
+    ({"url_prefix": "http://www.example.com/"}, lambda r: "//www.example" in r["url"]),
+    (
+        {"url_prefix": ("http://a.", "http://b.")},
+        lambda r: r["url"].startswith(("http://a.", "http://b.")),
+    ),
+    ({"host": "example.com"}, lambda r: "Example.com:80" in r["url"]),
+    ({"host": ".example.com"}, lambda r: "xample.com" in r["url"]),
+    ({"host": ["b.test.com", "www.test.com"]}, lambda r: "test.com" in r["url"]),
+    (
+        {"inner_header": {"batchID": "batch1"}},
+        lambda r: r["inner_header"]["batchID"] == "batch1",
+    ),
+    (
+        {"inner_header": {"Type": "deleted", "batchID": ["batch0", "batch2"]}},
+        lambda r: r["inner_header"].get("Type") == "deleted"
+        and r["inner_header"]["batchID"] != "batch1",
+    ),
+    (
+        {"inner_header": {"Store-Size": lambda v: v is None}},
+        lambda r: "Store-Size" not in r["inner_header"],
+    ),
+    (
+        {"fetch_time": (NOW + timedelta(minutes=10), NOW + timedelta(minutes=20))},
+        lambda r: I_KEYS.FETCH_TIME in r["inner_header"]
+        and 10 <= (fetch_time(r) - NOW).seconds // 60 < 20,
+    ),
+    (
+        {"store_size": (10, None), "host": ".example.com"},
+        lambda r: int(r["inner_header"].get("Store-Size", -1)) >= 10
+        and "xample.com" in r["url"],
+    ),
+    (
+        {"original_size": (None, 1)},
+        lambda r: int(r["inner_header"].get("Original-Size", 1)) < 1,
+    ),
+]
+
+
+@pytest.mark.parametrize("where, expected", WHERES)
+@pytest.mark.parametrize("engine", ["line", "buffered"])
+@pytest.mark.parametrize("skip_data", [False, True])
+def test_where(where, expected, engine, skip_data):
+    raw = corpus()
+    records = list(read(BytesIO(raw), engine=engine, skip_data=skip_data, where=where))
+    all_records = list(read(BytesIO(raw), engine=engine, skip_data=skip_data))
+    assert records == [r for r in all_records if expected(r)]
+    assert 0 < len(records) < len(all_records)
+
+
+@pytest.mark.parametrize("block_size", [7, "1M"])
+def test_where_raw_headers(block_size):
+    raw = corpus()
+    where = {"inner_header": {"batchID": "batch1"}}
+    records = list(
+        read(
+            BytesIO(raw),
+            engine="buffered",
+            block_size=block_size,
+            record_class=SpageRecord,
+            where=where,
+        )
+    )
+    expected = [
+        r for r in read(BytesIO(raw)) if r["inner_header"]["batchID"] == "batch1"
+    ]
+    assert [dict(r) for r in records] == expected
+
+
+def test_compile_where():
+    where = compile_where({"host": "example.com"})
+    assert compile_where(where) is where
+    assert compile_where(None) is None
+    assert isinstance(where, Where)
+    assert where.match_url("http://user@EXAMPLE.com:8080/?a=b")
+    assert not where.match_url("http://example.com.cn/")
+    with pytest.raises(ValueError):
+        compile_where({"url": "http://example.com/"})
+    with pytest.raises(ValueError):
+        compile_where(["host"])
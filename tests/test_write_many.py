@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from os_spage import open_file
+from os_spage.index import load_index
+from os_spage.segment import list_segments
+
+BASE_URL = "http://www.test.com/"
+FETCH_TIME = datetime(2019, 1, 2, 3, 4, 5)
+
+
+def make_records(count):
+    records = []
+    for idx in range(count):
+        data = None if idx % 5 == 0 else ("data%d" % idx).encode() * (idx % 40)
+        http_header = None if idx % 7 == 0 else {"k1": "v1"}
+        records.append(
+            {
+                "url": BASE_URL + str(idx),
+                "inner_header": {"batchID": "test", "Fetch-Time": FETCH_TIME},
+                "http_header": http_header,
+                "data": data,
+            }
+        )
+    return records
+
+
+def dump(filename_prefix):
+    segments = list_segments(filename_prefix)
+    return [open(s, "rb").read() for s in segments], [load_index(s) for s in segments]
+
+
+@pytest.mark.parametrize("buffer_size", [None, 1, 1000, "1M"])
+def test_same_files_as_write(tmpdir, buffer_size):
+    records = make_records(100)
+    with tmpdir.as_cwd():
+        f = open_file("expected_", "w", roll_size=700, index=True)
+        for record in records:
+            f.write(**record)
+        f.close()
+
+        f = open_file("batch_", "w", roll_size=700, index=True, buffer_size=buffer_size)
+        f.write_many(records[:50])
+        for record in records[50:60]:
+            f.write(**record)
+        f.write_many(iter(records[60:]))
+        f.close()
+
+        assert dump("batch_") == dump("expected_")
+
+
+def test_buffered_until_flush(tmpdir):
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w", buffer_size="1M")
+        f.write_many(make_records(10))
+        assert os.path.getsize("test_file_0") == 0
+        f.flush()
+        size = os.path.getsize("test_file_0")
+        assert size > 0
+        f.write(BASE_URL, data=b"hello", flush=True)
+        assert os.path.getsize("test_file_0") > size
+        f.close()
+
+        records = list(open_file("test_file_", "r").read())
+        assert len(records) == 11
+
+
+def test_write_many_invalid_record(tmpdir):
+    records = make_records(10)
+    records[5]["data"] = "not bytes"
+    with tmpdir.as_cwd():
+        f = open_file("test_file_", "w")
+        with pytest.raises(ValueError):
+            f.write_many(records)
+        f.close()
+
+        written = list(open_file("test_file_", "r").read())
+        assert [r["url"] for r in written] == [r["url"] for r in records[:5]]